@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import sys
 BASE_DIR = Path(__file__).resolve().parent.parent
 STATIC_URL = '/static/'
 STATIC_ROOT =	'/var/www/html/static'
@@ -53,22 +54,29 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'otazky.sharding.CourseShardMiddleware',
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'otazky.auth.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'otazky.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 SIMPLE_JWT = {
      'ACCESS_TOKEN_LIFETIME': timedelta(days=365),
      'ACCESS_TOKEN_LIFETIME': timedelta(days=365),
      'AUTH_HEADER_TYPES': ('Bearer',),
      'ROTATE_REFRESH_TOKENS': True,
-     'BLACKLIST_AFTER_ROTATION': True
+     'BLACKLIST_AFTER_ROTATION': True,
+     'TOKEN_OBTAIN_SERIALIZER': 'otazky.auth.GamifikaceTokenObtainPairSerializer',
 }
+# Cache používateľov pre JWT autentifikáciu (otazky/auth.py), v rámci jedného procesu
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
 ROOT_URLCONF = 'gamifikace.urls'
 
 TEMPLATES = [
@@ -93,13 +101,58 @@ WSGI_APPLICATION = 'gamifikace.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Backend gamifikace.sqlite nastaví WAL, busy_timeout a ďalšie PRAGMA a začína transakcie
+# príkazom BEGIN IMMEDIATE (viď gamifikace/sqlite/base.py). Pripojenia sa držia
+# CONN_MAX_AGE sekúnd, aby sa PRAGMA nenastavovali pri každej požiadavke.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': os.environ.get('DB_ENGINE', 'gamifikace.sqlite'),
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Rozdelenie dát kurzov do viacerých databáz (viď otazky/sharding.py). Pri COURSE_SHARDS > 1
+# sa okruhy, otázky, odpovede, komentáre, skóre a otázky výzvy kurzu ukladajú do databázy
+# skupiny kurzu (`default`, `shard_1`, ...), zdieľané dáta (používatelia, kurzy, tokeny)
+# zostávajú v `default`. Databázy skupín sa migrujú príkazom `migrate_shards`.
+COURSE_SHARDS = int(os.environ.get('COURSE_SHARDS', 1))
+COURSE_SHARD_DIR = Path(os.environ.get('COURSE_SHARD_DIR', BASE_DIR))
+COURSE_SHARD_ALIASES = ['default'] + [f'shard_{index}' for index in range(1, COURSE_SHARDS)]
+for index in range(1, COURSE_SHARDS):
+    DATABASES[f'shard_{index}'] = {
+        **DATABASES['default'],
+        'NAME': COURSE_SHARD_DIR / f'db_shard_{index}.sqlite3',
+    }
+DATABASE_ROUTERS = ['otazky.sharding.CourseShardRouter'] if COURSE_SHARDS > 1 else []
+# Testy (`manage.py test`) majú vždy k dispozícii databázu druhej skupiny, testy shardingu
+# zapnú rozdelenie cez override_settings (otazky/tests.py)
+TESTING = sys.argv[1:2] == ['test']
+if TESTING and 'shard_1' not in DATABASES:
+    DATABASES['shard_1'] = {**DATABASES['default'], 'NAME': COURSE_SHARD_DIR / 'db_shard_1.sqlite3'}
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'gamifikace'),
+    }
+}
+# Ako dlho sa držia odpovede v cache (otazky/response_cache.py). Platnosť riadia verzie
+# obsahu, timeout iba uvoľní pamäť po nahradených verziách.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24))
+# Ako dlho sa drží neukončená kvízová relácia v cache (otazky/quiz.py)
+QUIZ_SESSION_TIMEOUT = int(os.environ.get('QUIZ_SESSION_TIMEOUT', 60 * 60 * 2))
+# Interval zápisu čakajúcich lajkov do databázy v sekundách a najdlhšie trvanie jedného zápisu (otazky/likes.py)
+LIKE_FLUSH_INTERVAL = float(os.environ.get('LIKE_FLUSH_INTERVAL', 10))
+LIKE_FLUSH_LOCK_TIMEOUT = int(os.environ.get('LIKE_FLUSH_LOCK_TIMEOUT', 60))
+# Zásobník čakajúcich lajkov a adresa jeho Redis databázy (bez vyraďovania kľúčov)
+LIKE_BUFFER_BACKEND = os.environ.get('LIKE_BUFFER_BACKEND', 'otazky.likes.InMemoryLikeBuffer')
+LIKE_REDIS_URL = os.environ.get('LIKE_REDIS_URL', 'redis://localhost:6379/3')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -146,5 +199,22 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Úlohy sa bez brokera vykonajú hneď v procese iba v testoch (vždy) a pri lokálnom vývoji cez
+# `runserver` (ak ho neprepíše premenná CELERY_TASK_ALWAYS_EAGER), inak idú cez Redis
+CELERY_TASK_ALWAYS_EAGER = TESTING or os.environ.get(
+    'CELERY_TASK_ALWAYS_EAGER', str(sys.argv[1:2] == ['runserver'])
+) == 'True'
+CELERY_BEAT_SCHEDULE = {
+    'flush-like-counters': {
+        'task': 'otazky.tasks.flush_like_counters',
+        'schedule': LIKE_FLUSH_INTERVAL,
+    },
+}
+LEADERBOARD_BACKEND = os.environ.get('LEADERBOARD_BACKEND', 'otazky.leaderboard.InMemoryLeaderboard')
+LEADERBOARD_REDIS_URL = os.environ.get('LEADERBOARD_REDIS_URL', 'redis://localhost:6379/1')
+# Živý rebríček (Server-Sent Events): broker zmien, počet riadkov začiatku rebríčka a interval keepalive v sekundách
+LEADERBOARD_BROKER = os.environ.get('LEADERBOARD_BROKER', 'otazky.leaderboard_stream.InMemoryBroker')
+LEADERBOARD_STREAM_TOP = int(os.environ.get('LEADERBOARD_STREAM_TOP', 10))
+LEADERBOARD_STREAM_KEEPALIVE = float(os.environ.get('LEADERBOARD_STREAM_KEEPALIVE', 15))
 print("✅ settings.py LOADED by Celery")
 print("✅ CELERY_BROKER_URL =", CELERY_BROKER_URL)
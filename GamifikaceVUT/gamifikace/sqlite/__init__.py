@@ -0,0 +1,3 @@
+"""
+Databázový backend SQLite s nastaveniami pre produkčnú prevádzku (viď `base.py`).
+"""
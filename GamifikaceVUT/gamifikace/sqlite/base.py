@@ -0,0 +1,61 @@
+"""
+Databázový backend SQLite pre produkčnú prevádzku aplikácie Gamifikace.
+
+Rozširuje vstavaný backend `django.db.backends.sqlite3`:
+- Každé nové pripojenie nastaví PRAGMA – režim WAL (čitatelia neblokujú zapisovateľa),
+  `busy_timeout` (čakanie na zámok namiesto chyby "database is locked"),
+  `synchronous=NORMAL`, `mmap_size` a `cache_size`.
+- Transakcie (`transaction.atomic`) začínajú príkazom `BEGIN IMMEDIATE`, takže zámok
+  na zápis sa získa hneď na začiatku transakcie. Pri bežnom `BEGIN` sa zámok získava až
+  pri prvom zápise a súbežné transakcie, ktoré už čítali, skončia chybou bez čakania.
+
+Hodnoty PRAGMA je možné zmeniť v `DATABASES['default']['OPTIONS']['pragmas']`,
+režim začiatku transakcie v `OPTIONS['transaction_mode']` (`DEFERRED`, `IMMEDIATE`, `EXCLUSIVE`).
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,
+    'temp_store': 'MEMORY',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Pripojenie k SQLite s nastavením PRAGMA a `BEGIN IMMEDIATE` pre transakcie.
+    """
+
+    def get_connection_params(self):
+        """
+        Vráti parametre pre `sqlite3.connect` bez vlastných volieb backendu.
+        """
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.transaction_mode = kwargs.pop('transaction_mode', 'IMMEDIATE').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"OPTIONS['transaction_mode'] must be one of {', '.join(TRANSACTION_MODES)}."
+            )
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        """
+        Otvorí nové pripojenie a nastaví naň PRAGMA.
+        """
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        """
+        Začne transakciu v zvolenom režime (predvolene `BEGIN IMMEDIATE`).
+        """
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
-from otazky import views
+from otazky import async_views, views
 from django.conf.urls import *
 from otazky.views import *
 from rest_framework_simplejwt import views as jwt_views
@@ -35,8 +35,10 @@ urlpatterns = [
         path('answer/query',AnswersForQuestion.as_view(),name='answer-specific'),
         path('lectures/query',OkruhsForCourse.as_view(),name='okruhs-specific'),
         path('lectures/byID',OkruhByID.as_view(),name='okruhs-specific-id'),
+        path('lectures/studypack',StudyPack.as_view(),name='okruh-study-pack'),
         path('question/query',QuestionForOkruh.as_view(),name='questions-specific'),
         path('question/reported/query',ReportedQuestionsForLecture.as_view(), name='questions-reported-specific'),
+        path('question/search',QuestionSearchView.as_view(),name='question-search'),
         path('user/',Username.as_view(),name='user-specific'),
         path('newQuestion/',NewQuestion.as_view(),name='new-question'),
         path('newAnswers/',NewAnswers.as_view(),name='new-answers'),
@@ -48,7 +50,13 @@ urlpatterns = [
         path('logout/', views.LogoutView.as_view(), name ='logout'),
         path('user/query',UserForID.as_view(),name="user_id-specific"),
         path('score/entry',ScoreEntry.as_view(),name="score-entry"),
+        path('score/batch',ScoreBatchEntry.as_view(),name="score-batch"),
+        path('score/rank',ScoreRank.as_view(),name="score-rank"),
+        path('score/history',ScoreHistory.as_view(),name="score-history"),
         path('question/specific',QuestionByID.as_view(),name="question-by-id"),
+        path('question/bundle',QuestionBundle.as_view(),name="question-bundle"),
+        path('question/<uuid:object_id>/like', QuestionLike.as_view(), name='question-like'),
+        path('comment/<uuid:object_id>/like', CommentLike.as_view(), name='comment-like'),
         path('comment/add',NewComment.as_view(),name="add-comment"),
         path('visited/add',AddUserToCourse.as_view(),name="add-visited"),
         path('visited/remove',RemoveUserFomCourse.as_view(),name="remove-visited"),
@@ -59,5 +67,19 @@ urlpatterns = [
         path('questions/<uuid:question_id>/update-ai-context/', UpdateAIContextView.as_view(), name='update_ai_context'),
         path('register/', UserRegistrationView.as_view(), name='user-register'),
         path('report-question/', ReportQuestion.as_view(), name='report-question'),
+        path('quiz/start', QuizStart.as_view(), name='quiz-start'),
+        path('quiz/<str:session_id>/next', QuizNext.as_view(), name='quiz-next'),
+        path('quiz/<str:session_id>/finish', QuizFinish.as_view(), name='quiz-finish'),
+        path('quiz/<str:session_id>/grade', QuizGrade.as_view(), name='quiz-grade'),
+        # Asynchrónne ekvivalenty endpointov na čítanie (pod ASGI, viď otazky/async_views.py)
+        path('async/', include([
+            path('courses/', async_views.courses, name='async-courses'),
+            path('lectures/query', async_views.lectures, name='async-okruhs-specific'),
+            path('question/query', async_views.questions, name='async-questions-specific'),
+            path('answer/query', async_views.answers, name='async-answer-specific'),
+            path('challange/query', async_views.challenge, name='async-výzva'),
+            path('user/<int:user_id>/achievements/', async_views.achievements, name='async-user-achievements'),
+            path('score/stream', async_views.leaderboard_stream, name='score-stream'),
+        ])),
     ])),
 ]
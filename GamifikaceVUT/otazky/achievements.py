@@ -0,0 +1,203 @@
+"""
+Pravidlá pre udeľovanie achievementov v aplikácii Gamifikace.
+
+Každé pravidlo má šablónu názvu achievementu a množinový dotaz, ktorý vráti ID
+používateľov spĺňajúcich podmienku (zoskupené podľa hodnôt do šablóny názvu).
+Pravidlá sa vyhodnocujú dávkovo a achievementy sa udeľujú jedným hromadným vložením
+do spojovacej tabuľky `Achievement.awarded_to`.
+
+Nové pravidlo sa pridá dekorátorom `rule`::
+
+    @rule('course_completed', "Dokončené všetky okruhy v {course}")
+    def course_completed(course_id=None, user_ids=None):
+        ...
+"""
+
+import logging
+
+from django.db.models import Count, F, OuterRef, Subquery
+
+from .models import Achievement, Course, Okruh, Score, Season, SeasonStanding
+from .sharding import shard_aliases, shard_for_course
+from .versions import bump_achievement_versions
+
+RULES = {}
+logger = logging.getLogger(__name__)
+
+
+class AchievementRule:
+    """
+    Pravidlo pre udelenie achievementu.
+
+    Attributes:
+        key (str): Identifikátor pravidla.
+        name_template (str): Šablóna názvu achievementu (`str.format`).
+        query (callable): Funkcia `query(**scope)` vracajúca dvojice
+            `(hodnoty do šablóny, ID používateľa)`.
+    """
+
+    def __init__(self, key, name_template, query):
+        self.key = key
+        self.name_template = name_template
+        self.query = query
+
+    def evaluate(self, **scope):
+        """
+        Vyhodnotí pravidlo a vráti používateľov podľa názvu achievementu.
+
+        Args:
+            **scope: Obmedzenie vyhodnotenia (napr. `course_id`, `user_ids`).
+
+        Returns:
+            dict[str, set[int]]: Názov achievementu -> ID používateľov.
+        """
+        awards = {}
+        for context, user_id in self.query(**scope):
+            awards.setdefault(self.name_template.format(**context), set()).add(user_id)
+        return awards
+
+
+def rule(key, name_template):
+    """
+    Dekorátor, ktorý zaregistruje funkciu ako dotaz pravidla.
+
+    Args:
+        key (str): Identifikátor pravidla.
+        name_template (str): Šablóna názvu achievementu.
+    """
+    def register(query):
+        RULES[key] = AchievementRule(key, name_template, query)
+        return query
+    return register
+
+
+def award(awards):
+    """
+    Udelí achievementy hromadne.
+
+    Chýbajúce achievementy sa vytvoria jedným `bulk_create`, priradenia sa vložia
+    jedným `bulk_create(ignore_conflicts=True)`, takže už udelené sa preskočia.
+
+    Args:
+        awards (dict[str, Iterable[int]]): Názov achievementu -> ID používateľov.
+
+    Returns:
+        int: Počet spracovaných priradení (vrátane už existujúcich).
+    """
+    awards = {name: set(user_ids) for name, user_ids in awards.items() if user_ids}
+    if not awards:
+        return 0
+    achievements = {}
+    for achievement_id, name in Achievement.objects.filter(name__in=awards.keys()).values_list('id', 'name'):
+        achievements.setdefault(name, achievement_id)
+    missing = [Achievement(name=name) for name in awards if name not in achievements]
+    for achievement in Achievement.objects.bulk_create(missing):
+        logger.info("Vytvorený achievement: %s", achievement.name)
+        achievements[achievement.name] = achievement.id
+
+    Through = Achievement.awarded_to.through
+    rows = [
+        Through(achievement_id=achievements[name], user_id=user_id)
+        for name, user_ids in awards.items()
+        for user_id in user_ids
+    ]
+    Through.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+    # bulk_create neposiela signál m2m_changed, cache achievementov sa invaliduje tu
+    bump_achievement_versions({user_id for user_ids in awards.values() for user_id in user_ids})
+    return len(rows)
+
+
+def evaluate_rules(keys=None, **scope):
+    """
+    Vyhodnotí pravidlá a udelí achievementy v jednom prechode.
+
+    Args:
+        keys (Iterable[str], optional): Pravidlá na vyhodnotenie. None = všetky.
+        **scope: Obmedzenie vyhodnotenia odovzdané dotazom pravidiel.
+
+    Returns:
+        int: Počet spracovaných priradení.
+    """
+    awards = {}
+    for key in keys or RULES:
+        for name, user_ids in RULES[key].evaluate(**scope).items():
+            awards.setdefault(name, set()).update(user_ids)
+    return award(awards)
+
+
+def _shards(course_id):
+    """
+    Vráti databázy, v ktorých sa pravidlo vyhodnotí – databázu skupiny kurzu, bez kurzu všetky.
+    """
+    return [shard_for_course(course_id)] if course_id is not None else shard_aliases()
+
+
+def _with_course_names(rows):
+    """
+    Doplní k dvojiciam `(ID kurzu, ID používateľa)` názov kurzu do šablóny achievementu.
+
+    Kurzy sú v zdieľanej databáze, preto sa názvy načítajú samostatným dotazom.
+    """
+    names = dict(Course.objects.filter(id__in={course_id for course_id, _ in rows}).values_list('id', 'name'))
+    for course_id, user_id in rows:
+        if course_id in names:
+            yield {'course': names[course_id]}, user_id
+
+
+@rule('course_completed', "Dokončené všetky okruhy v {course}")
+def course_completed(course_id=None, user_ids=None, **scope):
+    """
+    Používatelia, ktorí dokončili všetky okruhy kurzu.
+
+    Jeden agregačný dotaz (v každej databáze skupiny kurzov) porovná počet dokončených
+    okruhov používateľa v kurze s počtom okruhov kurzu. Názvy kurzov sa načítajú
+    jedným dotazom do zdieľanej databázy.
+    """
+    lecture_total = (
+        Okruh.objects.filter(course_id=OuterRef('okruh__course_id'))
+        .order_by().values('course_id').annotate(total=Count('id')).values('total')
+    )
+    finished = Okruh.finished_by.through.objects.all()
+    if course_id is not None:
+        finished = finished.filter(okruh__course_id=course_id)
+    if user_ids is not None:
+        finished = finished.filter(user_id__in=user_ids)
+    rows = (
+        finished.values('user_id', 'okruh__course_id')
+        .annotate(finished=Count('okruh_id'), total=Subquery(lecture_total))
+        .filter(finished=F('total'))
+        .values_list('okruh__course_id', 'user_id')
+    )
+    yield from _with_course_names([row for alias in _shards(course_id) for row in rows.using(alias)])
+
+
+@rule('weekly_first_place', "Dosiahnuté 1. miesto v {course}")
+def weekly_first_place(course_id=None, user_ids=None, season_id=None, **scope):
+    """
+    Používatelia s najvyšším počtom bodov v kurze v uzavretej sezóne (pri rovnosti všetci).
+
+    Bez `season_id` sa vyhodnotí naposledy uzavretá sezóna – priebežné poradie aktuálnej
+    sezóny sa ešte môže zmeniť, achievement sa však udeľuje natrvalo. Skóre sezóny sa číta
+    z tabuľky `Score`, po archivácii (`archive_closed_season`) z archívu `SeasonStanding`.
+    """
+    season_id = season_id or Season.objects.last_closed_id()
+    if season_id is None:
+        return
+    best = Score.objects.filter(season_id=season_id, course=OuterRef('course')).order_by('-points').values('points')[:1]
+    scores = Score.objects.filter(season_id=season_id, points=Subquery(best))
+    standings = SeasonStanding.objects.filter(season_id=season_id)
+    if course_id is not None:
+        scores = scores.filter(course_id=course_id)
+        standings = standings.filter(course_id=course_id)
+    scores = scores.values_list('course_id', 'user_id')
+    rows = [row for alias in _shards(course_id) for row in scores.using(alias)]
+    rows += [
+        (standing_course_id, user_id)
+        for standing_course_id, ranking in standings.values_list('course_id', 'ranking')
+        for rank, user_id, _ in ranking
+        if rank == 1
+    ]
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        rows = [(row_course_id, user_id) for row_course_id, user_id in rows if user_id in user_ids]
+    yield from _with_course_names(rows)
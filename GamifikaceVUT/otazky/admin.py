@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Achievement, Question, Answer, Comment, Course, Okruh, Score,ChalangeQuestion
+from .models import Achievement, Question, Answer, Comment, Course, Okruh, Score, Season, ChalangeQuestion
 
 
 class QuestionAdmin(admin.ModelAdmin):
@@ -54,13 +54,18 @@ class OkruhAdmin(admin.ModelAdmin):
 admin.site.register(Okruh, OkruhAdmin)
 
 class ScoreAdmin(admin.ModelAdmin):
-    list_display = ('id', 'points', 'user')
+    list_display = ('id', 'points', 'user', 'season')
     def __str__(self):
         return self.user
 
 
 admin.site.register(Score, ScoreAdmin)
 
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ('id', 'started_at', 'ended_at')
+
+admin.site.register(Season, SeasonAdmin)
+
 class ChallangeAdmin(admin.ModelAdmin):
     list_display = ('id', 'courseID', 'question')
 
@@ -1,8 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class OtazkyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'otazky'
     def ready(self):
-        import otazky.signals
\ No newline at end of file
+        import otazky.signals
+        from otazky.sharding import reserve_id_ranges
+        post_migrate.connect(reserve_id_ranges, sender=self)
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+Asynchrónne endpointy na čítanie pre aplikáciu Gamifikace.
+
+Asynchrónne ekvivalenty endpointov kurzov, okruhov, otázok, odpovedí, výzvy a achievementov
+pod `/api/async/` a živý rebríček kurzu (Server-Sent Events, viď `otazky/leaderboard_stream.py`). Dáta čítajú asynchrónnym ORM (`afirst`, `aexists`, `async for`), takže pod
+ASGI (uvicorn, viď `systemd-units/uvicorn.service`) čakanie na databázu alebo cache neblokuje
+workera a pomalý zápis v inej požiadavke nezaberie kapacitu pre čítania.
+
+Odpovede majú rovnaký tvar a hlavičky (`ETag`, `Last-Modified`, `X-Cache`) ako synchrónne
+endpointy, podporujú rovnaké parametre (`page_size`, `cursor`) a zdieľajú s nimi cache odpovedí.
+"""
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from .challenge import achallenge_payload
+from .conditional import is_not_modified
+from .leaderboard_stream import leaderboard_events
+from .models import Achievement, Answer, Course, Okruh, Question, User
+from .pagination import KeysetPagination
+from .response_cache import acached_response, json_response
+from .serializers import CourseSerializer, QuestionSerializer, QuizAnswerSerializer
+from .sharding import shard_for_course
+from .versions import (
+    CATALOG_VERSION_KEY,
+    achievements_version_key,
+    acontent_version,
+    aokruh_course_id,
+    aquestion_course_id,
+    course_version_key,
+    version_etag,
+    version_headers,
+)
+
+
+def _serializer(serializer_class, **context):
+    """
+    Vráti korutínovú funkciu, ktorá serializuje zoznam objektov serializérom bez dotazov do databázy.
+    """
+    async def serialize(objects):
+        return serializer_class(objects, many=True, context=context).data
+    return serialize
+
+
+async def _okruh_data(okruhs):
+    """
+    Serializuje okruhy ako `OkruhSerializer`, dokončenia (`finished_by`) načíta jedným dotazom.
+    """
+    finished = {okruh.pk: [] for okruh in okruhs}
+    if okruhs:
+        rows = (
+            Okruh.finished_by.through.objects.using(okruhs[0]._state.db)
+            .filter(okruh_id__in=list(finished)).order_by('id').values_list('okruh_id', 'user_id')
+        )
+        async for okruh_id, user_id in rows:
+            finished[okruh_id].append(user_id)
+    return [
+        {
+            'id': okruh.pk,
+            'name': okruh.name,
+            'description': okruh.description,
+            'available': okruh.available,
+            'course': okruh.course_id,
+            'finished_by': finished[okruh.pk],
+        }
+        for okruh in okruhs
+    ]
+
+
+async def _list_response(request, queryset, serialize, ordering=KeysetPagination.default_ordering):
+    """
+    Vráti zoznam ako synchrónny `ListAPIView` – celý, alebo jednu stranu pri `page_size`/`cursor`.
+
+    Args:
+        request (HttpRequest): Objekt HTTP požiadavky.
+        queryset (QuerySet): Queryset zoznamu.
+        serialize (callable): Korutínová funkcia, ktorá serializuje zoznam objektov.
+        ordering (tuple): Zoradenie pre kurzorové stránkovanie (`keyset_ordering` synchrónneho view).
+    """
+    paginator = KeysetPagination()
+    api_request = Request(request)
+    if not paginator.is_requested(api_request):
+        return json_response(await serialize([obj async for obj in queryset]))
+    try:
+        page = await paginator.apaginate_ordered(
+            queryset, api_request, ordering, paginator.decode_cursor(api_request)
+        )
+    except NotFound as error:
+        return json_response({'detail': error.detail}, status=status.HTTP_404_NOT_FOUND)
+    return json_response({'next': paginator.get_next_link(), 'results': await serialize(page)})
+
+
+async def _versioned_response(request, key, get_response):
+    """
+    Asynchrónna verzia `versioned_response`.
+    """
+    version, updated_at = await acontent_version(key)
+    if is_not_modified(request, version_etag(key, version), updated_at):
+        response = json_response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = await get_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return version_headers(response, key, version, updated_at)
+
+
+@require_safe
+async def courses(request):
+    """
+    Vráti zoznam kurzov (ekvivalent `CourseView`).
+    """
+    return await acached_response(
+        request,
+        'courses',
+        CATALOG_VERSION_KEY,
+        lambda: _list_response(request, Course.objects.all(), _serializer(CourseSerializer)),
+    )
+
+
+@require_safe
+async def lectures(request):
+    """
+    Vráti okruhy kurzu `courseID` (ekvivalent `OkruhsForCourse`).
+    """
+    course_id = request.GET.get('courseID', '')
+    queryset = Okruh.objects.all()
+    if course_id:
+        queryset = queryset.filter(course=course_id)
+    if not course_id.isdigit():
+        return await _list_response(request, queryset, _okruh_data, ('id',))
+    queryset = queryset.using(shard_for_course(course_id))
+    return await acached_response(
+        request,
+        'lectures',
+        course_version_key(course_id),
+        lambda: _list_response(request, queryset, _okruh_data, ('id',)),
+    )
+
+
+@require_safe
+async def questions(request):
+    """
+    Vráti otázky okruhu `okruhID` (ekvivalent `QuestionForOkruh`).
+    """
+    okruh_id = request.GET.get('okruhID', '')
+    queryset = Question.objects.all()
+    if okruh_id:
+        queryset = queryset.filter(okruh=okruh_id)
+    course_id = await aokruh_course_id(okruh_id) if okruh_id.isdigit() else None
+    if course_id is None:
+        return await _list_response(request, queryset, _serializer(QuestionSerializer), ('created_at', 'id'))
+    queryset = queryset.using(shard_for_course(course_id))
+    # Čakajúce lajky pripočíta `acached_response` (sú mimo cache)
+    serialize = _serializer(QuestionSerializer, pending_likes=False)
+    return await acached_response(
+        request,
+        'questions',
+        course_version_key(course_id),
+        lambda: _list_response(request, queryset, serialize, ('created_at', 'id')),
+        likes_model=Question,
+    )
+
+
+@require_safe
+async def answers(request):
+    """
+    Vráti odpovede otázky `questionID` (ekvivalent `AnswersForQuestion`).
+
+    Asynchrónne endpointy neoverujú JWT, odpovede sú preto vždy bez správnosti (`answer_type`),
+    ako v `AnswersForQuestion` pre používateľa, ktorý nie je správca.
+    """
+    question_id = request.GET.get('questionID', '')
+    queryset = Answer.objects.all()
+    if question_id:
+        queryset = queryset.filter(question=question_id)
+    course_id = await aquestion_course_id(question_id)
+    serialize = _serializer(QuizAnswerSerializer)
+    if course_id is None:
+        return await _list_response(request, queryset, serialize)
+    queryset = queryset.using(shard_for_course(course_id))
+    return await acached_response(
+        request,
+        'answers',
+        course_version_key(course_id),
+        lambda: _list_response(request, queryset, serialize),
+    )
+
+
+@require_safe
+async def challenge(request):
+    """
+    Vráti otázky výzvy kurzu `courseID` (ekvivalent `CallangeQuestions`).
+    """
+    course_id = request.GET.get('courseID')
+    if not course_id or not course_id.isdigit():
+        return json_response([])
+
+    async def get_response():
+        payload, _ = await achallenge_payload(int(course_id))
+        return json_response(payload)
+
+    return await _versioned_response(request, course_version_key(course_id), get_response)
+
+
+@require_safe
+async def achievements(request, user_id):
+    """
+    Vráti achievementy používateľa (ekvivalent `AchievementView`).
+    """
+    async def get_response():
+        if not await User.objects.filter(id=user_id).aexists():
+            return json_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        awarded = [achievement async for achievement in Achievement.objects.filter(awarded_to=user_id)]
+        users = {achievement.pk: [] for achievement in awarded}
+        rows = (
+            Achievement.awarded_to.through.objects.filter(achievement_id__in=list(users))
+            .order_by('id').values_list('achievement_id', 'user_id')
+        )
+        async for achievement_id, awarded_user_id in rows:
+            users[achievement_id].append(awarded_user_id)
+        return json_response([
+            {'id': str(achievement.pk), 'name': achievement.name, 'awarded_to': users[achievement.pk]}
+            for achievement in awarded
+        ])
+
+    return await acached_response(request, 'achievements', achievements_version_key(user_id), get_response)
+
+
+@require_safe
+async def leaderboard_stream(request):
+    """
+    Posiela zmeny rebríčka kurzu `courseID` ako Server-Sent Events.
+
+    Voliteľný parameter `user_id` zapne sledovanie poradia diváka, `limit` určuje počet
+    riadkov začiatku rebríčka. Spojenie zostáva otvorené, kým ho klient nezavrie.
+
+    Prúd beží iba pod ASGI (uvicorn). Pod WSGI by nekonečný prúd obsadil synchrónneho
+    workera natrvalo, endpoint preto vráti 404.
+    """
+    if not isinstance(request, ASGIRequest):
+        return json_response(
+            {'message': 'Leaderboard stream is only available on the ASGI server.'},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    course_id = request.GET.get('courseID', '')
+    if not course_id.isdigit():
+        return json_response({'message': 'courseID is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    user_id = request.GET.get('user_id', '')
+    limit = request.GET.get('limit', '')
+    response = StreamingHttpResponse(
+        leaderboard_events(
+            int(course_id),
+            int(user_id) if user_id.isdigit() else None,
+            int(limit) if limit.isdigit() else None,
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Nginx nesmie odpoveď bufferovať
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,139 @@
+"""
+Autentifikácia pomocou JWT pre aplikáciu Gamifikace.
+
+Obsahuje:
+- `GamifikaceTokenObtainPairSerializer` – pridá do tokenov používateľské meno a príznak
+  `is_staff`, takže endpointy `user/` a `userID/` nepotrebujú dotaz do databázy.
+- `UserCache` – cache objektov `User` v rámci procesu s TTL a limitom veľkosti (LRU).
+- `CachedJWTAuthentication` – `JWTAuthentication`, ktorá načítava používateľa cez `UserCache`.
+
+Záznam v cache sa zmaže signálom pri uložení alebo zmazaní používateľa (viď
+`otazky/signals.py`). Signál zasiahne iba proces, v ktorom k zmene došlo, ostatné
+procesy (workery gunicornu) zmenu uvidia najneskôr po uplynutí `USER_CACHE_TTL`.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+
+class GamifikaceTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Serializér pre získanie dvojice tokenov s vlastnými claimami `username` a `is_staff`.
+
+    Claimy sa prenášajú aj do prístupových tokenov vydaných obnovením.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        return token
+
+
+class UserCache:
+    """
+    Cache objektov `User` v pamäti procesu s TTL a limitom veľkosti.
+
+    Pri prekročení limitu sa odstráni najdlhšie nepoužitý záznam.
+
+    Attributes:
+        ttl (float): Platnosť záznamu v sekundách.
+        max_size (int): Maximálny počet záznamov.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Vráti kópiu používateľa z cache, alebo None, ak chýba alebo vypršal.
+        """
+        with self._lock:
+            item = self._users.get(user_id)
+            if item is None:
+                return None
+            expires, user = item
+            if expires < time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        """
+        Uloží používateľa do cache.
+        """
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """
+        Odstráni používateľa z cache.
+        """
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        """
+        Vyprázdni cache.
+        """
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL, settings.USER_CACHE_SIZE)
+
+
+def get_cached_user(user_id):
+    """
+    Vráti používateľa podľa ID z cache, pri jej chýbaní z databázy.
+
+    Args:
+        user_id (int): ID používateľa.
+
+    Returns:
+        User | None: Používateľ, alebo None, ak neexistuje.
+    """
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.objects.filter(id=user_id).first()
+        if user is not None:
+            user_cache.set(user_id, user)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Autentifikácia JWT, ktorá používateľa načíta z `UserCache` namiesto dotazu pri každej požiadavke.
+
+    Ak je zapnutá kontrola zmeny hesla (`CHECK_REVOKE_TOKEN`), cache sa nepoužije.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
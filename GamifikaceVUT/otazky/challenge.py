@@ -0,0 +1,135 @@
+"""
+Týždenná výzva pre aplikáciu Gamifikace.
+
+Obsahuje materializáciu výzvy – serializované otázky výzvy každého kurzu sa uložia
+do `ChallengeSnapshot` a do cache pri generovaní výzvy. Endpoint s výzvou potom
+odpovedá jedným čítaním z cache alebo databázy. Ak snapshot chýba (napr. po úprave
+otázky vo výzve), zostaví sa jedným dotazom `filter(id__in=...)` a uloží sa.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from .conditional import compute_etag
+from .models import ChalangeQuestion, ChallengeSnapshot, Course, Question
+from .serializers import QuestionSerializer
+from .sharding import shard_aliases, shard_for_course
+
+CHALLENGE_CACHE_KEY = 'challenge:{course_id}'
+
+
+def _serialize(questions):
+    """
+    Serializuje otázky výzvy v stabilnom poradí.
+    """
+    # Snapshot sa ukladá, čakajúce lajky by v ňom zostali aj po ich zápise
+    return QuestionSerializer(questions.order_by('created_at', 'id'), many=True, context={'pending_likes': False}).data
+
+
+def build_challenge_snapshots():
+    """
+    Pripraví snapshot výzvy pre všetky kurzy.
+
+    Otázky všetkých výziev sa načítajú jedným dotazom (na každú databázu skupiny
+    kurzov), snapshoty sa nahradia v jednej transakcii a zapíšu sa aj do cache.
+
+    Returns:
+        int: Počet pripravených snapshotov.
+    """
+    payloads = {course_id: [] for course_id in Course.objects.values_list('id', flat=True)}
+    for alias in shard_aliases():
+        question_courses = {}
+        for question_id, course_id in ChalangeQuestion.objects.using(alias).values_list('question_id', 'courseID_id'):
+            question_courses.setdefault(question_id, []).append(course_id)
+        if not question_courses:
+            continue
+        questions = Question.objects.using(alias).filter(id__in=question_courses.keys())
+        for question in _serialize(questions):
+            for course_id in question_courses[_question_id(question)]:
+                if course_id in payloads:
+                    payloads[course_id].append(question)
+
+    snapshots = [
+        ChallengeSnapshot(course_id=course_id, payload=payload, etag=compute_etag(payload))
+        for course_id, payload in payloads.items()
+    ]
+    with transaction.atomic():
+        ChallengeSnapshot.objects.all().delete()
+        ChallengeSnapshot.objects.bulk_create(snapshots)
+    cache.set_many(
+        {CHALLENGE_CACHE_KEY.format(course_id=snapshot.course_id): (snapshot.payload, snapshot.etag) for snapshot in snapshots},
+        timeout=None,
+    )
+    return len(snapshots)
+
+
+def _question_id(question):
+    """
+    Vráti ID serializovanej otázky v tvare zhodnom s kľúčmi z databázy.
+    """
+    return Question._meta.pk.to_python(question['id'])
+
+
+def challenge_payload(course_id):
+    """
+    Vráti serializovanú výzvu kurzu a jej ETag.
+
+    Poradie čítania: cache, `ChallengeSnapshot`, zostavenie z `ChalangeQuestion`.
+    Výzva neexistujúceho kurzu sa neukladá, inak by prázdna výzva zostala v cache
+    aj po vytvorení kurzu s rovnakým ID.
+
+    Args:
+        course_id: ID kurzu.
+
+    Returns:
+        tuple[list, str]: Serializované otázky výzvy a ETag.
+    """
+    key = CHALLENGE_CACHE_KEY.format(course_id=course_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    snapshot = ChallengeSnapshot.objects.filter(course_id=course_id).first()
+    if snapshot is None:
+        alias = shard_for_course(course_id)
+        questions = Question.objects.using(alias).filter(
+            id__in=ChalangeQuestion.objects.using(alias).filter(courseID=course_id).values('question')
+        )
+        payload = _serialize(questions)
+        snapshot = ChallengeSnapshot(course_id=course_id, payload=payload, etag=compute_etag(payload))
+        if not Course.objects.filter(id=course_id).exists():
+            return snapshot.payload, snapshot.etag
+        ChallengeSnapshot.objects.update_or_create(
+            course_id=course_id, defaults={'payload': snapshot.payload, 'etag': snapshot.etag}
+        )
+
+    cache.set(key, (snapshot.payload, snapshot.etag), timeout=None)
+    return snapshot.payload, snapshot.etag
+
+
+async def achallenge_payload(course_id):
+    """
+    Asynchrónna verzia `challenge_payload`.
+
+    Výzva z cache sa načíta asynchrónne. Ak v cache chýba (napr. po invalidácii),
+    načíta alebo zostaví sa synchrónne `challenge_payload` v samostatnom vlákne.
+    """
+    cached = await cache.aget(CHALLENGE_CACHE_KEY.format(course_id=course_id))
+    if cached is not None:
+        return cached
+    return await sync_to_async(challenge_payload)(course_id)
+
+
+def invalidate_challenge(course_ids):
+    """
+    Zmaže snapshot výzvy pre zadané kurzy, pri ďalšej požiadavke sa zostaví znova.
+
+    Args:
+        course_ids (Iterable): ID kurzov.
+    """
+    course_ids = list(course_ids)
+    if not course_ids:
+        return
+    ChallengeSnapshot.objects.filter(course_id__in=course_ids).delete()
+    cache.delete_many([CHALLENGE_CACHE_KEY.format(course_id=course_id) for course_id in course_ids])
@@ -0,0 +1,112 @@
+"""
+Dokončenie kurzov pre aplikáciu Gamifikace.
+
+Obsahuje údržbu počítadiel dokončených okruhov (`CourseCompletion`) a počtu okruhov
+kurzu (`Course.lecture_count`). Percento dokončenia kurzov tak stačí prečítať jedným
+dotazom namiesto dvoch `COUNT` dotazov na každý kurz.
+"""
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Course, CourseCompletion, Okruh
+from .sharding import fan_out_list
+
+
+def adjust_completion(course_id, user_ids, delta):
+    """
+    Zmení počet dokončených okruhov kurzu pre zadaných používateľov.
+
+    Args:
+        course_id: ID kurzu.
+        user_ids (Iterable): ID používateľov.
+        delta (int): O koľko sa počítadlo zmení (záporné pri odobratí).
+    """
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+    if delta > 0:
+        CourseCompletion.objects.bulk_create(
+            [CourseCompletion(user_id=user_id, course_id=course_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+    CourseCompletion.objects.filter(course_id=course_id, user_id__in=user_ids).update(
+        completed=F('completed') + delta
+    )
+
+
+def adjust_completion_for_okruhs(user_id, okruh_ids, sign):
+    """
+    Zmení počítadlá používateľa podľa zoznamu okruhov (môžu byť z rôznych kurzov).
+
+    Args:
+        user_id: ID používateľa.
+        okruh_ids (Iterable): ID okruhov, ktoré používateľ dokončil alebo ktoré mu boli odobraté.
+        sign (int): 1 pri pridaní, -1 pri odobratí.
+    """
+    per_course = fan_out_list(Okruh.objects.filter(id__in=list(okruh_ids)).values('course_id').annotate(total=Count('id')))
+    for row in per_course:
+        adjust_completion(row['course_id'], [user_id], sign * row['total'])
+
+
+def adjust_lecture_count(course_id, delta):
+    """
+    Zmení počet okruhov kurzu.
+    """
+    Course.objects.filter(id=course_id).update(lecture_count=F('lecture_count') + delta)
+
+
+def course_completion(user):
+    """
+    Vráti percento dokončenia všetkých kurzov pre používateľa jedným dotazom.
+
+    Args:
+        user (User): Používateľ.
+
+    Returns:
+        list[dict]: Položky s kľúčmi `course` a `completion_percentage`.
+    """
+    completed = CourseCompletion.objects.filter(course=OuterRef('pk'), user=user).values('completed')[:1]
+    courses = Course.objects.annotate(completed=Coalesce(Subquery(completed), Value(0)))
+    return [
+        {
+            "course": name,
+            "completion_percentage": round((done / total) * 100 if total > 0 else 0, 2),
+        }
+        for name, total, done in courses.values_list('name', 'lecture_count', 'completed')
+    ]
+
+
+def rebuild_completion():
+    """
+    Prepočíta `Course.lecture_count` a všetky počítadlá `CourseCompletion` od nuly.
+
+    Okruhy a ich dokončenia sa spočítajú v každej databáze skupiny kurzov (viď
+    `otazky/sharding.py`), počty sa zapíšu do zdieľanej databázy v jednej transakcii.
+
+    Returns:
+        int: Počet vytvorených počítadiel.
+    """
+    lecture_counts = fan_out_list(Okruh.objects.values('course_id').annotate(total=Count('id')).values_list('course_id', 'total'))
+    finished = fan_out_list(
+        Okruh.finished_by.through.objects
+        .values('user_id', 'okruh__course_id')
+        .annotate(total=Count('id'))
+    )
+    with transaction.atomic():
+        Course.objects.update(
+            lecture_count=Case(
+                *[When(id=course_id, then=Value(total)) for course_id, total in lecture_counts],
+                default=Value(0),
+            )
+        )
+        CourseCompletion.objects.all().delete()
+        counters = CourseCompletion.objects.bulk_create(
+            [
+                CourseCompletion(user_id=row['user_id'], course_id=row['okruh__course_id'], completed=row['total'])
+                for row in finished
+            ],
+            batch_size=500,
+        )
+    return len(counters)
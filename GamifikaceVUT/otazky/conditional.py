@@ -0,0 +1,80 @@
+"""
+Podmienené GET požiadavky (ETag) pre aplikáciu Gamifikace.
+
+Obsahuje pomocné funkcie na výpočet ETagu z dát odpovede a na odpoveď
+`304 Not Modified`, ak klient posiela v hlavičke `If-None-Match` aktuálny ETag
+(alebo v `If-Modified-Since` čas, od ktorého sa zdroj nezmenil).
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def compute_etag(data):
+    """
+    Vypočíta silný ETag z JSON reprezentácie dát.
+
+    Args:
+        data: Dáta odpovede serializovateľné do JSON.
+
+    Returns:
+        str: ETag v úvodzovkách.
+    """
+    body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.sha256(body.encode()).hexdigest()[:32])
+
+
+def etag_matches(request, etag):
+    """
+    Vráti True, ak hlavička `If-None-Match` požiadavky obsahuje daný ETag.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)]
+    return etags == ['*'] or etag in etags
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Vráti True, ak má klient aktuálnu verziu zdroja.
+
+    Hlavička `If-None-Match` má prednosť pred `If-Modified-Since`, ktorá sa
+    porovná s časom poslednej zmeny (s presnosťou na sekundy).
+
+    Args:
+        request (Request): Objekt HTTP požiadavky.
+        etag (str): Aktuálny ETag zdroja.
+        last_modified (datetime, optional): Čas poslednej zmeny zdroja.
+    """
+    if request.headers.get('If-None-Match'):
+        return etag_matches(request, etag)
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and last_modified is not None and int(last_modified.timestamp()) <= since
+
+
+def conditional_response(request, etag, get_data):
+    """
+    Vráti odpoveď 304, ak má klient aktuálne dáta, inak odpoveď s dátami.
+
+    Dáta sa načítajú iba vtedy, keď sú potrebné.
+
+    Args:
+        request (Request): Objekt HTTP požiadavky.
+        etag (str): Aktuálny ETag zdroja.
+        get_data (callable): Funkcia bez argumentov vracajúca dáta odpovede.
+
+    Returns:
+        Response: Odpoveď 304 alebo 200 s hlavičkou `ETag`.
+    """
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(get_data())
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,84 @@
+"""
+Zápis používateľov do kurzov pre aplikáciu Gamifikace.
+
+Obsahuje cache zoznamu kurzov, ktoré používateľ navštevuje, a cache katalógu kurzov.
+Vďaka nim endpoint so zapísanými kurzami v bežnom prípade nepotrebuje žiadny dotaz
+do databázy. Cache sa invaliduje signálmi pri zmene `Course.visited_by` a pri
+uložení alebo zmazaní kurzu (viď `otazky/signals.py`).
+"""
+
+from django.core.cache import cache
+
+from .models import Course
+from .serializers import CourseSerializer
+
+ENROLLMENT_CACHE_KEY = 'enrollment:{user_id}'
+COURSE_CATALOG_CACHE_KEY = 'courses:catalog'
+
+
+def enrolled_course_ids(user_id):
+    """
+    Vráti ID kurzov, ktoré používateľ navštevuje.
+
+    Pri chýbajúcej cache sa ID načítajú jedným dotazom nad spojovacou tabuľkou
+    `Course.visited_by`.
+
+    Args:
+        user_id: ID používateľa.
+
+    Returns:
+        list[int]: Zoradené ID kurzov.
+    """
+    key = ENROLLMENT_CACHE_KEY.format(user_id=user_id)
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = sorted(
+            Course.visited_by.through.objects.filter(user_id=user_id).values_list('course_id', flat=True)
+        )
+        cache.set(key, course_ids, timeout=None)
+    return course_ids
+
+
+def course_catalog():
+    """
+    Vráti serializované údaje všetkých kurzov podľa ich ID.
+
+    Returns:
+        dict: Slovník `{course_id: dáta z CourseSerializer}`.
+    """
+    catalog = cache.get(COURSE_CATALOG_CACHE_KEY)
+    if catalog is None:
+        catalog = {course['id']: course for course in CourseSerializer(Course.objects.all(), many=True).data}
+        cache.set(COURSE_CATALOG_CACHE_KEY, catalog, timeout=None)
+    return catalog
+
+
+def enrolled_courses(user_id):
+    """
+    Vráti serializované kurzy, ktoré používateľ navštevuje.
+
+    Args:
+        user_id: ID používateľa.
+
+    Returns:
+        list[dict]: Kurzy vo formáte `CourseSerializer`.
+    """
+    catalog = course_catalog()
+    return [catalog[course_id] for course_id in enrolled_course_ids(user_id) if course_id in catalog]
+
+
+def invalidate_enrollment(user_ids):
+    """
+    Zmaže cache zapísaných kurzov pre zadaných používateľov.
+
+    Args:
+        user_ids (Iterable): ID používateľov.
+    """
+    cache.delete_many([ENROLLMENT_CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+def invalidate_course_catalog():
+    """
+    Zmaže cache katalógu kurzov.
+    """
+    cache.delete(COURSE_CATALOG_CACHE_KEY)
@@ -0,0 +1,505 @@
+"""
+Rebríček (leaderboard) pre aplikáciu Gamifikace.
+
+Skóre používateľov v kurze sa udržiava v zoradenej množine (sorted set), vďaka čomu
+sú dotazy na top N, poradie používateľa a okolie používateľa v rebríčku O(log n)
+namiesto zoradenia celej tabuľky `Score` pri každej požiadavke.
+
+Obsahuje:
+- `RedisLeaderboard` – produkčná implementácia nad Redis sorted sets.
+- `InMemoryLeaderboard` – náhrada v rámci procesu pre testy a lokálny vývoj.
+
+Použitý backend určuje nastavenie `LEADERBOARD_BACKEND`. Rebríček kurzu sa pri prvom
+prístupe načíta z tabuľky `Score` a ďalej sa udržiava pri každom potvrdenom zápise skóre.
+Načítanie sa vloží naraz a iba ak rebríček medzitým nenačítal iný proces. Rebríčky
+sa vedú pre aktuálnu sezónu – po začatí novej sezóny sa čítajú z nových kľúčov.
+Zmeny bodov sa zverejňujú divákom živého rebríčka (viď `otazky/leaderboard_stream.py`).
+"""
+
+import threading
+import uuid
+from bisect import bisect_left, insort
+from functools import partial
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class LeaderboardEntry(NamedTuple):
+    """
+    Jeden riadok rebríčka.
+
+    Attributes:
+        rank (int): Poradie v rebríčku (od 1, rovnaký počet bodov = rovnaké poradie).
+        user_id (int): ID používateľa.
+        points (int): Počet bodov.
+    """
+    rank: int
+    user_id: int
+    points: int
+
+
+class BaseLeaderboard:
+    """
+    Spoločné rozhranie rebríčkov.
+
+    Podtriedy implementujú iba primitívne operácie nad zoradenou množinou
+    (metódy začínajúce podčiarkovníkom), výpočet poradia a okolia je spoločný.
+    """
+
+    def set_score(self, course_id, user_id, points):
+        """
+        Nastaví body používateľa v rebríčku kurzu.
+
+        Args:
+            course_id: ID kurzu.
+            user_id: ID používateľa.
+            points (int): Nový počet bodov.
+        """
+        self._write(course_id, user_id, lambda board: self._set(board, int(user_id), int(points)))
+
+    def increment(self, course_id, user_id, delta):
+        """
+        Pripočíta body používateľovi v rebríčku kurzu.
+
+        Args:
+            course_id: ID kurzu.
+            user_id: ID používateľa.
+            delta (int): Počet bodov, ktoré sa pripočítajú.
+        """
+        self._write(course_id, user_id, lambda board: self._incr(board, int(user_id), int(delta)))
+
+    def remove(self, course_id, user_id):
+        """
+        Odstráni používateľa z rebríčka kurzu.
+        """
+        self._write(course_id, user_id, lambda board: self._remove(board, int(user_id)))
+
+    def _write(self, course_id, user_id, apply):
+        """
+        Vykoná zmenu bodov používateľa potvrdenú v databáze.
+
+        Ak rebríček ešte nie je načítaný, načíta sa z databázy, ktorá zmenu už obsahuje.
+        Ak ho počas toho načítal iný proces, body používateľa sa nastavia podľa databázy –
+        opätovné pripočítanie by zmenu započítalo dvakrát, ak ju už obsahuje načítanie iného procesu.
+        """
+        board = self._board(course_id)
+        if not self._is_loaded(board):
+            if self._load_from_db(board):
+                return
+            apply = partial(self._sync_user, user_id=int(user_id))
+        with self._publish_change(course_id, user_id):
+            apply(board)
+
+    def reset(self):
+        """
+        Vyprázdni rebríčky všetkých kurzov a sezón (napr. pri začiatku novej sezóny).
+        """
+        self._clear()
+
+    def count(self, course_id):
+        """
+        Vráti počet používateľov v rebríčku kurzu.
+        """
+        board = self._board(course_id)
+        self._ensure_loaded(board)
+        return self._card(board)
+
+    def top(self, course_id, limit=None, offset=0):
+        """
+        Vráti časť rebríčka zoradenú zostupne podľa bodov.
+
+        Args:
+            course_id: ID kurzu.
+            limit (int, optional): Maximálny počet riadkov. None = všetky.
+            offset (int): Počet riadkov, ktoré sa preskočia od začiatku.
+
+        Returns:
+            list[LeaderboardEntry]: Riadky rebríčka s vypočítaným poradím.
+        """
+        board = self._board(course_id)
+        self._ensure_loaded(board)
+        offset = max(int(offset), 0)
+        stop = -1 if limit is None else offset + int(limit) - 1
+        if limit is not None and int(limit) <= 0:
+            return []
+        return self._ranked(board, offset, self._range(board, offset, stop))
+
+    def rank(self, course_id, user_id):
+        """
+        Vráti riadok rebríčka pre daného používateľa.
+
+        Returns:
+            LeaderboardEntry | None: Poradie a body používateľa, alebo None,
+            ak používateľ v kurze nemá skóre.
+        """
+        board = self._board(course_id)
+        self._ensure_loaded(board)
+        position = self._position(board, int(user_id))
+        if position is None:
+            return None
+        _, points = position
+        return LeaderboardEntry(self._count_above(board, points) + 1, int(user_id), points)
+
+    def around(self, course_id, user_id, size):
+        """
+        Vráti `size` riadkov nad a `size` riadkov pod používateľom.
+
+        Returns:
+            tuple[list[LeaderboardEntry], list[LeaderboardEntry]] | None: Dvojica
+            (nad, pod), alebo None, ak používateľ v kurze nemá skóre.
+        """
+        board = self._board(course_id)
+        self._ensure_loaded(board)
+        position = self._position(board, int(user_id))
+        if position is None:
+            return None
+        index, _ = position
+        size = max(int(size), 0)
+        start = max(index - size, 0)
+        window = self._ranked(board, start, self._range(board, start, index + size))
+        split = index - start
+        return window[:split], window[split + 1:]
+
+    def _publish_change(self, course_id, user_id):
+        """
+        Vráti kontext, ktorý zverejní zmenu bodov používateľa divákom živého rebríčka kurzu.
+        """
+        from .leaderboard_stream import score_change
+
+        return score_change(self, course_id, user_id)
+
+    def _board(self, course_id):
+        """
+        Vráti identifikátor rebríčka kurzu v aktuálnej sezóne `(season_id, course_id)`.
+        """
+        from .models import Season
+
+        return Season.objects.current_id(), int(course_id)
+
+    def _ranked(self, board, start, items):
+        """
+        Doplní poradie k výrezu rebríčka začínajúcemu na pozícii `start`.
+
+        Poradie prvého riadku sa určí počtom používateľov s vyšším počtom bodov,
+        ďalšie riadky s rovnakým počtom bodov zdieľajú poradie.
+        """
+        entries = []
+        previous = None
+        for i, (user_id, points) in enumerate(items):
+            if previous is None:
+                rank = self._count_above(board, points) + 1
+            elif points == previous.points:
+                rank = previous.rank
+            else:
+                rank = start + i + 1
+            previous = LeaderboardEntry(rank, user_id, points)
+            entries.append(previous)
+        return entries
+
+    def _ensure_loaded(self, board):
+        """
+        Načíta rebríček kurzu v sezóne z tabuľky `Score`, ak ešte nie je v úložisku.
+        """
+        if not self._is_loaded(board):
+            self._load_from_db(board)
+
+    def _scores(self, board):
+        """
+        Vráti queryset skóre rebríčka v databáze skupiny kurzu.
+        """
+        from .models import Score
+        from .sharding import shard_for_course
+
+        season_id, course_id = board
+        return Score.objects.using(shard_for_course(course_id)).filter(season_id=season_id, course_id=course_id)
+
+    def _load_from_db(self, board):
+        """
+        Načíta rebríček z databázy a vloží ho do úložiska, ak ho medzitým nenačítal iný proces.
+
+        Returns:
+            bool: True, ak sa vložilo toto načítanie, False, ak už bol rebríček načítaný
+            (jeho obsah a zmeny zapísané od načítania sa neprepíšu).
+        """
+        scores = self._scores(board).values_list('user_id', 'points')
+        return self._load(board, [(int(user_id), int(points)) for user_id, points in scores])
+
+    def _sync_user(self, board, user_id):
+        """
+        Nastaví body používateľa v rebríčku podľa tabuľky `Score`.
+        """
+        points = self._scores(board).filter(user_id=user_id).values_list('points', flat=True).first()
+        if points is None:
+            self._remove(board, user_id)
+        else:
+            self._set(board, user_id, int(points))
+
+    def _is_loaded(self, board):
+        raise NotImplementedError
+
+    def _load(self, board, items):
+        """
+        Atomicky vloží načítaný rebríček, iba ak ešte nie je v úložisku.
+
+        Returns:
+            bool: True, ak sa rebríček vložil.
+        """
+        raise NotImplementedError
+
+    def _set(self, board, user_id, points):
+        raise NotImplementedError
+
+    def _incr(self, board, user_id, delta):
+        raise NotImplementedError
+
+    def _remove(self, board, user_id):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _card(self, board):
+        raise NotImplementedError
+
+    def _range(self, board, start, stop):
+        raise NotImplementedError
+
+    def _position(self, board, user_id):
+        raise NotImplementedError
+
+    def _count_above(self, board, points):
+        raise NotImplementedError
+
+
+class _SortedBoard:
+    """
+    Zoradená množina jedného rebríčka pre `InMemoryLeaderboard`.
+
+    Udržiava slovník bodov a zoradený zoznam kľúčov `(-points, user_id)`,
+    v ktorom sa hľadá binárnym vyhľadávaním.
+    """
+
+    def __init__(self):
+        self.points = {}
+        self.order = []
+
+    def set(self, user_id, points):
+        self.remove(user_id)
+        self.points[user_id] = points
+        insort(self.order, (-points, user_id))
+
+    def remove(self, user_id):
+        if user_id in self.points:
+            key = (-self.points.pop(user_id), user_id)
+            del self.order[bisect_left(self.order, key)]
+
+
+class InMemoryLeaderboard(BaseLeaderboard):
+    """
+    Rebríček uložený v pamäti procesu.
+
+    Určený pre testy a lokálny vývoj – pri viacerých workeroch nie je zdieľaný.
+    """
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def _is_loaded(self, board):
+        return board in self._boards
+
+    def _load(self, board, items):
+        sorted_board = _SortedBoard()
+        for user_id, points in items:
+            sorted_board.set(user_id, points)
+        with self._lock:
+            if board in self._boards:
+                return False
+            self._boards[board] = sorted_board
+        return True
+
+    def _set(self, board, user_id, points):
+        with self._lock:
+            self._boards[board].set(user_id, points)
+
+    def _incr(self, board, user_id, delta):
+        with self._lock:
+            sorted_board = self._boards[board]
+            sorted_board.set(user_id, sorted_board.points.get(user_id, 0) + delta)
+
+    def _remove(self, board, user_id):
+        with self._lock:
+            self._boards[board].remove(user_id)
+
+    def _clear(self):
+        with self._lock:
+            self._boards = {}
+
+    def _card(self, board):
+        return len(self._boards[board].order)
+
+    def _range(self, board, start, stop):
+        order = self._boards[board].order
+        stop = len(order) if stop < 0 else stop + 1
+        return [(user_id, -negative) for negative, user_id in order[start:stop]]
+
+    def _position(self, board, user_id):
+        sorted_board = self._boards[board]
+        if user_id not in sorted_board.points:
+            return None
+        points = sorted_board.points[user_id]
+        return bisect_left(sorted_board.order, (-points, user_id)), points
+
+    def _count_above(self, board, points):
+        return bisect_left(self._boards[board].order, (-points, float('-inf')))
+
+
+# Počet riadkov rebríčka v jednom príkaze ZADD pri načítaní
+LOAD_BATCH_SIZE = 1000
+
+# KEYS: dočasný kľúč načítania, kľúč rebríčka, značka načítania
+INSTALL_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('PERSIST', KEYS[1])
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+redis.call('SET', KEYS[3], 1)
+return 1
+"""
+
+
+class RedisLeaderboard(BaseLeaderboard):
+    """
+    Rebríček uložený v Redis sorted sets (jeden kľúč na kurz a sezónu).
+
+    Adresa Redis servera sa berie z nastavenia `LEADERBOARD_REDIS_URL`.
+    """
+
+    def __init__(self, url=None, prefix='leaderboard'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url or settings.LEADERBOARD_REDIS_URL)
+        self._prefix = prefix
+        self._install = self._redis.register_script(INSTALL_SCRIPT)
+
+    def _key(self, board):
+        season_id, course_id = board
+        return f'{self._prefix}:{season_id}:{course_id}'
+
+    def _loaded_key(self, board):
+        return f'{self._key(board)}:loaded'
+
+    def _is_loaded(self, board):
+        return bool(self._redis.exists(self._loaded_key(board)))
+
+    def _load(self, board, items):
+        # Rebríček sa naplní do dočasného kľúča a premenuje sa naraz, iba ak ho medzitým
+        # nenačítal iný proces – inak by prepísal zmeny zapísané po jeho načítaní
+        loading_key = f'{self._key(board)}:loading:{uuid.uuid4().hex}'
+        pipe = self._redis.pipeline()
+        if items:
+            for start in range(0, len(items), LOAD_BATCH_SIZE):
+                pipe.zadd(loading_key, {str(user_id): points for user_id, points in items[start:start + LOAD_BATCH_SIZE]})
+            pipe.expire(loading_key, 60)
+        pipe.execute()
+        return bool(self._install(keys=[loading_key, self._key(board), self._loaded_key(board)]))
+
+    def _set(self, board, user_id, points):
+        self._redis.zadd(self._key(board), {str(user_id): points})
+
+    def _incr(self, board, user_id, delta):
+        self._redis.zincrby(self._key(board), delta, str(user_id))
+
+    def _remove(self, board, user_id):
+        self._redis.zrem(self._key(board), str(user_id))
+
+    def _clear(self):
+        keys = list(self._redis.scan_iter(f'{self._prefix}:*'))
+        if keys:
+            self._redis.delete(*keys)
+
+    def _card(self, board):
+        return self._redis.zcard(self._key(board))
+
+    def _range(self, board, start, stop):
+        items = self._redis.zrevrange(self._key(board), start, stop, withscores=True)
+        return [(int(member), int(score)) for member, score in items]
+
+    def _position(self, board, user_id):
+        pipe = self._redis.pipeline()
+        pipe.zrevrank(self._key(board), str(user_id))
+        pipe.zscore(self._key(board), str(user_id))
+        index, score = pipe.execute()
+        if index is None:
+            return None
+        return index, int(score)
+
+    def _count_above(self, board, points):
+        return self._redis.zcount(self._key(board), f'({points}', '+inf')
+
+
+def leaderboard_rows(course_id, entries, season_id=None):
+    """
+    Doplní k riadkom rebríčka ID záznamu skóre, používateľské mená a názov kurzu.
+
+    ID záznamov skóre a mená používateľov sa načítajú vždy jedným dotazom pre celý výrez rebríčka.
+
+    Args:
+        course_id: ID kurzu.
+        entries (list[LeaderboardEntry]): Riadky rebríčka.
+        season_id (int, optional): Sezóna rebríčka (predvolene aktuálna). Po archivácii sezóny ID skóre chýba (None).
+
+    Returns:
+        list[dict]: Riadky pripravené pre `LeaderboardEntrySerializer` (ID skóre ako reťazec, aby sa dali poslať v JSON).
+    """
+    from .models import Course, Score, Season, User
+    from .sharding import shard_for_course
+
+    if not entries:
+        return []
+    user_ids = [entry.user_id for entry in entries]
+    course_name = Course.objects.filter(id=course_id).values_list('name', flat=True).first() or ""
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    score_ids = dict(
+        Score.objects.using(shard_for_course(course_id))
+        .filter(season_id=season_id or Season.objects.current_id(), course_id=course_id, user_id__in=user_ids)
+        .values_list('user_id', 'id')
+    )
+    return [
+        {
+            'id': str(score_ids[entry.user_id]) if entry.user_id in score_ids else None,
+            'rank': entry.rank,
+            'course': int(course_id),
+            'user': entry.user_id,
+            'coursename': course_name,
+            'username': usernames.get(entry.user_id, ""),
+            'points': entry.points,
+        }
+        for entry in entries
+    ]
+
+
+_leaderboard = None
+
+
+def get_leaderboard():
+    """
+    Vráti inštanciu rebríčka podľa nastavenia `LEADERBOARD_BACKEND`.
+
+    Inštancia sa vytvorí raz pre proces a ďalej sa zdieľa.
+
+    Returns:
+        BaseLeaderboard: Nakonfigurovaný rebríček.
+    """
+    global _leaderboard
+    if _leaderboard is None:
+        _leaderboard = import_string(settings.LEADERBOARD_BACKEND)()
+    return _leaderboard
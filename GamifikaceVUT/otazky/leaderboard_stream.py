@@ -0,0 +1,329 @@
+"""
+Živé aktualizácie rebríčka cez Server-Sent Events.
+
+Každý zápis skóre do rebríčka (`BaseLeaderboard.set_score`, `increment`, `remove`) zverejní
+po potvrdení transakcie jednu zmenu do kanála kurzu: body a poradie používateľa pred zmenou
+a po nej, a ak zmena zasiahla prvých `LEADERBOARD_STREAM_TOP` miest, aj nový začiatok rebríčka.
+Zmenu vypočíta raz zapisujúca požiadavka a broker ju rozošle všetkým divákom kurzu – divák
+stojí jedno nečinné spojenie namiesto opakovaného načítania celého rebríčka. Ak kurz nemá
+žiadneho diváka, zápis skóre nič nepočíta ani neposiela.
+
+Poradie diváka sa zo zmien prepočíta bez dotazov: poradie je počet používateľov s vyšším
+počtom bodov + 1, zmena ho teda posunie o jedna, ak ho používateľ zmeny predbehol alebo
+ho prestal predbiehať. Pri nečinnosti sa poradie diváka raz za `LEADERBOARD_STREAM_KEEPALIVE`
+sekúnd overí v rebríčku.
+
+Zmeny rozosiela broker podľa nastavenia `LEADERBOARD_BROKER`:
+- `RedisBroker` – Redis pub/sub, zmeny zo všetkých workerov (gunicorn, uvicorn, Celery)
+  dostanú diváci vo všetkých workeroch uvicornu.
+- `InMemoryBroker` – v rámci procesu pre testy a lokálny vývoj.
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .sharding import shard_for_course
+
+# Maximálny počet zmien čakajúcich na odoslanie jednému divákovi
+QUEUE_SIZE = 100
+
+
+def channel_name(course_id):
+    """
+    Vráti názov kanála zmien rebríčka kurzu.
+    """
+    return f'leaderboard-stream:{int(course_id)}'
+
+
+def format_event(event, data):
+    """
+    Zformátuje jednu udalosť Server-Sent Events s dátami v JSON.
+    """
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class Subscription:
+    """
+    Fronta zmien jedného diváka.
+
+    Zmeny doručuje broker do slučky udalostí diváka. Ak divák nestíha zmeny odoberať,
+    ďalšie sa zahodia a nastaví sa `lagged` – divák potom načíta rebríček nanovo.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def reset(self):
+        """
+        Zahodí čakajúce zmeny a zruší príznak `lagged`.
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagged = False
+
+
+class InMemoryBroker:
+    """
+    Broker zmien v rámci procesu.
+
+    Určený pre testy a lokálny vývoj – zmeny z iných procesov (napr. workerov gunicornu) nedostane.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, channel):
+        """
+        Zistí, či kanál má aspoň jedného diváka.
+        """
+        return bool(self._subscriptions.get(channel))
+
+    def publish(self, channel, message):
+        """
+        Rozošle zmenu divákom kanála. Volá sa zo synchrónneho kódu v ľubovoľnom vlákne.
+        """
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """
+        Prihlási diváka na odber kanála.
+
+        Yields:
+            Subscription: Fronta zmien diváka, platná do opustenia bloku.
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            first = not self._subscriptions.get(channel)
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        if first:
+            await self._listen(channel)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions[channel]
+                subscriptions.discard(subscription)
+                last = not subscriptions
+                if last:
+                    del self._subscriptions[channel]
+            if last:
+                await self._unlisten(channel)
+
+    async def _listen(self, channel):
+        pass
+
+    async def _unlisten(self, channel):
+        pass
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Broker zmien nad Redis pub/sub.
+
+    Každý proces odoberá kanál kurzu jedným spojením do Redis, kým má kurz v procese
+    aspoň jedného diváka, a prijaté zmeny rozošle svojim divákom. Adresa Redis servera
+    sa berie z nastavenia `LEADERBOARD_REDIS_URL`.
+    """
+
+    def __init__(self, url=None):
+        import redis
+
+        super().__init__()
+        self._url = url or settings.LEADERBOARD_REDIS_URL
+        self._redis = redis.Redis.from_url(self._url)
+        self._listeners = {}
+
+    def has_subscribers(self, channel):
+        return bool(self._redis.pubsub_numsub(channel)[0][1])
+
+    def publish(self, channel, message):
+        self._redis.publish(channel, json.dumps(message))
+
+    async def _listen(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self._url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        self._listeners[channel] = asyncio.create_task(self._forward(channel, client, pubsub))
+
+    async def _forward(self, channel, client, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    self._deliver(channel, json.loads(message['data']))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def _unlisten(self, channel):
+        listener = self._listeners.pop(channel, None)
+        if listener is not None:
+            listener.cancel()
+
+
+_broker = None
+
+
+def get_broker():
+    """
+    Vráti inštanciu brokera podľa nastavenia `LEADERBOARD_BROKER`.
+
+    Inštancia sa vytvorí raz pre proces a ďalej sa zdieľa.
+    """
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.LEADERBOARD_BROKER)()
+    return _broker
+
+
+def top_rows(leaderboard, course_id, limit=None):
+    """
+    Vráti začiatok rebríčka kurzu ako riadky `leaderboard_rows`.
+    """
+    from .leaderboard import leaderboard_rows
+
+    return leaderboard_rows(course_id, leaderboard.top(course_id, limit=limit or settings.LEADERBOARD_STREAM_TOP))
+
+
+@contextmanager
+def score_change(leaderboard, course_id, user_id):
+    """
+    Zverejní zmenu bodov používateľa, ktorú v rebríčku vykoná blok `with`.
+
+    Poradie používateľa sa zistí pred blokom a po ňom, zmena sa odošle po potvrdení
+    transakcie v databáze skupiny kurzu. Ak kurz nemá diváka, blok sa iba vykoná.
+
+    Args:
+        leaderboard (BaseLeaderboard): Rebríček, v ktorom sa body menia.
+        course_id: ID kurzu.
+        user_id: ID používateľa.
+    """
+    broker = get_broker()
+    channel = channel_name(course_id)
+    if not broker.has_subscribers(channel):
+        yield
+        return
+    before = leaderboard.rank(course_id, user_id)
+    yield
+    after = leaderboard.rank(course_id, user_id)
+    if before == after:
+        return
+    message = {
+        'user': int(user_id),
+        'points': after.points if after else None,
+        'rank': after.rank if after else None,
+        'previous_points': before.points if before else None,
+        'previous_rank': before.rank if before else None,
+    }
+    if any(entry is not None and entry.rank <= settings.LEADERBOARD_STREAM_TOP for entry in (before, after)):
+        message['top'] = top_rows(leaderboard, course_id)
+    transaction.on_commit(partial(broker.publish, channel, message), using=shard_for_course(course_id))
+
+
+def apply_change(me, user_id, message):
+    """
+    Prepočíta poradie diváka po zmene bodov iného používateľa.
+
+    Args:
+        me (tuple[int, int] | None): Poradie a body diváka, alebo None, ak nemá skóre.
+        user_id (int): ID diváka.
+        message (dict): Zmena z `score_change`.
+
+    Returns:
+        tuple[int, int] | None: Nové poradie a body diváka.
+    """
+    if message['user'] == user_id:
+        return None if message['points'] is None else (message['rank'], message['points'])
+    if me is None:
+        return None
+    rank, points = me
+    was_above = message['previous_points'] is not None and message['previous_points'] > points
+    is_above = message['points'] is not None and message['points'] > points
+    return rank + is_above - was_above, points
+
+
+def _rank_data(me):
+    return None if me is None else {'rank': me[0], 'points': me[1]}
+
+
+async def leaderboard_events(course_id, user_id=None, limit=None):
+    """
+    Asynchrónny generátor udalostí Server-Sent Events pre rebríček kurzu.
+
+    Po pripojení pošle začiatok rebríčka (`top`) a poradie diváka (`rank`), potom pri každej
+    zmene bodov udalosť `score`, nový začiatok rebríčka, ak sa zmenil v prvých `limit`
+    miestach, a nové poradie diváka, ak sa zmenilo. Pri nečinnosti posiela komentár `keepalive`.
+
+    Args:
+        course_id (int): ID kurzu.
+        user_id (int, optional): ID diváka, ktorého poradie sa sleduje.
+        limit (int, optional): Počet riadkov začiatku rebríčka (najviac `LEADERBOARD_STREAM_TOP`).
+
+    Yields:
+        str: Udalosti vo formáte `text/event-stream`.
+    """
+    from .leaderboard import get_leaderboard
+
+    leaderboard = get_leaderboard()
+    limit = min(limit or settings.LEADERBOARD_STREAM_TOP, settings.LEADERBOARD_STREAM_TOP)
+
+    def read_rank():
+        entry = leaderboard.rank(course_id, user_id)
+        return None if entry is None else (entry.rank, entry.points)
+
+    async with get_broker().subscribe(channel_name(course_id)) as subscription:
+        me = None
+        resync = True
+        while True:
+            if resync or subscription.lagged:
+                subscription.reset()
+                yield format_event('top', await sync_to_async(top_rows)(leaderboard, course_id, limit))
+                if user_id is not None:
+                    me = await sync_to_async(read_rank)()
+                    yield format_event('rank', _rank_data(me))
+                resync = False
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.LEADERBOARD_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                if user_id is not None:
+                    current = await sync_to_async(read_rank)()
+                    if current != me:
+                        me = current
+                        yield format_event('rank', _rank_data(me))
+                continue
+
+            yield format_event('score', {key: value for key, value in message.items() if key != 'top'})
+            ranks = [rank for rank in (message['rank'], message['previous_rank']) if rank is not None]
+            if 'top' in message and ranks and min(ranks) <= limit:
+                yield format_event('top', message['top'][:limit])
+            if user_id is not None:
+                current = apply_change(me, user_id, message)
+                if current != me:
+                    me = current
+                    yield format_event('rank', _rank_data(me))
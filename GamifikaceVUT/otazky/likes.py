@@ -0,0 +1,443 @@
+"""
+Lajky otázok a komentárov s kombinovaním zápisov.
+
+Lajk ani jeho zrušenie nezapisuje do databázy. Zmena sa pripočíta k čakajúcemu rozdielu
+objektu v zásobníku lajkov a úloha `flush_like_counters` ich periodicky zapíše dávkovo –
+jedným `UPDATE ... SET likes = likes + N` pre všetky objekty s rovnakým rozdielom. Stĺpec
+`likes` populárnej otázky sa tak mení raz za interval namiesto pri každom kliknutí.
+
+- Zásobník si pamätá množinu používateľov, ktorí objekt lajkli, takže opakovaný lajk ani
+  zrušenie neexistujúceho lajku počet nezmenia. Zmena množiny a rozdielu je jedna atomická operácia.
+- Čakajúce rozdiely sú jediný zoznam objektov na zápis: úloha zapíše všetky nenulové rozdiely
+  a po potvrdení transakcie ich odpočíta, objekt s nulovým rozdielom zo zásobníka zmizne.
+  Rozdiel, ktorého zápis zlyhal alebo sa nestihol, zostane v zásobníku do ďalšieho zápisu.
+- Čítania (`QuestionSerializer`, `CommentSerializer`) pripočítajú k uloženej hodnote
+  čakajúci rozdiel, počet lajkov sa teda javí aktuálny aj pred zápisom. Cache odpovedí
+  ukladá počty bez čakajúcich zmien a pri každom čítaní ich nahradí hodnotou, ktorú do cache
+  uložil posledný zápis, a pripočíta čakajúci rozdiel (`merge_live_likes`). Zápis lajkov
+  preto verzie obsahu nemení.
+
+Zásobník sa vyberá nastavením `LIKE_BUFFER_BACKEND`:
+- `RedisLikeBuffer` – množiny a hash v Redis (`LIKE_REDIS_URL`), zdieľané všetkými procesmi.
+  Redis databáza zásobníka nesmie vyraďovať kľúče (`maxmemory-policy noeviction`).
+- `InMemoryLikeBuffer` – v rámci procesu pre testy a lokálny vývoj.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import Comment, Question
+from .sharding import first_in_shards, shard_for_course
+from .versions import question_course_id
+
+LIKE_MODELS = {'question': Question, 'comment': Comment}
+# Počet objektov zapísaných v jednej transakcii
+FLUSH_BATCH_SIZE = 500
+# Počet lajkov objektu uložený v databáze posledným zápisom
+STORED_LIKES_CACHE_KEY = 'likes:stored:{kind}:{object_id}'
+
+
+class BaseLikeBuffer:
+    """
+    Zásobník čakajúcich lajkov.
+
+    Podtriedy implementujú uloženie množín používateľov a čakajúcich rozdielov, objekt
+    sa v nich identifikuje dvojicou (druh, ID objektu ako str).
+    """
+
+    def change(self, kind, object_id, course_id, user_id, liked):
+        """
+        Pridá (`liked=True`) alebo odoberie používateľa z lajkov objektu a zmení čakajúci rozdiel o ±1.
+
+        Returns:
+            bool: False, ak sa množina používateľov nezmenila (rozdiel sa potom nemení).
+        """
+        raise NotImplementedError
+
+    def is_liked(self, kind, object_id, user_id):
+        raise NotImplementedError
+
+    def pending(self, kind, object_ids):
+        """
+        Vráti čakajúce rozdiely objektov ako slovník ID objektu (str) -> rozdiel, bez nulových.
+        """
+        raise NotImplementedError
+
+    def snapshot(self):
+        """
+        Vráti všetky nenulové čakajúce rozdiely ako zoznam (druh, ID objektu, ID kurzu, rozdiel).
+        """
+        raise NotImplementedError
+
+    def subtract(self, changes):
+        """
+        Odpočíta zapísané rozdiely (položky zo `snapshot`), objekty s nulovým rozdielom odstráni.
+        """
+        raise NotImplementedError
+
+    def acquire_flush_lock(self, timeout):
+        """
+        Získa zámok zápisu, ktorý sám vyprší po `timeout` sekundách.
+
+        Returns:
+            bool: False, ak zámok drží iný zápis.
+        """
+        raise NotImplementedError
+
+    def release_flush_lock(self):
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Zahodí všetky lajky a čakajúce rozdiely (pre testy).
+        """
+        raise NotImplementedError
+
+
+class InMemoryLikeBuffer(BaseLikeBuffer):
+    """
+    Zásobník lajkov v pamäti procesu.
+
+    Určený pre testy a lokálny vývoj – lajky z iných procesov (napr. workerov gunicornu) nevidí.
+    """
+
+    def __init__(self):
+        self._users = defaultdict(set)
+        self._pending = {}
+        self._courses = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def change(self, kind, object_id, course_id, user_id, liked):
+        key = (kind, str(object_id))
+        with self._lock:
+            users = self._users[key]
+            if (user_id in users) == liked:
+                return False
+            if liked:
+                users.add(user_id)
+            else:
+                users.discard(user_id)
+            self._add(key, 1 if liked else -1)
+            if key in self._pending:
+                self._courses[key] = course_id
+            return True
+
+    def _add(self, key, delta):
+        value = self._pending.get(key, 0) + delta
+        if value:
+            self._pending[key] = value
+        else:
+            self._pending.pop(key, None)
+            self._courses.pop(key, None)
+
+    def is_liked(self, kind, object_id, user_id):
+        return user_id in self._users.get((kind, str(object_id)), ())
+
+    def pending(self, kind, object_ids):
+        with self._lock:
+            return {
+                str(object_id): self._pending[kind, str(object_id)]
+                for object_id in object_ids if (kind, str(object_id)) in self._pending
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return [(kind, object_id, self._courses[kind, object_id], delta) for (kind, object_id), delta in self._pending.items()]
+
+    def subtract(self, changes):
+        with self._lock:
+            for kind, object_id, _, delta in changes:
+                self._add((kind, object_id), -delta)
+
+    def acquire_flush_lock(self, timeout):
+        return self._flush_lock.acquire(blocking=False)
+
+    def release_flush_lock(self):
+        self._flush_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._pending.clear()
+            self._courses.clear()
+
+
+# KEYS: množina používateľov, hash rozdielov, hash kurzov; ARGV: 1/0 (lajk/zrušenie), používateľ, pole objektu, ID kurzu
+CHANGE_SCRIPT = """
+local liked = ARGV[1] == '1'
+local changed = redis.call(liked and 'SADD' or 'SREM', KEYS[1], ARGV[2])
+if changed == 1 then
+    if redis.call('HINCRBY', KEYS[2], ARGV[3], liked and 1 or -1) == 0 then
+        redis.call('HDEL', KEYS[2], ARGV[3])
+        redis.call('HDEL', KEYS[3], ARGV[3])
+    else
+        redis.call('HSET', KEYS[3], ARGV[3], ARGV[4])
+    end
+end
+return changed
+"""
+
+# KEYS: hash rozdielov, hash kurzov; ARGV: dvojice pole objektu, zapísaný rozdiel
+SUBTRACT_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[i + 1])) == 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+        redis.call('HDEL', KEYS[2], ARGV[i])
+    end
+end
+"""
+
+
+class RedisLikeBuffer(BaseLikeBuffer):
+    """
+    Zásobník lajkov v Redis.
+
+    Lajky objektu sú množina ID používateľov (`likes:<druh>:<id>:users`), čakajúce rozdiely
+    a kurzy objektov sú v hashoch `likes:pending` a `likes:course` s poľom `<druh>:<id>`.
+    Zmenu množiny a rozdielu aj odpočítanie zapísaných rozdielov vykonajú Lua skripty atomicky.
+    Adresa Redis servera sa berie z nastavenia `LIKE_REDIS_URL`.
+    """
+
+    def __init__(self, url=None, prefix='likes'):
+        import redis
+
+        self._redis = redis.Redis.from_url(url or settings.LIKE_REDIS_URL)
+        self._prefix = prefix
+        self._pending_key = f'{prefix}:pending'
+        self._course_key = f'{prefix}:course'
+        self._lock_key = f'{prefix}:flush-lock'
+        self._change = self._redis.register_script(CHANGE_SCRIPT)
+        self._subtract = self._redis.register_script(SUBTRACT_SCRIPT)
+
+    def _users_key(self, kind, object_id):
+        return f'{self._prefix}:{kind}:{object_id}:users'
+
+    def change(self, kind, object_id, course_id, user_id, liked):
+        return bool(self._change(
+            keys=[self._users_key(kind, object_id), self._pending_key, self._course_key],
+            args=[int(liked), user_id, f'{kind}:{object_id}', course_id],
+        ))
+
+    def is_liked(self, kind, object_id, user_id):
+        return bool(self._redis.sismember(self._users_key(kind, object_id), user_id))
+
+    def pending(self, kind, object_ids):
+        object_ids = [str(object_id) for object_id in object_ids]
+        if not object_ids:
+            return {}
+        values = self._redis.hmget(self._pending_key, [f'{kind}:{object_id}' for object_id in object_ids])
+        return {object_id: int(value) for object_id, value in zip(object_ids, values) if value and int(value)}
+
+    def snapshot(self):
+        # HSCAN môže pole vrátiť viackrát, slovník ich zlúči
+        pending = {field.decode(): int(value) for field, value in self._redis.hscan_iter(self._pending_key, count=FLUSH_BATCH_SIZE)}
+        fields = [field for field, delta in pending.items() if delta]
+        if not fields:
+            return []
+        courses = self._redis.hmget(self._course_key, fields)
+        changes = []
+        for field, course_id in zip(fields, courses):
+            # Rozdiel, ktorý medzitým klesol na nulu, už nemá kurz
+            if course_id is None:
+                continue
+            kind, object_id = field.split(':', 1)
+            changes.append((kind, object_id, int(course_id), pending[field]))
+        return changes
+
+    def subtract(self, changes):
+        args = []
+        for kind, object_id, _, delta in changes:
+            args += [f'{kind}:{object_id}', delta]
+        if args:
+            self._subtract(keys=[self._pending_key, self._course_key], args=args)
+
+    def acquire_flush_lock(self, timeout):
+        return bool(self._redis.set(self._lock_key, 1, nx=True, ex=timeout))
+
+    def release_flush_lock(self):
+        self._redis.delete(self._lock_key)
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(f'{self._prefix}:*'))
+        if keys:
+            self._redis.delete(*keys)
+
+
+_buffer = None
+
+
+def get_like_buffer():
+    """
+    Vráti inštanciu zásobníka lajkov podľa nastavenia `LIKE_BUFFER_BACKEND`.
+
+    Inštancia sa vytvorí raz pre proces a ďalej sa zdieľa.
+    """
+    global _buffer
+    if _buffer is None:
+        _buffer = import_string(settings.LIKE_BUFFER_BACKEND)()
+    return _buffer
+
+
+def object_course_id(kind, object_id):
+    """
+    Vráti ID kurzu otázky alebo komentára, alebo None, ak objekt neexistuje.
+    """
+    if kind == 'question':
+        return question_course_id(object_id)
+    return first_in_shards(Comment.objects.filter(id=object_id).values_list('question__okruh__course_id', flat=True))
+
+
+def like(kind, object_id, user_id, course_id):
+    """
+    Zaznamená lajk používateľa.
+
+    Args:
+        kind (str): Druh objektu (`question` alebo `comment`).
+        object_id (UUID): ID objektu.
+        user_id: ID používateľa.
+        course_id: ID kurzu objektu (viď `object_course_id`).
+
+    Returns:
+        bool: False, ak používateľ objekt už lajkol.
+    """
+    return get_like_buffer().change(kind, object_id, course_id, user_id, liked=True)
+
+
+def unlike(kind, object_id, user_id, course_id):
+    """
+    Zruší lajk používateľa.
+
+    Returns:
+        bool: False, ak používateľ objekt nelajkol.
+    """
+    return get_like_buffer().change(kind, object_id, course_id, user_id, liked=False)
+
+
+def is_liked(kind, object_id, user_id):
+    """
+    Zistí, či používateľ objekt lajkol.
+    """
+    return get_like_buffer().is_liked(kind, object_id, user_id)
+
+
+def pending_likes(kind, object_ids):
+    """
+    Vráti čakajúce (nezapísané) rozdiely počtu lajkov objektov jedným čítaním zo zásobníka.
+
+    Returns:
+        dict: ID objektu (str) -> rozdiel, iba pre objekty s čakajúcou zmenou.
+    """
+    return get_like_buffer().pending(kind, object_ids)
+
+
+def merge_pending_likes(model, rows):
+    """
+    Pripočíta čakajúce rozdiely k počtom lajkov v serializovaných riadkoch (`id`, `likes`).
+    """
+    pending = pending_likes(model._meta.model_name, [row['id'] for row in rows])
+    for row in rows:
+        row['likes'] += pending.get(str(row['id']), 0)
+    return rows
+
+
+def merge_live_likes(model, rows):
+    """
+    Nastaví počty lajkov v riadkoch z cache odpovedí na aktuálnu hodnotu.
+
+    Riadok nesie počet uložený v čase, keď sa odpoveď ukladala do cache. Ak lajky objektu
+    odvtedy zapísal `flush_pending_likes`, prednosť má ním uložená hodnota, k nej sa pripočíta
+    čakajúci rozdiel.
+    """
+    kind = model._meta.model_name
+    keys = {str(row['id']): STORED_LIKES_CACHE_KEY.format(kind=kind, object_id=row['id']) for row in rows}
+    stored = cache.get_many(keys.values())
+    for row in rows:
+        row['likes'] = stored.get(keys[str(row['id'])], row['likes'])
+    return merge_pending_likes(model, rows)
+
+
+def forget_stored_likes(kind, object_id):
+    """
+    Zmaže z cache počet lajkov uložený zápisom (napr. po uložení alebo zmazaní objektu).
+    """
+    cache.delete(STORED_LIKES_CACHE_KEY.format(kind=kind, object_id=object_id))
+
+
+def like_count(kind, object_id, course_id):
+    """
+    Vráti počet lajkov objektu – uloženú hodnotu spolu s čakajúcim rozdielom.
+    """
+    model = LIKE_MODELS[kind]
+    stored = model.objects.using(shard_for_course(course_id)).filter(id=object_id).values_list('likes', flat=True).first()
+    return (stored or 0) + pending_likes(kind, [object_id]).get(str(object_id), 0)
+
+
+def flush_pending_likes():
+    """
+    Zapíše čakajúce rozdiely počtov lajkov do databázy.
+
+    Zapíšu sa všetky nenulové rozdiely zo zásobníka po dávkach `FLUSH_BATCH_SIZE` F-výrazom –
+    v každej databáze skupiny kurzov jedna transakcia a jeden `UPDATE` pre každý druh objektu
+    a hodnotu rozdielu. Nové počty sa v transakcii načítajú a po jej potvrdení sa uložia
+    do cache pre `merge_live_likes` a zapísané rozdiely sa odpočítajú zo zásobníka
+    (zmeny počas zápisu zostanú čakať). Ak zápis
+    v niektorej databáze zlyhá, jej rozdiely zostanú v zásobníku a zapíšu sa pri ďalšom spustení.
+    Súbežne beží najviac jeden zápis.
+
+    Returns:
+        int: Počet zapísaných objektov.
+    """
+    buffer = get_like_buffer()
+    if not buffer.acquire_flush_lock(settings.LIKE_FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        changes = buffer.snapshot()
+        failed = 0
+        for start in range(0, len(changes), FLUSH_BATCH_SIZE):
+            failed += _flush_batch(buffer, changes[start:start + FLUSH_BATCH_SIZE])
+    finally:
+        buffer.release_flush_lock()
+    if failed:
+        raise RuntimeError(f"Zápis lajkov zlyhal pre {failed} objektov, zapíšu sa pri ďalšom spustení.")
+    return len(changes) - failed
+
+
+def _flush_batch(buffer, changes):
+    """
+    Zapíše jednu dávku rozdielov.
+
+    Returns:
+        int: Počet objektov, ktorých zápis zlyhal.
+    """
+    by_alias = defaultdict(list)
+    for change in changes:
+        by_alias[shard_for_course(change[2])].append(change)
+
+    failed = 0
+    for alias, alias_changes in by_alias.items():
+        updates = defaultdict(list)
+        for kind, object_id, _, delta in alias_changes:
+            updates[kind, delta].append(object_id)
+        try:
+            with transaction.atomic(using=alias):
+                for (kind, delta), object_ids in updates.items():
+                    LIKE_MODELS[kind].objects.using(alias).filter(id__in=object_ids).update(likes=F('likes') + delta)
+                stored = {}
+                for kind in {kind for kind, _ in updates}:
+                    object_ids = [object_id for change_kind, object_id, _, _ in alias_changes if change_kind == kind]
+                    rows = LIKE_MODELS[kind].objects.using(alias).filter(id__in=object_ids).values_list('id', 'likes')
+                    stored.update({STORED_LIKES_CACHE_KEY.format(kind=kind, object_id=pk): likes for pk, likes in rows})
+        except Exception:
+            failed += len(alias_changes)
+            continue
+        # Odpovede v cache nie sú staršie ako RESPONSE_CACHE_TIMEOUT, uložené počty ich prežijú
+        cache.set_many(stored, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        buffer.subtract(alias_changes)
+    return failed
@@ -0,0 +1,177 @@
+"""
+Príkaz na porovnanie synchrónnych a asynchrónnych endpointov na čítanie pri súbežných požiadavkách.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from otazky.models import Achievement, Course, Okruh, Question
+from otazky.sharding import is_sharded
+
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def _percentile(values, percent):
+    """
+    Vráti percentil z nezoradeného zoznamu hodnôt (0 pre prázdny zoznam).
+    """
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _read_paths():
+    """
+    Zostaví zoznam ciest endpointov na čítanie z dát v databáze.
+
+    Returns:
+        list[str]: Cesty bez predpony `/api/` (rovnaké pre synchrónne aj asynchrónne endpointy).
+    """
+    course = Course.objects.order_by('id').first()
+    if course is None:
+        raise CommandError("Databáza neobsahuje žiadny kurz.")
+    paths = ['courses/', f'lectures/query?courseID={course.id}', f'challange/query?courseID={course.id}']
+    okruh = Okruh.objects.filter(course=course).order_by('id').first()
+    if okruh is not None:
+        paths.append(f'question/query?okruhID={okruh.id}&page_size=20')
+    question = Question.objects.filter(okruh__course=course).order_by('created_at', 'id').first()
+    if question is not None:
+        paths.append(f'answer/query?questionID={question.id}')
+    achievement = Achievement.objects.filter(awarded_to__isnull=False).values_list('awarded_to', flat=True).first()
+    if achievement is not None:
+        paths.append(f'user/{achievement}/achievements/')
+    return paths
+
+
+class Command(BaseCommand):
+    """
+    Porovná priepustnosť a latenciu synchrónnych endpointov (WSGI, gunicorn) s asynchrónnymi
+    endpointmi pod `/api/async/` (ASGI, uvicorn) pri rovnakom počte súbežných klientov.
+
+    Aplikácia beží v tomto procese bez HTTP servera: synchrónny režim napodobňuje `--workers`
+    synchrónnych workerov (súbežne sa spracuje najviac toľko požiadaviek, ostatné čakajú),
+    asynchrónny režim spracúva všetky požiadavky v jednej slučke udalostí ako jeden worker uvicornu.
+    Každý klient posiela požiadavky hneď po prijatí odpovede, latencia zahŕňa aj čakanie na workera.
+
+    Meranie beží nad kópiou databázy, produkčná databáza sa nemení.
+
+    Použitie: `python manage.py benchmark_asgi [--concurrency 50] [--workers 3] [--seconds 5] [--no-cache]`
+    """
+    help = "Porovná priepustnosť a p99 latenciu synchrónnych a asynchrónnych endpointov na čítanie."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help="Počet súbežných klientov.")
+        parser.add_argument('--workers', type=int, default=3, help="Počet synchrónnych workerov (ako gunicorn).")
+        parser.add_argument('--seconds', type=float, default=5, help="Dĺžka merania pre jeden režim.")
+        parser.add_argument('--no-cache', action='store_true', help="Meranie bez cache odpovedí.")
+
+    def handle(self, *args, **options):
+        if is_sharded():
+            raise CommandError("Meranie podporuje iba jednu databázu (COURSE_SHARDS=1).")
+        paths = _read_paths()
+        overrides = {'ALLOWED_HOSTS': ['*']}
+        if options['no_cache']:
+            overrides['CACHES'] = DUMMY_CACHE
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(**overrides):
+            self.copy_database(os.path.join(directory, 'benchmark.sqlite3'))
+            self.stdout.write(f"{'režim':<8}{'požiadavky/s':>14}{'p50 ms':>10}{'p99 ms':>10}{'chyby':>8}")
+            for mode in ('sync', 'async'):
+                if mode == 'sync':
+                    latencies, errors = self.run_sync(paths, options)
+                else:
+                    latencies, errors = asyncio.run(self.run_async(paths, options))
+                self.stdout.write(
+                    f"{mode:<8}{len(latencies) / options['seconds']:>14.0f}"
+                    f"{_percentile(latencies, 50) * 1000:>10.1f}{_percentile(latencies, 99) * 1000:>10.1f}"
+                    f"{errors:>8}"
+                )
+            connections.close_all()
+
+    def copy_database(self, path):
+        """
+        Skopíruje predvolenú databázu do súboru `path` a presmeruje na ňu pripojenia.
+        """
+        source = sqlite3.connect(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+        connections.close_all()
+        connections.settings[DEFAULT_DB_ALIAS]['NAME'] = path
+        connections[DEFAULT_DB_ALIAS].settings_dict['NAME'] = path
+
+    def run_sync(self, paths, options):
+        """
+        Meria synchrónne endpointy, `--workers` vlákien spracúva požiadavky klientov z fronty v poradí príchodu.
+
+        Returns:
+            tuple[list[float], int]: Latencie úspešných požiadaviek v sekundách a počet chýb.
+        """
+        requests = queue.Queue()
+        deadline = time.monotonic() + options['seconds']
+        latencies, errors = [], []
+
+        def run_worker():
+            client = Client()
+            while (request := requests.get()) is not None:
+                path, responses = request
+                responses.put(client.get(path).status_code)
+            connections.close_all()
+
+        def run_client(offset):
+            responses = queue.Queue()
+            index = offset
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                requests.put((f'/api/{paths[index % len(paths)]}', responses))
+                status = responses.get()
+                (latencies if status == 200 else errors).append(time.monotonic() - started)
+                index += 1
+
+        workers = [threading.Thread(target=run_worker) for _ in range(options['workers'])]
+        clients = [threading.Thread(target=run_client, args=(offset,)) for offset in range(options['concurrency'])]
+        for thread in workers + clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        for _ in workers:
+            requests.put(None)
+        for thread in workers:
+            thread.join()
+        return latencies, len(errors)
+
+    async def run_async(self, paths, options):
+        """
+        Meria asynchrónne endpointy, klienti sú úlohy v jednej slučke udalostí.
+
+        Returns:
+            tuple[list[float], int]: Latencie úspešných požiadaviek v sekundách a počet chýb.
+        """
+        deadline = time.monotonic() + options['seconds']
+        latencies, errors = [], []
+
+        async def run_client(offset):
+            client = AsyncClient()
+            index = offset
+            while time.monotonic() < deadline:
+                path = f'/api/async/{paths[index % len(paths)]}'
+                started = time.monotonic()
+                status = (await client.get(path)).status_code
+                (latencies if status == 200 else errors).append(time.monotonic() - started)
+                index += 1
+
+        await asyncio.gather(*(run_client(offset) for offset in range(options['concurrency'])))
+        return latencies, len(errors)
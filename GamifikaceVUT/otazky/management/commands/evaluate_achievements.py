@@ -0,0 +1,29 @@
+"""
+Príkaz na vyhodnotenie všetkých pravidiel achievementov.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from otazky.achievements import RULES, evaluate_rules
+
+
+class Command(BaseCommand):
+    """
+    Vyhodnotí pravidlá achievementov v jednom prechode a udelí chýbajúce achievementy.
+
+    Pravidlo `weekly_first_place` vyhodnocuje naposledy uzavretú sezónu, nie priebežné poradie aktuálnej.
+
+    Použitie: `python manage.py evaluate_achievements [--rule KLÚČ ...]`
+    """
+    help = "Vyhodnotí pravidlá achievementov a hromadne udelí chýbajúce achievementy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', action='append', dest='rules', help="Pravidlo na vyhodnotenie (predvolene všetky).")
+
+    def handle(self, *args, **options):
+        rules = options['rules']
+        unknown = set(rules or []) - set(RULES)
+        if unknown:
+            raise CommandError(f"Neznáme pravidlá: {', '.join(sorted(unknown))}. Dostupné: {', '.join(sorted(RULES))}")
+        total = evaluate_rules(rules)
+        self.stdout.write(self.style.SUCCESS(f"Spracované priradenia achievementov: {total}"))
@@ -0,0 +1,32 @@
+"""
+Príkaz na migráciu všetkých databáz skupín kurzov.
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from otazky.sharding import misplaced_course_ids, shard_aliases
+
+
+class Command(BaseCommand):
+    """
+    Spustí `migrate` pre databázu `default` a pre databázu každej skupiny kurzov.
+
+    Do databáz skupín sa vytvoria iba tabuľky dát kurzov (viď `CourseShardRouter.allow_migrate`)
+    a po migrácii sa v nich posunú počítadlá ID na rozsah databázy. Ak sú v niektorej databáze
+    dáta kurzov inej skupiny (napr. po zvýšení `COURSE_SHARDS`), príkaz upozorní na `rebalance_shards`.
+
+    Použitie: `python manage.py migrate_shards`
+    """
+    help = "Spustí migrate pre všetky databázy skupín kurzov (COURSE_SHARDS)."
+
+    def handle(self, *args, **options):
+        for alias in shard_aliases():
+            self.stdout.write(f"Migrujem databázu {alias}...")
+            call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+        self.stdout.write(self.style.SUCCESS(f"Migrovaných databáz: {len(shard_aliases())}."))
+        misplaced = sum(len(misplaced_course_ids(alias)) for alias in shard_aliases())
+        if misplaced:
+            self.stdout.write(self.style.WARNING(
+                f"Dáta {misplaced} kurzov sú v databáze inej skupiny, presuňte ich príkazom `rebalance_shards`."
+            ))
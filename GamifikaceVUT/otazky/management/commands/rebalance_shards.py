@@ -0,0 +1,44 @@
+"""
+Príkaz na presun dát kurzov do databáz ich skupín po zmene počtu skupín.
+"""
+
+from django.core.management.base import BaseCommand
+
+from otazky.leaderboard import get_leaderboard
+from otazky.sharding import misplaced_course_ids, move_course, shard_aliases, shard_for_course
+from otazky.versions import bump_course_versions
+
+
+class Command(BaseCommand):
+    """
+    Presunie dáta kurzov, ktoré sú v inej databáze, ako určuje `COURSE_SHARDS` (viď `otazky/sharding.py`).
+
+    Po zvýšení `COURSE_SHARDS` zostanú dáta kurzov v pôvodných databázach (najmä v `default`)
+    a aplikácia ich nevidí. Príkaz ich presunie po kurzoch (`move_course`), zvýši verzie obsahu
+    presunutých kurzov a vyprázdni rebríčky, ktoré sa potom načítajú z nových databáz.
+    Spúšťa sa po `migrate_shards`, kým aplikácia neprijíma požiadavky.
+
+    Použitie: `python manage.py rebalance_shards [--dry-run]`
+    """
+    help = "Presunie dáta kurzov do databáz ich skupín (po zmene COURSE_SHARDS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Iba vypíše kurzy, ktoré treba presunúť.")
+
+    def handle(self, *args, **options):
+        moved_course_ids = []
+        for source in shard_aliases():
+            for course_id in misplaced_course_ids(source):
+                target = shard_for_course(course_id)
+                if options['dry_run']:
+                    self.stdout.write(f"Kurz {course_id}: {source} -> {target}")
+                    continue
+                moved = move_course(course_id, source)
+                summary = ", ".join(f"{model} {count}" for model, count in moved.items() if count)
+                self.stdout.write(f"Kurz {course_id}: {source} -> {target} ({summary})")
+                moved_course_ids.append(course_id)
+
+        if moved_course_ids:
+            bump_course_versions(moved_course_ids)
+            get_leaderboard().reset()
+        self.stdout.write(self.style.SUCCESS(f"Presunutých kurzov: {len(moved_course_ids)}."))
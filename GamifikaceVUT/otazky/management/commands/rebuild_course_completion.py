@@ -0,0 +1,20 @@
+"""
+Príkaz na prepočítanie počítadiel dokončenia kurzov.
+"""
+
+from django.core.management.base import BaseCommand
+
+from otazky.completion import rebuild_completion
+
+
+class Command(BaseCommand):
+    """
+    Prepočíta `Course.lecture_count` a `CourseCompletion` od nuly z tabuľky `Okruh.finished_by`.
+
+    Použitie: `python manage.py rebuild_course_completion`
+    """
+    help = "Prepočíta počítadlá dokončenia kurzov od nuly."
+
+    def handle(self, *args, **options):
+        total = rebuild_completion()
+        self.stdout.write(self.style.SUCCESS(f"Prepočítané počítadlá dokončenia: {total}"))
@@ -0,0 +1,21 @@
+"""
+Príkaz na vytvorenie indexu fulltextového vyhľadávania otázok nanovo.
+"""
+
+from django.core.management.base import BaseCommand
+
+from otazky.search import rebuild_index
+from otazky.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    """
+    Vytvorí dokumenty vyhľadávania všetkých otázok nanovo v databáze každej skupiny kurzov.
+
+    Použitie: `python manage.py rebuild_search_index`
+    """
+    help = "Vytvorí index fulltextového vyhľadávania otázok nanovo."
+
+    def handle(self, *args, **options):
+        total = sum(rebuild_index(alias) for alias in shard_aliases())
+        self.stdout.write(self.style.SUCCESS(f"Zaindexované otázky: {total}"))
@@ -0,0 +1,28 @@
+"""
+Príkaz na zobrazenie počítadiel cache odpovedí.
+"""
+
+from django.core.management.base import BaseCommand
+
+from otazky.response_cache import reset_stats, stats
+
+
+class Command(BaseCommand):
+    """
+    Vypíše počet zásahov a výpadkov cache odpovedí pre každý endpoint.
+
+    Použitie: `python manage.py response_cache_stats [--reset]`
+    """
+    help = "Vypíše počet zásahov a výpadkov cache odpovedí pre každý endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Po vypísaní počítadlá vynuluje.")
+
+    def handle(self, *args, **options):
+        for endpoint, counts in stats().items():
+            total = counts['hit'] + counts['miss']
+            ratio = counts['hit'] / total * 100 if total else 0
+            self.stdout.write(f"{endpoint:<14} hit={counts['hit']:<8} miss={counts['miss']:<8} {ratio:.1f} %")
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Počítadlá boli vynulované."))
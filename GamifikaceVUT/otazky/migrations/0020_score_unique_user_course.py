@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_scores(apps, schema_editor):
+    """
+    Zlúči duplicitné záznamy skóre (rovnaký používateľ a kurz) do jedného.
+
+    Ponechá sa záznam s najvyšším počtom bodov, ostatné sa vymažú.
+    """
+    Score = apps.get_model('otazky', 'Score')
+    duplicates = (
+        Score.objects.values('user_id', 'course_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        scores = Score.objects.filter(user_id=duplicate['user_id'], course_id=duplicate['course_id'])
+        keep = scores.order_by('-points').first()
+        scores.exclude(id=keep.id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0019_alter_question_ai_context'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_scores, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='unique_score_per_user_course'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0020_score_unique_user_course'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChallengeSnapshot',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='otazky.course')),
+                ('payload', models.JSONField(default=list)),
+                ('etag', models.CharField(max_length=66)),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_course_completion(apps, schema_editor):
+    """
+    Naplní počet okruhov kurzov a počítadlá dokončenia z existujúcich dát.
+    """
+    Course = apps.get_model('otazky', 'Course')
+    Okruh = apps.get_model('otazky', 'Okruh')
+    CourseCompletion = apps.get_model('otazky', 'CourseCompletion')
+    for row in Okruh.objects.values('course_id').annotate(total=Count('id')):
+        Course.objects.filter(id=row['course_id']).update(lecture_count=row['total'])
+    finished = Okruh.finished_by.through.objects.values('user_id', 'okruh__course_id').annotate(total=Count('id'))
+    CourseCompletion.objects.bulk_create(
+        [
+            CourseCompletion(user_id=row['user_id'], course_id=row['okruh__course_id'], completed=row['total'])
+            for row in finished
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0021_challengesnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lecture_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='CourseCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='otazky.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='coursecompletion',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='unique_completion_per_user_course'),
+        ),
+        migrations.RunPython(populate_course_completion, migrations.RunPython.noop),
+    ]
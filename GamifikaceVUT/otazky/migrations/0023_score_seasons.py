@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:20
+
+import django.db.models.deletion
+import otazky.models
+from django.db import migrations, models
+
+
+def assign_initial_season(apps, schema_editor):
+    """
+    Vytvorí prvú sezónu a priradí do nej všetky existujúce skóre.
+    """
+    Season = apps.get_model('otazky', 'Season')
+    Score = apps.get_model('otazky', 'Score')
+    season = Season.objects.create()
+    Score.objects.update(season=season)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0022_course_completion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='season',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='otazky.season'),
+        ),
+        migrations.RunPython(assign_initial_season, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='score',
+            name='season',
+            field=models.ForeignKey(default=otazky.models.current_season_id, on_delete=django.db.models.deletion.CASCADE, to='otazky.season'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='score',
+            name='unique_score_per_user_course',
+        ),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('season', 'user', 'course'), name='unique_score_per_season_user_course'),
+        ),
+        migrations.CreateModel(
+            name='SeasonStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ranking', models.JSONField(default=list)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='otazky.course')),
+                ('season', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='otazky.season')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('season', 'course'), name='unique_standing_per_season_course')],
+            },
+        ),
+    ]
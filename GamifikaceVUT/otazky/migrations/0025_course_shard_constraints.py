@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:21
+
+import django.db.models.deletion
+import otazky.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0024_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chalangequestion',
+            name='courseID',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='otazky.course'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created_by',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='okruh',
+            name='course',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='otazky.course'),
+        ),
+        migrations.AlterField(
+            model_name='okruh',
+            name='finished_by',
+            field=models.ManyToManyField(blank=True, db_constraint=False, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='created_by',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='course',
+            field=models.ForeignKey(db_constraint=False, default='1', on_delete=django.db.models.deletion.CASCADE, to='otazky.course'),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='season',
+            field=models.ForeignKey(db_constraint=False, default=otazky.models.current_season_id, on_delete=django.db.models.deletion.CASCADE, to='otazky.season'),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0025_course_shard_constraints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chalangequestion',
+            index=models.Index(fields=['courseID', 'question'], name='challenge_course_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['question', 'created_at', 'id'], name='comment_question_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['okruh', 'created_at', 'id'], name='question_okruh_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('approved', True), ('visible', True)), fields=['okruh', 'created_at', 'id'], name='question_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('reported', True)), fields=['okruh', 'id'], name='question_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='score',
+            index=models.Index(fields=['season', 'course', '-points', 'user'], name='score_season_course_points_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Virtuálna tabuľka FTS5 s obsahom v tabuľke otazky_questionsearch (external content),
+# tokenizácia bez diakritiky pre slovenský a český text
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE otazky_questionsearch_fts USING fts5(
+        name, text, answers, comments,
+        content='otazky_questionsearch', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER otazky_questionsearch_ai AFTER INSERT ON otazky_questionsearch BEGIN
+        INSERT INTO otazky_questionsearch_fts (rowid, name, text, answers, comments)
+        VALUES (new.id, new.name, new.text, new.answers, new.comments);
+    END
+    """,
+    """
+    CREATE TRIGGER otazky_questionsearch_ad AFTER DELETE ON otazky_questionsearch BEGIN
+        INSERT INTO otazky_questionsearch_fts (otazky_questionsearch_fts, rowid, name, text, answers, comments)
+        VALUES ('delete', old.id, old.name, old.text, old.answers, old.comments);
+    END
+    """,
+    """
+    CREATE TRIGGER otazky_questionsearch_au AFTER UPDATE ON otazky_questionsearch BEGIN
+        INSERT INTO otazky_questionsearch_fts (otazky_questionsearch_fts, rowid, name, text, answers, comments)
+        VALUES ('delete', old.id, old.name, old.text, old.answers, old.comments);
+        INSERT INTO otazky_questionsearch_fts (rowid, name, text, answers, comments)
+        VALUES (new.id, new.name, new.text, new.answers, new.comments);
+    END
+    """,
+    # Dokumenty existujúcich otázok
+    """
+    INSERT INTO otazky_questionsearch (question_id, okruh_id, name, text, answers, comments)
+    SELECT q.id, q.okruh_id, q.name, q.text,
+        COALESCE((SELECT group_concat(a.text, ' ') FROM otazky_answer a WHERE a.question_id = q.id), ''),
+        COALESCE((SELECT group_concat(c.text, ' ') FROM otazky_comment c WHERE c.question_id = q.id), '')
+    FROM otazky_question q
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS otazky_questionsearch_ai',
+    'DROP TRIGGER IF EXISTS otazky_questionsearch_ad',
+    'DROP TRIGGER IF EXISTS otazky_questionsearch_au',
+    'DROP TABLE IF EXISTS otazky_questionsearch_fts',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('otazky', '0026_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='', max_length=255)),
+                ('text', models.TextField(default='')),
+                ('answers', models.TextField(default='')),
+                ('comments', models.TextField(default='')),
+                ('okruh', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='otazky.okruh')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='otazky.question')),
+            ],
+        ),
+        # Tabuľka patrí k dátam kurzov, pri shardingu sa vytvorí v databáze každej skupiny
+        migrations.RunSQL(CREATE_SEARCH_INDEX, DROP_SEARCH_INDEX, hints={'model_name': 'questionsearch'}),
+    ]
@@ -1,6 +1,12 @@
 import uuid
-from django.db import models
+from functools import partial
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .sharding import CourseScopedQuerySet
 
 """
 Django modely pre aplikáciu Gamifikace.
@@ -16,31 +22,265 @@ class Course(models.Model):
         name (str): Názov kurzu (krátky).
         full_name (str): Celý názov kurzu.
         visited_by (QuerySet[User]): Používatelia, ktorí navštívili tento kurz.
+        lecture_count (int): Počet okruhov v kurze (udržiavaný signálmi).
     """
     name = models.CharField(max_length=255, unique=True, default="")
     full_name = models.CharField(max_length=255, default="")
     visited_by = models.ManyToManyField(User)
+    lecture_count = models.PositiveIntegerField(default=0, editable=False)
     def __str__(self):
         """Vráti názov kurzu ako reťazec."""
         return self.name
 
+CURRENT_SEASON_CACHE_KEY = 'season:current'
+
+
+class SeasonManager(models.Manager):
+    """
+    Manažér pre model Season s prístupom k aktuálnej sezóne.
+    """
+
+    def current_id(self):
+        """
+        Vráti ID aktuálnej (neuzavretej) sezóny.
+
+        ID sa číta z cache, pri jej chýbaní z databázy. Ak ešte žiadna sezóna
+        neexistuje, vytvorí sa.
+
+        Returns:
+            int: ID aktuálnej sezóny.
+        """
+        season_id = cache.get(CURRENT_SEASON_CACHE_KEY)
+        if season_id is None:
+            season_id = self.filter(ended_at__isnull=True).order_by('-id').values_list('id', flat=True).first()
+            if season_id is None:
+                season_id = self.create().id
+            cache.set(CURRENT_SEASON_CACHE_KEY, season_id, timeout=None)
+        return season_id
+
+    def last_closed_id(self):
+        """
+        Vráti ID naposledy uzavretej sezóny, alebo None, ak ešte žiadna nebola uzavretá.
+        """
+        return self.filter(ended_at__isnull=False).order_by('-ended_at', '-id').values_list('id', flat=True).first()
+
+    def start_new(self):
+        """
+        Uzavrie aktuálnu sezónu a začne novú.
+
+        Skóre uzavretej sezóny zostáva v tabuľke `Score`, zmení sa iba ID aktuálnej
+        sezóny, takže operácia nezávisí od počtu záznamov skóre.
+
+        Returns:
+            list[int]: ID uzavretých sezón.
+        """
+        with transaction.atomic():
+            closed = list(self.filter(ended_at__isnull=True).values_list('id', flat=True))
+            self.filter(id__in=closed).update(ended_at=timezone.now())
+            season = self.create()
+        cache.set(CURRENT_SEASON_CACHE_KEY, season.id, timeout=None)
+        return closed
+
+
+class Season(models.Model):
+    """
+    Model reprezentujúci súťažnú sezónu (týždeň) skóre.
+
+    Attributes:
+        started_at (datetime): Začiatok sezóny.
+        ended_at (datetime): Koniec sezóny, None pre aktuálnu sezónu.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    objects = SeasonManager()
+
+    def __str__(self):
+        """Vráti označenie sezóny ako reťazec."""
+        return f"{self.id} ({self.started_at:%Y-%m-%d})"
+
+
+def current_season_id():
+    """
+    Vráti ID aktuálnej sezóny (predvolená hodnota pre `Score.season`).
+    """
+    return Season.objects.current_id()
+
+
+class ScoreManager(models.Manager.from_queryset(CourseScopedQuerySet)):
+    """
+    Manažér pre model Score so zápisom skóre jedným príkazom.
+    """
+
+    def upsert(self, user_id, course_id, points, increment=False):
+        """
+        Zapíše body používateľa v kurze bez predchádzajúceho načítania záznamu.
+
+        Skóre sa zapisuje do aktuálnej sezóny. V predvolenom režime prepíše body
+        jedným príkazom `INSERT ... ON CONFLICT (season, user, course) DO UPDATE`. V režime `increment`
+        pripočíta body F-výrazom k existujúcemu záznamu a záznam vytvorí, iba ak
+        ešte neexistuje. Rebríček kurzu sa aktualizuje rovnako ako pri `save()` – až po potvrdení transakcie.
+        Zápis ide do databázy skupiny kurzu (viď `otazky/sharding.py`). Cudzie kľúče skóre
+        nemajú v databáze obmedzenia, existenciu používateľa a kurzu musí overiť volajúci.
+
+        Args:
+            user_id: ID používateľa.
+            course_id: ID kurzu.
+            points (int): Body, ktoré sa nastavia alebo pripočítajú.
+            increment (bool): True = pripočítať body, False = prepísať body.
+        """
+        from .leaderboard import get_leaderboard
+        from .sharding import shard_for_course
+
+        alias = shard_for_course(course_id)
+        manager = self.db_manager(alias)
+        season_id = Season.objects.current_id()
+        if not increment:
+            manager.bulk_create(
+                [Score(user_id=user_id, course_id=course_id, season_id=season_id, points=points)],
+                update_conflicts=True,
+                unique_fields=['season', 'user', 'course'],
+                update_fields=['points'],
+            )
+            transaction.on_commit(partial(get_leaderboard().set_score, course_id, user_id, points), using=alias)
+            return
+
+        scores = manager.filter(user_id=user_id, course_id=course_id, season_id=season_id)
+        if not scores.update(points=F('points') + points):
+            try:
+                with transaction.atomic(using=alias):
+                    # Nový záznam zapíše do rebríčka signál post_save
+                    manager.create(user_id=user_id, course_id=course_id, season_id=season_id, points=points)
+                return
+            except IntegrityError:
+                # Záznam medzitým vytvorila súbežná požiadavka
+                if not scores.update(points=F('points') + points):
+                    raise
+        transaction.on_commit(partial(get_leaderboard().increment, course_id, user_id, points), using=alias)
+
+    def bulk_upsert(self, entries, increment=False):
+        """
+        Zapíše skóre aktuálnej sezóny pre viacero dvojíc (používateľ, kurz).
+
+        Zápisy do jednej databázy skupiny kurzov (viď `otazky/sharding.py`) prebehnú
+        v jednej transakcii, bez shardingu je teda celá dávka jedna transakcia. Existujúce
+        záznamy sa načítajú jedným dotazom a zapíšu cez `bulk_update`, nové cez `bulk_create`. Viac položiek pre rovnakú dvojicu sa zlúči – v režime
+        `increment` sa body sčítajú, inak platí posledná hodnota. Rebríček sa aktualizuje po potvrdení transakcie.
+
+        Args:
+            entries (list[tuple]): Trojice `(user_id, course_id, points)`.
+            increment (bool): True = pripočítať body, False = prepísať body.
+
+        Returns:
+            dict: Pre každú dvojicu `(user_id, course_id)` hodnota `"created"` alebo `"updated"`.
+        """
+        from .sharding import group_by_shard
+
+        merged = {}
+        for user_id, course_id, points in entries:
+            key = (user_id, course_id)
+            merged[key] = merged.get(key, 0) + points if increment else points
+        if not merged:
+            return {}
+
+        season_id = Season.objects.current_id()
+        statuses = {}
+        course_ids = {course_id for _, course_id in merged}
+        for alias, shard_course_ids in group_by_shard(course_ids).items():
+            manager = self.db_manager(alias)
+            shard_entries = {key: points for key, points in merged.items() if key[1] in shard_course_ids}
+            with transaction.atomic(using=alias):
+                existing = {
+                    (score.user_id, score.course_id): score
+                    for score in manager.select_for_update().filter(
+                        season_id=season_id,
+                        user_id__in={user_id for user_id, _ in shard_entries},
+                        course_id__in=shard_course_ids,
+                    )
+                }
+                to_update, to_create = [], []
+                for (user_id, course_id), points in shard_entries.items():
+                    score = existing.get((user_id, course_id))
+                    if score is None:
+                        to_create.append(Score(user_id=user_id, course_id=course_id, season_id=season_id, points=points))
+                        statuses[(user_id, course_id)] = "created"
+                    else:
+                        score.points = score.points + points if increment else points
+                        to_update.append(score)
+                        statuses[(user_id, course_id)] = "updated"
+                manager.bulk_update(to_update, ['points'], batch_size=500)
+                manager.bulk_create(to_create, batch_size=500)
+                transaction.on_commit(partial(_write_leaderboard, to_update + to_create), using=alias)
+        return statuses
+
+
+def _write_leaderboard(scores):
+    """
+    Zapíše body uložených záznamov skóre do rebríčkov ich kurzov.
+    """
+    from .leaderboard import get_leaderboard
+
+    leaderboard = get_leaderboard()
+    for score in scores:
+        leaderboard.set_score(score.course_id, score.user_id, score.points)
+
+
 class Score(models.Model):
     """
     Model reprezentujúci skóre používateľa v konkrétnom kurze.
 
+    Každý používateľ má v kurze najviac jeden záznam skóre v rámci sezóny.
+
     Attributes:
         id (UUID): Unikátne ID skóre.
         points (int): Počet získaných bodov.
         user (User): Používateľ, ktorý skóre dosiahol.
         course (Course): Kurz, ku ktorému skóre patrí.
+        season (Season): Sezóna, v ktorej bolo skóre dosiahnuté (predvolene aktuálna).
     """   
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
         editable=False)
     points = models.IntegerField(default=0)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE,default="1")
+    # Skóre môže byť v inej databáze ako používateľ, kurz a sezóna (viď otazky/sharding.py)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE,default="1", db_constraint=False)
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, default=current_season_id, db_constraint=False)
+
+    objects = ScoreManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'user', 'course'], name='unique_score_per_season_user_course'),
+        ]
+        indexes = [
+            # Rebríček kurzu v sezóne zoradený podľa bodov (načítanie rebríčka, história sezóny)
+            models.Index(fields=['season', 'course', '-points', 'user'], name='score_season_course_points_idx'),
+        ]
+
+
+class SeasonStanding(models.Model):
+    """
+    Model reprezentujúci archivovaný rebríček kurzu za uzavretú sezónu.
+
+    Po uzavretí sezóny sa rebríček každého kurzu uloží ako jeden riadok a skóre
+    sezóny sa z tabuľky `Score` zmaže. Historický rebríček je tak jedno čítanie
+    podľa indexu `(season, course)`.
+
+    Attributes:
+        season (Season): Uzavretá sezóna.
+        course (Course): Kurz.
+        ranking (list): Riadky rebríčka `[poradie, ID používateľa, body]` zoradené zostupne podľa bodov.
+    """
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name='standings')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    ranking = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'course'], name='unique_standing_per_season_course'),
+        ]
 
 class Okruh(models.Model):
     """
@@ -56,13 +296,38 @@ class Okruh(models.Model):
     name = models.CharField(max_length=255, unique=False, default="")
     description = models.CharField(max_length=255, unique=False, default="")
     available = models.BooleanField(default=False)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
-    finished_by = models.ManyToManyField(User, blank=True)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_constraint=False)
+    finished_by = models.ManyToManyField(User, blank=True, db_constraint=False)
+
+    objects = CourseScopedQuerySet.as_manager()
+
     def __str__(self):
         """Vráti názov okruhu ako reťazec."""
         return self.name
 
 
+class CourseCompletion(models.Model):
+    """
+    Model reprezentujúci počet dokončených okruhov používateľa v kurze.
+
+    Počítadlo sa udržiava signálmi pri zmene `Okruh.finished_by` a pri mazaní okruhov,
+    od nuly ho prepočíta príkaz `rebuild_course_completion`.
+
+    Attributes:
+        user (User): Používateľ.
+        course (Course): Kurz.
+        completed (int): Počet okruhov kurzu, ktoré používateľ dokončil.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    completed = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='unique_completion_per_user_course'),
+        ]
+
+
 class Question(models.Model):
     """
     Model reprezentujúci otázku.
@@ -90,13 +355,29 @@ class Question(models.Model):
     approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     visible = models.BooleanField(default=False)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     likes = models.IntegerField(default=0)
     reported = models.BooleanField(default=False)
     okruh = models.ForeignKey(Okruh, on_delete=models.CASCADE)
     is_text_question = models.BooleanField(default=False)
     ai_context = models.CharField(max_length=255, default="", blank="True")
 
+    objects = CourseScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Otázky okruhu stránkované podľa (created_at, id)
+            models.Index(fields=['okruh', 'created_at', 'id'], name='question_okruh_created_idx'),
+            # Viditeľné a schválené otázky okruhu (balík okruhu, výber otázok výzvy)
+            models.Index(
+                fields=['okruh', 'created_at', 'id'],
+                condition=Q(visible=True, approved=True),
+                name='question_published_idx',
+            ),
+            # Nahlásené otázky okruhu
+            models.Index(fields=['okruh', 'id'], condition=Q(reported=True), name='question_reported_idx'),
+        ]
+
     def __str__(self):
         """Vráti názov otázky ako reťazec."""
         return self.name
@@ -120,6 +401,8 @@ class Answer(models.Model):
     text = models.TextField(default="")
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
 
+    objects = CourseScopedQuerySet.as_manager()
+
     def __str__(self):
         return self.text
 
@@ -142,10 +425,19 @@ class Comment(models.Model):
         editable=False)
     text = models.TextField(default="")
     created_at = models.DateTimeField(auto_now_add=True)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     likes = models.IntegerField(default=0)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
 
+    objects = CourseScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Komentáre otázky stránkované podľa (created_at, id)
+            models.Index(fields=['question', 'created_at', 'id'], name='comment_question_created_idx'),
+        ]
+
+
 class ChalangeQuestion(models.Model):
     """
     Model reprezentujúci priradenie otázky k výzve.
@@ -159,9 +451,74 @@ class ChalangeQuestion(models.Model):
         primary_key=True,
         default=uuid.uuid4,
         editable=False)
-    courseID = models.ForeignKey(Course, on_delete=models.CASCADE)
+    courseID = models.ForeignKey(Course, on_delete=models.CASCADE, db_constraint=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
 
+    objects = CourseScopedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Otázky výzvy kurzu bez čítania tabuľky (krycí index)
+            models.Index(fields=['courseID', 'question'], name='challenge_course_question_idx'),
+        ]
+
+
+class QuestionSearch(models.Model):
+    """
+    Model reprezentujúci dokument fulltextového vyhľadávania otázky.
+
+    Riadky sú obsahom (external content) virtuálnej tabuľky FTS5 `otazky_questionsearch_fts`,
+    ktorú udržiavajú triggery v databáze. Dokument prepočítava `otazky.search.index_question`
+    po zmene otázky, odpovede alebo komentára (viď `otazky/signals.py`).
+
+    Attributes:
+        question (Question): Otázka, ktorej dokument patrí.
+        okruh (Okruh): Okruh otázky (filtrovanie výsledkov podľa okruhu a kurzu).
+        name (str): Názov otázky.
+        text (str): Text otázky.
+        answers (str): Texty odpovedí otázky.
+        comments (str): Texty komentárov otázky.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='search_document')
+    okruh = models.ForeignKey(Okruh, on_delete=models.CASCADE)
+    name = models.CharField(max_length=255, default="")
+    text = models.TextField(default="")
+    answers = models.TextField(default="")
+    comments = models.TextField(default="")
+
+    objects = CourseScopedQuerySet.as_manager()
+
+
+class ChallengeSnapshot(models.Model):
+    """
+    Model reprezentujúci pripravenú (serializovanú) týždennú výzvu kurzu.
+
+    Attributes:
+        course (Course): Kurz, ku ktorému výzva patrí.
+        payload (list): Serializované otázky výzvy vo formáte `QuestionSerializer`.
+        etag (str): ETag vypočítaný z `payload`.
+        generated_at (datetime): Dátum a čas vygenerovania.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True)
+    payload = models.JSONField(default=list)
+    etag = models.CharField(max_length=66)
+    generated_at = models.DateTimeField(auto_now=True)
+
+
+class ContentVersion(models.Model):
+    """
+    Model reprezentujúci verziu obsahu (napr. kurzu) pre podmienené GET požiadavky.
+
+    Attributes:
+        key (str): Kľúč verzie, napr. `course:<id>` alebo `courses`.
+        version (int): Monotónne rastúce číslo verzie.
+        updated_at (datetime): Čas poslednej zmeny obsahu.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+
 class Achievement(models.Model):
     """
     Model reprezentujúci achievement.
@@ -192,7 +549,7 @@ class Achievement(models.Model):
         Returns:
             bool: True, ak bol achievement pridaný, False ak už ho mal.
         """
-        if user not in self.awarded_to.all():
-            self.awarded_to.add(user)
-            return True
-        return False
+        if self.awarded_to.filter(pk=user.pk).exists():
+            return False
+        self.awarded_to.add(user)
+        return True
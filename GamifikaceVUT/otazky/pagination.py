@@ -0,0 +1,255 @@
+"""
+Stránkovanie pre Django REST Framework pre aplikáciu Gamifikace.
+
+Obsahuje kurzorové (keyset) stránkovanie, pri ktorom sa ďalšia strana vyberá podmienkou
+na zoradené stĺpce (napr. `created_at`, `id`) namiesto `OFFSET`. Vďaka tomu stojí
+hlboká strana rovnako ako prvá. Stránkovanie je voliteľné – zapne sa iba vtedy, keď
+požiadavka obsahuje parameter `cursor` alebo `page_size`, inak endpoint vráti celý zoznam
+ako doteraz.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Kurzorové stránkovanie podľa zoradenia `keyset_ordering` definovaného na view.
+
+    Zoradenie musí byť jednoznačné (posledný stĺpec je primárny kľúč), aby bolo
+    poradie stabilné. Kurzor je nepriehľadný reťazec s hodnotami stĺpcov posledného
+    riadku strany.
+
+    Attributes:
+        cursor_query_param (str): Názov parametra s kurzorom.
+        page_size_query_param (str): Názov parametra s veľkosťou strany.
+        max_page_size (int): Maximálna povolená veľkosť strany.
+        default_ordering (tuple): Zoradenie pre view bez `keyset_ordering`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    default_ordering = ('pk',)
+
+    def is_requested(self, request):
+        """
+        Vráti True, ak požiadavka o stránkovanie žiada.
+        """
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        """
+        Vráti veľkosť strany z query parametra, obmedzenú na `max_page_size`.
+        """
+        page_size = request.query_params.get(self.page_size_query_param, '')
+        if page_size.isdigit() and int(page_size) > 0:
+            return min(int(page_size), self.max_page_size)
+        return api_settings.PAGE_SIZE or self.max_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Vráti jednu stranu querysetu, alebo None, ak sa stránkovanie nepožaduje.
+
+        Args:
+            queryset (QuerySet): Queryset na stránkovanie.
+            request (Request): Objekt HTTP požiadavky.
+            view (APIView, optional): View, z ktorého sa číta `keyset_ordering`.
+
+        Returns:
+            list | None: Objekty na aktuálnej strane.
+
+        Raises:
+            NotFound: Ak je kurzor neplatný.
+        """
+        if not self.is_requested(request) or not isinstance(queryset, QuerySet):
+            return None
+        ordering = getattr(view, 'keyset_ordering', self.default_ordering)
+        return self.paginate_ordered(queryset, request, ordering, self.decode_cursor(request))
+
+    def paginate_ordered(self, queryset, request, ordering, position=None):
+        """
+        Vráti stranu querysetu v danom zoradení začínajúcu za pozíciou.
+
+        Na rozdiel od `paginate_queryset` sa použije vždy, napr. pre prvú stranu
+        zoznamu vloženú do inej odpovede.
+
+        Args:
+            queryset (QuerySet): Queryset na stránkovanie.
+            request (Request): Objekt HTTP požiadavky.
+            ordering (Iterable[str]): Jednoznačné zoradenie.
+            position (list, optional): Pozícia z kurzora. None = prvá strana.
+
+        Returns:
+            list: Objekty na strane.
+
+        Raises:
+            NotFound: Ak pozícia nezodpovedá zoradeniu.
+        """
+        rows = list(self._page_queryset(queryset, request, ordering, position))
+        return self._page(rows, ordering)
+
+    def paginate_fan_out(self, queryset, request, ordering, position=None):
+        """
+        Vráti stranu querysetu zo všetkých databáz skupín kurzov (viď `otazky/sharding.py`).
+
+        Z každej databázy sa načíta strana za pozíciou, výsledky sa spoja v danom zoradení.
+        """
+        from .sharding import fan_out, sort_rows
+
+        rows = []
+        for shard_queryset in fan_out(queryset):
+            rows.extend(self._page_queryset(shard_queryset, request, ordering, position))
+        sort_rows(rows, ordering)
+        return self._page(rows[:self.page_size + 1], ordering)
+
+    async def apaginate_ordered(self, queryset, request, ordering, position=None):
+        """
+        Asynchrónna verzia `paginate_ordered` (dotaz cez `async for`).
+        """
+        rows = [row async for row in self._page_queryset(queryset, request, ordering, position)]
+        return self._page(rows, ordering)
+
+    def _page_queryset(self, queryset, request, ordering, position):
+        """
+        Vráti queryset s jednou stranou (a jedným riadkom navyše) za pozíciou.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = tuple(ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            if len(position) != len(ordering):
+                raise NotFound('Invalid cursor')
+            try:
+                queryset = queryset.filter(self._after(ordering, position))
+            except (ValidationError, ValueError, TypeError):
+                # Kurzor sa dal dekódovať, ale hodnoty nezodpovedajú typom stĺpcov
+                raise NotFound('Invalid cursor')
+        return queryset[:self.page_size + 1]
+
+    def _page(self, rows, ordering):
+        """
+        Oddelí stranu od riadku navyše a zapamätá si pozíciu ďalšej strany.
+        """
+        page = rows[:self.page_size]
+        self.next_position = None
+        if len(rows) > self.page_size:
+            self.next_position = [self._value(page[-1], field.lstrip('-')) for field in ordering]
+        return page
+
+    def paginate_sequence(self, fetch, request):
+        """
+        Stránkuje zoznam, ktorý vie vrátiť ľubovoľný výrez lacno (napr. rebríček).
+
+        Kurzor v tomto prípade obsahuje pozíciu v zozname.
+
+        Args:
+            fetch (callable): Funkcia `fetch(offset, limit)` vracajúca položky výrezu.
+            request (Request): Objekt HTTP požiadavky.
+
+        Returns:
+            list | None: Položky na aktuálnej strane, alebo None, ak sa stránkovanie nepožaduje.
+        """
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is not None and (len(position) != 1 or not isinstance(position[0], int)):
+            raise NotFound('Invalid cursor')
+        offset = position[0] if position else 0
+
+        rows = fetch(offset, self.page_size + 1)
+        self.next_position = [offset + self.page_size] if len(rows) > self.page_size else None
+        return rows[:self.page_size]
+
+    def get_paginated_response(self, data):
+        """
+        Vráti odpoveď so stranou výsledkov a odkazom na ďalšiu stranu.
+        """
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self, url=None):
+        """
+        Vráti URL ďalšej strany, alebo None, ak ide o poslednú stranu.
+
+        Args:
+            url (str, optional): URL zoznamu, ku ktorému sa pridá kurzor. Predvolene URL požiadavky.
+        """
+        if self.next_position is None:
+            return None
+        url = url or self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        """
+        Zakóduje pozíciu (hodnoty zoradených stĺpcov) do nepriehľadného kurzora.
+        """
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Dekóduje kurzor z query parametrov.
+
+        Returns:
+            list | None: Pozícia z kurzora, alebo None pre prvú stranu.
+
+        Raises:
+            NotFound: Ak kurzor nie je možné dekódovať.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position = json.loads(data)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list):
+            raise NotFound('Invalid cursor')
+        return position
+
+    def _after(self, ordering, position):
+        """
+        Zostaví podmienku pre riadky nasledujúce za pozíciou v danom zoradení.
+
+        Pre zoradenie `(a, b)` vznikne `a > x OR (a = x AND b > y)`, pri zostupnom
+        zoradení stĺpca sa použije `<`.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _value(self, obj, name):
+        """
+        Vráti hodnotu stĺpca objektu v tvare vhodnom pre JSON kurzor.
+        """
+        value = getattr(obj, name)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
@@ -0,0 +1,241 @@
+"""
+Kvízové relácie pre aplikáciu Gamifikace.
+
+Pri začatí kvízu server vyberie otázky okruhu (iba viditeľné a schválené) alebo otázky
+výzvy kurzu, zamieša ich poradie a uloží reláciu do cache. Klient potom načíta otázky
+po dávkach spolu s odpoveďami – každá dávka sú dva dotazy (otázky a ich odpovede)
+bez ohľadu na veľkosť okruhu. Odpovede v dávkach neobsahujú správnosť (`answer_type`),
+vybrané odpovede vyhodnotí server naraz pri ukončení kvízu (`grade_session`) a body
+pripočíta do skóre kurzu.
+
+Stav relácie je v cache pod kľúčom `quiz:<id>`: ID používateľa, kurzu a okruhu, alias
+databázy skupiny kurzu a ID otázok ako jeden reťazec bajtov (16 B na otázku). Pozícia
+ďalšej dávky je samostatné počítadlo `quiz:<id>:position`, ktoré sa posúva atomicky
+(`cache.incr`) – súbežné požiadavky o dávku tak dostanú rôzne otázky. Relácia vyprší
+po `QUIZ_SESSION_TIMEOUT` sekundách od poslednej dávky.
+"""
+
+import random
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .challenge import challenge_payload
+from .models import Answer, Question, Score
+from .sharding import shard_for_course
+from .versions import okruh_course_id
+
+QUIZ_CACHE_KEY = 'quiz:{session_id}'
+QUIZ_POSITION_KEY = 'quiz:{session_id}:position'
+DEFAULT_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 50
+UUID_SIZE = 16
+# Body za jednu správne zodpovedanú otázku
+POINTS_PER_QUESTION = 1
+
+
+def pack_ids(question_ids):
+    """
+    Zbalí ID otázok do jedného reťazca bajtov.
+    """
+    return b''.join(question_id.bytes for question_id in question_ids)
+
+
+def unpack_ids(packed, start=0, stop=None):
+    """
+    Vráti ID otázok na pozíciách `start` až `stop` zo zbaleného reťazca.
+    """
+    stop = len(packed) // UUID_SIZE if stop is None else min(stop, len(packed) // UUID_SIZE)
+    return [uuid.UUID(bytes=packed[index * UUID_SIZE:(index + 1) * UUID_SIZE]) for index in range(start, stop)]
+
+
+def _keys(session_id):
+    return QUIZ_CACHE_KEY.format(session_id=session_id), QUIZ_POSITION_KEY.format(session_id=session_id)
+
+
+def _save(session):
+    key, position_key = _keys(session['id'])
+    data = {name: value for name, value in session.items() if name != 'position'}
+    cache.set_many({key: data, position_key: session['position']}, timeout=settings.QUIZ_SESSION_TIMEOUT)
+
+
+def start_session(user_id, okruh_id=None, course_id=None):
+    """
+    Začne kvíz z otázok okruhu alebo z výzvy kurzu.
+
+    Otázky okruhu sa vyberú jedným dotazom (index `question_published_idx`),
+    otázky výzvy sa prevezmú z pripravenej výzvy kurzu (viď `otazky/challenge.py`).
+
+    Args:
+        user_id: ID používateľa, ktorému relácia patrí.
+        okruh_id: ID okruhu (kvíz z okruhu).
+        course_id: ID kurzu (kvíz z výzvy kurzu), použije sa, ak `okruh_id` chýba.
+
+    Returns:
+        dict | None: Nová relácia, alebo None, ak okruh neexistuje alebo nemá žiadne otázky.
+    """
+    if okruh_id is not None:
+        course_id = okruh_course_id(okruh_id)
+        if course_id is None:
+            return None
+        question_ids = list(
+            Question.objects.using(shard_for_course(course_id))
+            .filter(okruh_id=okruh_id, visible=True, approved=True)
+            .values_list('id', flat=True)
+        )
+    else:
+        payload, _ = challenge_payload(course_id)
+        question_ids = [Question._meta.pk.to_python(question['id']) for question in payload]
+    if not question_ids:
+        return None
+
+    random.shuffle(question_ids)
+    session = {
+        'id': uuid.uuid4().hex,
+        'user_id': user_id,
+        'course_id': course_id,
+        'okruh_id': okruh_id,
+        'alias': shard_for_course(course_id),
+        'questions': pack_ids(question_ids),
+        'position': 0,
+    }
+    _save(session)
+    return session
+
+
+def get_session(session_id, user_id):
+    """
+    Vráti reláciu používateľa, alebo None, ak neexistuje, vypršala alebo patrí inému používateľovi.
+
+    Pozícia (`position`) je počet zobrazených otázok v čase čítania.
+    """
+    key, position_key = _keys(session_id)
+    values = cache.get_many([key, position_key])
+    session = values.get(key)
+    if session is None or session['user_id'] != user_id or position_key not in values:
+        return None
+    session['position'] = min(values[position_key], session_total(session))
+    return session
+
+
+def session_total(session):
+    """
+    Vráti počet otázok relácie.
+    """
+    return len(session['questions']) // UUID_SIZE
+
+
+def next_batch(session, count=DEFAULT_BATCH_SIZE):
+    """
+    Načíta ďalšiu dávku otázok relácie s odpoveďami a posunie pozíciu relácie.
+
+    Pozícia sa posunie atomicky ešte pred načítaním otázok, súbežné požiadavky tak
+    dostanú rôzne dávky. Otázky zmazané od začatia kvízu sa preskočia.
+
+    Args:
+        session (dict): Relácia z `get_session`.
+        count (int): Počet otázok v dávke.
+
+    Returns:
+        list[Question]: Otázky dávky v poradí relácie s prednačítanými odpoveďami (`answer_set`).
+    """
+    keys = _keys(session['id'])
+    try:
+        end = cache.incr(keys[1], count)
+    except ValueError:
+        # Relácia medzitým vypršala alebo bola ukončená
+        return []
+    cache.touch(keys[0], settings.QUIZ_SESSION_TIMEOUT)
+    cache.touch(keys[1], settings.QUIZ_SESSION_TIMEOUT)
+    question_ids = unpack_ids(session['questions'], end - count, end)
+    questions = (
+        Question.objects.using(session['alias']).prefetch_related('answer_set').in_bulk(question_ids)
+        if question_ids else {}
+    )
+    session['position'] = min(end, session_total(session))
+    return [questions[question_id] for question_id in question_ids if question_id in questions]
+
+
+def claim_session(session):
+    """
+    Zmaže reláciu z cache.
+
+    Returns:
+        bool: True, ak reláciu zmazala táto požiadavka (súbežná požiadavka ju ešte neukončila).
+    """
+    key, position_key = _keys(session['id'])
+    claimed = cache.delete(key)
+    cache.delete(position_key)
+    return claimed
+
+
+def finish_session(session):
+    """
+    Ukončí reláciu bez vyhodnotenia a zmaže ju z cache.
+
+    Returns:
+        dict: Počet zobrazených otázok (`served`) a počet otázok relácie (`total`).
+    """
+    claim_session(session)
+    return {'served': session['position'], 'total': session_total(session)}
+
+
+def grade_session(session, answer_ids):
+    """
+    Vyhodnotí vybrané odpovede kvízu a pripočíta body do skóre používateľa v kurze.
+
+    Odpovede všetkých zobrazených otázok sa načítajú jedným `in_bulk` dotazom. Otázka
+    je zodpovedaná správne, ak sa vybrané odpovede zhodujú s jej správnymi odpoveďami.
+    Odpovede k nezobrazeným otázkam sa ignorujú. Body sa zapíšu v rovnakej transakcii
+    ako čítanie odpovedí. Relácia sa vyhodnotí iba raz (viď `claim_session`).
+
+    Args:
+        session (dict): Relácia z `get_session`.
+        answer_ids (Iterable[UUID]): ID vybraných odpovedí.
+
+    Returns:
+        dict | None: Výsledky otázok (`results`), počet správnych (`correct`), počet
+            zobrazených otázok (`served`), počet otázok relácie (`total`) a pripočítané
+            body (`points`), alebo None, ak relácia už bola ukončená.
+    """
+    if not claim_session(session):
+        return None
+    question_ids = unpack_ids(session['questions'], 0, session['position'])
+    alias = session['alias']
+    with transaction.atomic(using=alias):
+        answers = (
+            Answer.objects.using(alias).filter(question_id__in=question_ids)
+            .only('id', 'answer_type', 'question_id').in_bulk()
+            if question_ids else {}
+        )
+        expected = {question_id: set() for question_id in question_ids}
+        selected = {question_id: set() for question_id in question_ids}
+        for answer in answers.values():
+            if answer.answer_type:
+                expected[answer.question_id].add(answer.id)
+        for answer_id in answer_ids:
+            answer = answers.get(answer_id)
+            if answer is not None:
+                selected[answer.question_id].add(answer.id)
+
+        results = [
+            {
+                'question': question_id,
+                'correct': bool(expected[question_id]) and selected[question_id] == expected[question_id],
+                'correct_answers': sorted(expected[question_id]),
+            }
+            for question_id in question_ids
+        ]
+        correct = sum(result['correct'] for result in results)
+        points = correct * POINTS_PER_QUESTION
+        if points:
+            Score.objects.upsert(session['user_id'], session['course_id'], points, increment=True)
+    return {
+        'results': results,
+        'correct': correct,
+        'served': len(question_ids),
+        'total': session_total(session),
+        'points': points,
+    }
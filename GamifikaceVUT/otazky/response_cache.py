@@ -0,0 +1,253 @@
+"""
+Cache odpovedí endpointov na čítanie pre aplikáciu Gamifikace.
+
+Serializované dáta odpovede sa ukladajú do cache pod kľúčom zloženým z názvu endpointu,
+verzie obsahu (viď `otazky/versions.py`) a query parametrov. Signály v `otazky/signals.py`
+pri zmene dát zvýšia verziu obsahu, čím sa záznamy so starou verziou prestanú používať –
+invalidácia je cielená a nezávisí od TTL. Timeout `RESPONSE_CACHE_TIMEOUT` slúži iba na
+uvoľnenie pamäte po nahradených verziách.
+
+Počty lajkov sa ukladajú bez čakajúcich zmien a pri každej odpovedi sa nahradia aktuálnou
+hodnotou (`merge_live_likes`, viď `otazky/likes.py`) – lajk teda nemení verziu obsahu ani
+uložené odpovede.
+
+Použitá cache je `default` z nastavenia `CACHES` (lokálne LocMem alebo súborová,
+v produkcii Redis). Počet zásahov a výpadkov cache sa zaznamenáva pre každý endpoint,
+zobrazí ho príkaz `response_cache_stats`. Asynchrónne endpointy (viď `otazky/async_views.py`)
+používajú `acached_response` s rovnakými kľúčmi, takže synchrónne a asynchrónne endpointy
+zdieľajú uložené odpovede.
+"""
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .conditional import is_not_modified
+from .likes import merge_live_likes
+from .versions import ContentVersionMixin, acontent_version, content_version, version_etag, version_headers
+
+RESPONSE_CACHE_KEY = 'response:{endpoint}:{version_key}:{version}:{params}'
+STATS_CACHE_KEY = 'response_cache:{outcome}:{endpoint}'
+ENDPOINTS = ('courses', 'lectures', 'questions', 'answers', 'achievements')
+
+
+def _params_digest(request):
+    """
+    Vráti odtlačok hostiteľa a query parametrov požiadavky (nezávislý od ich poradia).
+    """
+    params = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    return hashlib.sha256(repr((request.get_host(), params)).encode()).hexdigest()[:32]
+
+
+def record(endpoint, outcome):
+    """
+    Zvýši počítadlo zásahov (`hit`) alebo výpadkov (`miss`) cache endpointu.
+    """
+    key = STATS_CACHE_KEY.format(outcome=outcome, endpoint=endpoint)
+    if cache.add(key, 1, timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Kľúč medzitým vypršal alebo bol vymazaný
+        cache.add(key, 1, timeout=None)
+
+
+async def arecord(endpoint, outcome):
+    """
+    Asynchrónna verzia `record`.
+    """
+    key = STATS_CACHE_KEY.format(outcome=outcome, endpoint=endpoint)
+    if await cache.aadd(key, 1, timeout=None):
+        return
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=None)
+
+
+def stats(endpoints=ENDPOINTS):
+    """
+    Vráti počítadlá zásahov a výpadkov cache.
+
+    Returns:
+        dict[str, dict]: Endpoint -> `{'hit': int, 'miss': int}`.
+    """
+    keys = {
+        (endpoint, outcome): STATS_CACHE_KEY.format(outcome=outcome, endpoint=endpoint)
+        for endpoint in endpoints
+        for outcome in ('hit', 'miss')
+    }
+    values = cache.get_many(keys.values())
+    result = {endpoint: {'hit': 0, 'miss': 0} for endpoint in endpoints}
+    for (endpoint, outcome), key in keys.items():
+        result[endpoint][outcome] = values.get(key, 0)
+    return result
+
+
+def reset_stats(endpoints=ENDPOINTS):
+    """
+    Vynuluje počítadlá zásahov a výpadkov cache.
+    """
+    cache.delete_many([
+        STATS_CACHE_KEY.format(outcome=outcome, endpoint=endpoint)
+        for endpoint in endpoints
+        for outcome in ('hit', 'miss')
+    ])
+
+
+def _merge_likes(likes_model, data):
+    """
+    Nastaví aktuálne počty lajkov v riadkoch zoznamu (celého alebo strany `results`).
+    """
+    if likes_model is not None:
+        merge_live_likes(likes_model, data['results'] if isinstance(data, dict) else data)
+    return data
+
+
+def cached_response(request, endpoint, version_key, get_response, likes_model=None, variant=None):
+    """
+    Vráti odpoveď z cache, alebo ju zostaví a uloží.
+
+    Najprv sa podľa verzie obsahu vyhodnotí podmienená požiadavka (304). Uložia sa
+    iba úspešné odpovede (200). Odpoveď nesie hlavičku `X-Cache` (`HIT`/`MISS`).
+
+    Args:
+        request (Request): Objekt HTTP požiadavky.
+        endpoint (str): Názov endpointu (prvá časť kľúča a názov počítadiel).
+        version_key (str): Kľúč verzie obsahu, od ktorej dáta závisia.
+        get_response (callable): Funkcia bez argumentov vracajúca odpoveď s dátami.
+        likes_model (type[Model], optional): Model riadkov s lajkami – `get_response` ich vráti
+            bez čakajúcich zmien, aktuálne počty sa nastavia až v uložených dátach.
+        variant (str, optional): Variant dát pre rovnakú verziu obsahu (napr. pre správcov),
+            odlišuje kľúč v cache aj ETag.
+
+    Returns:
+        Response: Odpoveď s hlavičkami `ETag` a `Last-Modified`.
+    """
+    version, updated_at = content_version(version_key)
+    etag_key = variant_key(version_key, variant)
+    if is_not_modified(request, version_etag(etag_key, version), updated_at):
+        return version_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag_key, version, updated_at)
+
+    key = RESPONSE_CACHE_KEY.format(
+        endpoint=endpoint, version_key=etag_key, version=version, params=_params_digest(request)
+    )
+    data = cache.get(key)
+    if data is not None:
+        record(endpoint, 'hit')
+        response = Response(_merge_likes(likes_model, data))
+        response['X-Cache'] = 'HIT'
+    else:
+        record(endpoint, 'miss')
+        response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            _merge_likes(likes_model, response.data)
+        response['X-Cache'] = 'MISS'
+    return version_headers(response, etag_key, version, updated_at)
+
+
+def variant_key(version_key, variant=None):
+    """
+    Vráti kľúč verzie obsahu rozšírený o variant dát (pre ETag a kľúč v cache).
+    """
+    return f'{version_key}:{variant}' if variant else version_key
+
+
+def json_response(data=None, status=status.HTTP_200_OK):
+    """
+    Vráti `HttpResponse` s dátami vo formáte JSON rovnakom ako odpoveď DRF.
+
+    Pre asynchrónne endpointy, ktoré nepoužívajú `APIView`. Dáta sú dostupné aj
+    v atribúte `data` (ako pri `Response`).
+    """
+    content = JSONRenderer().render(data) if data is not None else b''
+    response = HttpResponse(content, status=status, content_type='application/json')
+    response.data = data
+    return response
+
+
+async def acached_response(request, endpoint, version_key, get_response, likes_model=None):
+    """
+    Asynchrónna verzia `cached_response`.
+
+    Args:
+        request (HttpRequest): Objekt HTTP požiadavky.
+        endpoint (str): Názov endpointu (prvá časť kľúča a názov počítadiel).
+        version_key (str): Kľúč verzie obsahu, od ktorej dáta závisia.
+        get_response (callable): Korutínová funkcia bez argumentov vracajúca odpoveď
+            z `json_response`.
+        likes_model (type[Model], optional): Model riadkov s lajkami (viď `cached_response`).
+
+    Returns:
+        HttpResponse: Odpoveď s hlavičkami `ETag` a `Last-Modified`.
+    """
+    version, updated_at = await acontent_version(version_key)
+    if is_not_modified(request, version_etag(version_key, version), updated_at):
+        return version_headers(json_response(status=status.HTTP_304_NOT_MODIFIED), version_key, version, updated_at)
+
+    key = RESPONSE_CACHE_KEY.format(
+        endpoint=endpoint, version_key=version_key, version=version, params=_params_digest(request)
+    )
+    data = await cache.aget(key)
+    if data is not None:
+        await arecord(endpoint, 'hit')
+        response = json_response(await sync_to_async(_merge_likes)(likes_model, data))
+        response['X-Cache'] = 'HIT'
+    else:
+        await arecord(endpoint, 'miss')
+        response = await get_response()
+        if response.status_code != status.HTTP_200_OK:
+            # Chybová odpoveď bez hlavičiek verzie, ako pri výnimke v synchrónnom endpointe
+            return response
+        await cache.aset(key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        if likes_model is not None:
+            response = json_response(await sync_to_async(_merge_likes)(likes_model, response.data))
+        response['X-Cache'] = 'MISS'
+    return version_headers(response, version_key, version, updated_at)
+
+
+class CachedResponseMixin(ContentVersionMixin):
+    """
+    Mixin pre `ListAPIView`, ktorý okrem podmieneného GET ukladá odpovede do cache.
+
+    Podtrieda nastaví `cache_endpoint` a implementuje `get_version_key()`. Ak riadky
+    obsahujú lajky, nastaví `likes_model` – do cache sa uložia bez čakajúcich zmien. Ak sa
+    dáta líšia podľa používateľa, `get_cache_variant()` vráti názov variantu.
+    """
+    cache_endpoint = None
+    likes_model = None
+    pending_likes = True
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'pending_likes': self.pending_likes}
+
+    def get_cache_variant(self):
+        """
+        Vráti variant dát pre aktuálnu požiadavku, alebo None.
+        """
+        return None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti zoznam z cache, alebo 304, ak má klient aktuálnu verziu obsahu.
+        """
+        key = self.get_version_key()
+        if key is None:
+            return super(ContentVersionMixin, self).list(request, *args, **kwargs)
+        self.pending_likes = False
+        return cached_response(
+            request,
+            self.cache_endpoint,
+            key,
+            lambda: super(ContentVersionMixin, self).list(request, *args, **kwargs),
+            likes_model=self.likes_model,
+            variant=self.get_cache_variant(),
+        )
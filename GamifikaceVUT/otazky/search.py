@@ -0,0 +1,163 @@
+"""
+Fulltextové vyhľadávanie otázok (SQLite FTS5).
+
+Každá otázka má dokument `QuestionSearch` s názvom, textom, textami odpovedí a komentárov.
+Virtuálna tabuľka FTS5 `otazky_questionsearch_fts` indexuje dokumenty s tokenizáciou
+`unicode61 remove_diacritics 2`, takže dotaz "kvantova" nájde aj "kvantová". Index udržiavajú
+triggery nad tabuľkou dokumentov (migrácia `0027_question_search`), dokumenty prepočítavajú
+signály po potvrdení transakcie, v ktorej sa zmenila otázka, odpoveď alebo komentár.
+
+Výsledky sa zoraďujú podľa bm25 s váhami stĺpcov `SEARCH_WEIGHTS`.
+"""
+
+import re
+import uuid
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .sharding import shard_aliases, shard_for_course, shard_for_okruh
+
+SEARCH_TABLE = 'otazky_questionsearch_fts'
+# Váhy bm25 pre stĺpce name, text, answers, comments
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+REBUILD_SQL = """
+    INSERT INTO otazky_questionsearch (question_id, okruh_id, name, text, answers, comments)
+    SELECT q.id, q.okruh_id, q.name, q.text,
+        COALESCE((SELECT group_concat(a.text, ' ') FROM otazky_answer a WHERE a.question_id = q.id), ''),
+        COALESCE((SELECT group_concat(c.text, ' ') FROM otazky_comment c WHERE c.question_id = q.id), '')
+    FROM otazky_question q
+"""
+
+
+def match_query(text):
+    """
+    Zostaví dotaz FTS5 z textu zadaného používateľom.
+
+    Každé slovo sa hľadá ako reťazec v úvodzovkách, takže operátory FTS5 vo vstupe
+    sa neinterpretujú. Posledné slovo sa hľadá ako prefix (vyhľadávanie počas písania).
+
+    Args:
+        text (str): Hľadaný text.
+
+    Returns:
+        str | None: Dotaz pre `MATCH`, alebo None, ak text neobsahuje žiadne slovo.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_question(question_id, using=DEFAULT_DB_ALIAS):
+    """
+    Prepočíta dokument vyhľadávania otázky z jej aktuálnych dát.
+
+    Ak otázka už neexistuje, dokument sa zmaže.
+
+    Args:
+        question_id: ID otázky.
+        using (str): Alias databázy, v ktorej je otázka.
+    """
+    from .models import Answer, Comment, Question, QuestionSearch
+
+    documents = QuestionSearch.objects.using(using)
+    question = Question.objects.using(using).filter(id=question_id).values('okruh_id', 'name', 'text').first()
+    if question is None:
+        documents.filter(question_id=question_id).delete()
+        return
+    answers = Answer.objects.using(using).filter(question_id=question_id).values_list('text', flat=True)
+    comments = Comment.objects.using(using).filter(question_id=question_id).values_list('text', flat=True)
+    documents.update_or_create(
+        question_id=question_id,
+        defaults={**question, 'answers': ' '.join(answers), 'comments': ' '.join(comments)},
+    )
+
+
+def schedule_reindex(question_id, using=DEFAULT_DB_ALIAS):
+    """
+    Naplánuje prepočítanie dokumentu otázky po potvrdení transakcie v databáze `using`.
+    """
+    transaction.on_commit(partial(index_question, question_id, using), using=using)
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    """
+    Vytvorí dokumenty vyhľadávania všetkých otázok v databáze `using` nanovo.
+
+    Returns:
+        int: Počet dokumentov.
+    """
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM otazky_questionsearch')
+        cursor.execute(REBUILD_SQL)
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search_questions(text, course_id=None, okruh_id=None, limit=DEFAULT_LIMIT):
+    """
+    Vyhľadá otázky podľa textu a vráti ich zoradené podľa relevancie.
+
+    S filtrom okruhu alebo kurzu sa prehľadá iba databáza jeho skupiny, inak všetky
+    databázy skupín kurzov (bm25 sa vtedy počíta zo štatistík každej databázy zvlášť).
+
+    Args:
+        text (str): Hľadaný text.
+        course_id: ID kurzu, voliteľné.
+        okruh_id: ID okruhu, voliteľné.
+        limit (int): Maximálny počet výsledkov.
+
+    Returns:
+        list[Question]: Otázky s atribútom `search_rank` (bm25, menšia hodnota = relevantnejšia).
+    """
+    query = match_query(text)
+    if query is None:
+        return []
+    if okruh_id is not None:
+        aliases = [shard_for_okruh(okruh_id)]
+    elif course_id is not None:
+        aliases = [shard_for_course(course_id)]
+    else:
+        aliases = shard_aliases()
+    results = []
+    for alias in aliases:
+        if alias is not None:
+            results += _search_shard(alias, query, course_id, okruh_id, limit)
+    results.sort(key=lambda question: question.search_rank)
+    return results[:limit]
+
+
+def _search_shard(alias, query, course_id, okruh_id, limit):
+    """
+    Vyhľadá otázky v jednej databáze skupiny kurzov.
+    """
+    from .models import Question
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    sql = (
+        f'SELECT d.question_id, bm25({SEARCH_TABLE}, {weights}) AS search_rank FROM {SEARCH_TABLE} '
+        f'JOIN otazky_questionsearch d ON d.id = {SEARCH_TABLE}.rowid '
+    )
+    conditions, params = [f'{SEARCH_TABLE} MATCH %s'], [query]
+    if okruh_id is not None:
+        conditions.append('d.okruh_id = %s')
+        params.append(okruh_id)
+    if course_id is not None:
+        sql += 'JOIN otazky_okruh o ON o.id = d.okruh_id '
+        conditions.append('o.course_id = %s')
+        params.append(course_id)
+    sql += f"WHERE {' AND '.join(conditions)} ORDER BY search_rank LIMIT %s"
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        ranks = {uuid.UUID(question_id): rank for question_id, rank in cursor.fetchall()}
+    questions = Question.objects.using(alias).in_bulk(list(ranks))
+    for question_id, question in questions.items():
+        question.search_rank = ranks[question_id]
+    return list(questions.values())
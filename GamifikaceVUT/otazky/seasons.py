@@ -0,0 +1,121 @@
+"""
+Sezóny skóre pre aplikáciu Gamifikace.
+
+Týždenný reset skóre iba uzavrie aktuálnu sezónu a začne novú (`Season.objects.start_new`),
+čím sa zápisy a čítania rebríčka presunú na nové ID sezóny. Skóre uzavretej sezóny sa
+následne na pozadí archivuje – rebríček každého kurzu sa uloží ako jeden riadok
+`SeasonStanding` – a z tabuľky `Score` sa zmaže po malých dávkach, aby mazanie
+neblokovalo ostatné zápisy.
+"""
+
+from django.db import transaction
+
+from .leaderboard import LeaderboardEntry
+from .models import Score, SeasonStanding
+from .sharding import fan_out, shard_aliases, shard_for_course
+
+PRUNE_BATCH_SIZE = 1000
+
+
+def _ranking(rows):
+    """
+    Doplní poradie k riadkom `(user_id, points)` zoradeným zostupne podľa bodov.
+
+    Rovnaký počet bodov znamená rovnaké poradie.
+    """
+    ranking = []
+    for position, (user_id, points) in enumerate(rows, start=1):
+        rank = ranking[-1][0] if ranking and ranking[-1][2] == points else position
+        ranking.append([rank, user_id, points])
+    return ranking
+
+
+def archive_season(season_id):
+    """
+    Uloží rebríčky kurzov uzavretej sezóny do `SeasonStanding`.
+
+    Skóre sezóny sa načíta jedným zoradeným dotazom z každej databázy skupiny kurzov
+    (viď `otazky/sharding.py`) a pre každý kurz vznikne jeden riadok. Opakované spustenie
+    archív prepíše.
+
+    Args:
+        season_id: ID uzavretej sezóny.
+
+    Returns:
+        int: Počet archivovaných rebríčkov.
+    """
+    rows = {}
+    scores = (
+        Score.objects.filter(season_id=season_id)
+        .order_by('course_id', '-points', 'user_id')
+        .values_list('course_id', 'user_id', 'points')
+    )
+    for shard_scores in fan_out(scores):
+        for course_id, user_id, points in shard_scores.iterator(chunk_size=2000):
+            rows.setdefault(course_id, []).append((user_id, points))
+
+    standings = [
+        SeasonStanding(season_id=season_id, course_id=course_id, ranking=_ranking(course_rows))
+        for course_id, course_rows in rows.items()
+    ]
+    SeasonStanding.objects.bulk_create(
+        standings,
+        update_conflicts=True,
+        unique_fields=['season', 'course'],
+        update_fields=['ranking'],
+        batch_size=100,
+    )
+    return len(standings)
+
+
+def prune_season_scores(season_id, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Zmaže skóre sezóny z tabuľky `Score` po dávkach.
+
+    Každá dávka beží vo vlastnej krátkej transakcii, takže súbežné zápisy skóre
+    čakajú najviac na zmazanie jednej dávky. Databázy skupín kurzov sa spracujú postupne.
+
+    Args:
+        season_id: ID archivovanej sezóny.
+        batch_size (int): Počet záznamov zmazaných v jednej transakcii.
+
+    Returns:
+        int: Počet zmazaných záznamov.
+    """
+    deleted = 0
+    for alias in shard_aliases():
+        scores = Score.objects.using(alias)
+        while True:
+            ids = list(scores.filter(season_id=season_id).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic(using=alias):
+                # Skóre uzavretej sezóny nie je v rebríčku, signál post_delete netreba – jeden DELETE bez načítania záznamov
+                deleted += scores.filter(id__in=ids)._raw_delete(alias)
+    return deleted
+
+
+def season_standing(course_id, season_id, limit=None):
+    """
+    Vráti rebríček kurzu za uzavretú sezónu.
+
+    Archivovaný rebríček sa prečíta jedným dotazom podľa indexu `(season, course)`.
+    Ak sezóna ešte nebola archivovaná, rebríček sa zostaví z tabuľky `Score`.
+
+    Args:
+        course_id: ID kurzu.
+        season_id: ID sezóny.
+        limit (int, optional): Maximálny počet riadkov. None = všetky.
+
+    Returns:
+        list[LeaderboardEntry]: Riadky rebríčka.
+    """
+    ranking = SeasonStanding.objects.filter(season_id=season_id, course_id=course_id).values_list('ranking', flat=True).first()
+    if ranking is None:
+        scores = (
+            Score.objects.using(shard_for_course(course_id))
+            .filter(season_id=season_id, course_id=course_id)
+            .order_by('-points', 'user_id')
+        )
+        ranking = _ranking(scores.values_list('user_id', 'points')[:limit])
+    return [LeaderboardEntry(*row) for row in ranking[:limit]]
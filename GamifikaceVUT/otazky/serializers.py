@@ -5,10 +5,35 @@ Obsahuje serializéry pre entity ako sú Question, User, Course, Score, Comment,
 """
 
 from rest_framework import serializers
+from .likes import merge_pending_likes
 from .models import *
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class PendingLikesListSerializer(serializers.ListSerializer):
+    """
+    Zoznam objektov s počtom lajkov vrátane čakajúcich zmien (jeden `get_many` pre celý zoznam).
+    """
+    def to_representation(self, data):
+        rows = super().to_representation(data)
+        if self.context.get('pending_likes', True):
+            merge_pending_likes(self.child.Meta.model, rows)
+        return rows
+
+
+class PendingLikesMixin:
+    """
+    Pripočíta k počtu lajkov čakajúci rozdiel (viď `otazky/likes.py`).
+
+    S kontextom `pending_likes=False` serializér vráti uloženú hodnotu.
+    """
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if self.parent is None and self.context.get('pending_likes', True):
+            merge_pending_likes(self.Meta.model, [data])
+        return data
+
+
+class QuestionSerializer(PendingLikesMixin, serializers.ModelSerializer):
     """
     Serializér pre model Question.
 
@@ -16,6 +41,7 @@ class QuestionSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Question
+        list_serializer_class = PendingLikesListSerializer
         fields = ['id', 'name', 'text', 'approved', 'visible', 'created_by', 'likes', 'created_at', 'okruh', 'is_text_question', 'ai_context', 'reported']
 
 
@@ -91,7 +117,78 @@ class ScoreSerializer(serializers.ModelSerializer):
         fields = ('id', 'course', 'user', 'coursename', 'username', 'points')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class LeaderboardEntrySerializer(serializers.Serializer):
+    """
+    Serializér pre riadok rebríčka kurzu.
+
+    Obsahuje polia `ScoreSerializer` (vrátane `id` záznamu skóre) a navyše poradie `rank`.
+
+    Attributes:
+        id (UUID): ID záznamu skóre.
+        rank (int): Poradie používateľa v rebríčku.
+        course (int): ID kurzu.
+        user (int): ID používateľa.
+        coursename (str): Názov kurzu.
+        username (str): Používateľské meno.
+        points (int): Počet bodov.
+    """
+    id = serializers.UUIDField(allow_null=True)
+    rank = serializers.IntegerField()
+    course = serializers.IntegerField()
+    user = serializers.IntegerField()
+    coursename = serializers.CharField()
+    username = serializers.CharField()
+    points = serializers.IntegerField()
+
+
+class SeasonSerializer(serializers.ModelSerializer):
+    """
+    Serializér pre model Season.
+    """
+    class Meta:
+        model = Season
+        fields = ('id', 'started_at', 'ended_at')
+
+
+class ScoreBatchItemSerializer(serializers.Serializer):
+    """
+    Serializér pre jednu položku dávkového zápisu skóre.
+
+    Attributes:
+        user_id (int): ID používateľa (nepovinné, ak je uvedené pre celú dávku).
+        courseID (int): ID kurzu.
+        point (int): Počet bodov.
+    """
+    user_id = serializers.IntegerField(required=False)
+    courseID = serializers.IntegerField()
+    point = serializers.IntegerField()
+
+
+class ScoreBatchSerializer(serializers.Serializer):
+    """
+    Serializér pre dávkový zápis skóre.
+
+    Attributes:
+        user_id (int): Predvolené ID používateľa pre položky bez `user_id`.
+        mode (str): `"set"` = prepísať body, `"add"` = pripočítať body.
+        entries (list): Zoznam položiek skóre (validujú sa samostatne v endpointe).
+    """
+    user_id = serializers.IntegerField(required=False)
+    mode = serializers.ChoiceField(choices=['set', 'add'], default='set')
+    entries = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=1000)
+
+
+class QuizGradeSerializer(serializers.Serializer):
+    """
+    Serializér pre vyhodnotenie kvízu.
+
+    Attributes:
+        answers (list): ID vybraných odpovedí všetkých otázok kvízu.
+    """
+    answers = serializers.ListField(child=serializers.UUIDField(), allow_empty=True, max_length=5000)
+
+
+class CommentSerializer(PendingLikesMixin, serializers.ModelSerializer):
     """
     Serializér pre model Comment.
 
@@ -101,6 +198,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
+        list_serializer_class = PendingLikesListSerializer
         fields = ['id', 'text', 'created_at', 'created_by', 'likes', 'question']
 
 
@@ -115,6 +213,39 @@ class AnswerSerializer(serializers.ModelSerializer):
         fields = ['id', 'answer_type', 'text', 'question']
 
 
+class QuizAnswerSerializer(serializers.ModelSerializer):
+    """
+    Serializér odpovede v kvíze.
+
+    Neobsahuje správnosť odpovede (`answer_type`), kvíz vyhodnocuje server.
+    """
+    class Meta:
+        model = Answer
+        fields = ['id', 'text', 'question']
+
+
+def answer_serializer_class(user):
+    """
+    Vráti serializér odpovedí pre používateľa.
+
+    Správnosť odpovedí (`answer_type`) vidia iba správcovia (`is_staff`). Ostatní by si
+    inak mohli stiahnuť správne odpovede a poslať ich na vyhodnotenie kvízu (`QuizGrade`).
+    """
+    return AnswerSerializer if user is not None and user.is_staff else QuizAnswerSerializer
+
+
+class QuizQuestionSerializer(QuestionSerializer):
+    """
+    Serializér otázky kvízu spolu s jej odpoveďami.
+
+    Odpovede sa čítajú z prednačítaného `answer_set` (viď `otazky/quiz.py`).
+    """
+    answers = QuizAnswerSerializer(source='answer_set', many=True, read_only=True)
+
+    class Meta(QuestionSerializer.Meta):
+        fields = QuestionSerializer.Meta.fields + ['answers']
+
+
 class OkruhSerializer(serializers.ModelSerializer):
     """
     Serializér pre model Okruh.
@@ -0,0 +1,496 @@
+"""
+Rozdelenie dát kurzov do viacerých databáz SQLite (sharding podľa kurzu).
+
+SQLite má jeden zámok na zápis pre celý súbor, takže zápisy skóre, komentárov a dokončení
+z rôznych kurzov na seba čakajú. Pri `COURSE_SHARDS > 1` sa dáta viazané na kurz –
+okruhy (aj ich `finished_by`), otázky, odpovede, komentáre, skóre, otázky výzvy
+a dokumenty vyhľadávania – ukladajú do databázy skupiny kurzu
+(`COURSE_SHARD_ALIASES[course_id % COURSE_SHARDS]`).
+Zdieľané dáta (používatelia, kurzy, sezóny, achievementy, tokeny, Celery) zostávajú
+v databáze `default`, ktorá je zároveň databázou prvej skupiny kurzov.
+
+Databáza sa vyberá:
+- podľa inštancie (`CourseShardRouter` zistí kurz z jej polí, napr. `course_id`,
+  `okruh_id` alebo `question_id`),
+- podľa kurzu požiadavky (`CourseShardMiddleware` ho zistí z parametrov `courseID`,
+  `okruhID`, `lectureID`, `questionID` a z argumentov URL),
+- explicitne cez `course_shard(course_id)`, `use_shard(alias)` alebo `queryset.using(...)`.
+
+Globálne dotazy (napr. skóre sezóny naprieč kurzami) prechádzajú všetky databázy cez
+`fan_out()`, globálne zoznamy endpointov (všetky otázky, komentáre) cez `FanOutListMixin`. Cudzie kľúče medzi dátami kurzu a zdieľanými dátami nemajú obmedzenie
+v databáze (`db_constraint=False`), mazanie používateľa alebo kurzu preto zmaže
+súvisiace riadky v ostatných databázach signálom (`purge_user`, `purge_course`).
+
+Po zmene `COURSE_SHARDS` zostanú dáta kurzov v pôvodných databázach, kým ich nepresunie
+príkaz `rebalance_shards` (`move_course`).
+
+Pri jednej skupine (predvolené nastavenie) je všetko v `default` a pomocné funkcie
+sa správajú ako bez shardingu.
+"""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+from operator import attrgetter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+# Modely aplikácie otazky, ktorých dáta patria do databázy skupiny kurzu
+COURSE_SCOPED_MODELS = {
+    'okruh', 'okruh_finished_by', 'question', 'answer', 'comment', 'score', 'chalangequestion', 'questionsearch',
+}
+# Rozsah ID pre automatické primárne kľúče na jednu databázu, aby sa ID okruhov nekryli
+SHARD_ID_SPAN = 10 ** 12
+# Parametre požiadavky (query, telo, argumenty URL), z ktorých middleware zistí kurz
+COURSE_PARAMS = ('courseID',)
+OKRUH_PARAMS = ('okruhID', 'lectureID', 'okruh_id', 'okruh')
+QUESTION_PARAMS = ('questionID', 'question_id', 'question')
+
+_current_shard = ContextVar('course_shard', default=None)
+
+
+def shard_aliases():
+    """
+    Vráti aliasy databáz všetkých skupín kurzov (prvý je vždy `default`).
+    """
+    return settings.COURSE_SHARD_ALIASES
+
+
+def is_sharded():
+    """
+    Vráti True, ak sú dáta kurzov rozdelené do viacerých databáz.
+    """
+    return len(shard_aliases()) > 1
+
+
+def is_course_scoped(model):
+    """
+    Vráti True, ak dáta modelu patria do databázy skupiny kurzu.
+    """
+    return model._meta.app_label == 'otazky' and model._meta.model_name in COURSE_SCOPED_MODELS
+
+
+def shard_for_course(course_id):
+    """
+    Vráti alias databázy skupiny kurzu, alebo None, ak ID kurzu chýba alebo je neplatné.
+    """
+    try:
+        course_id = int(course_id)
+    except (TypeError, ValueError):
+        return None
+    aliases = shard_aliases()
+    return aliases[course_id % len(aliases)]
+
+
+def shard_for_okruh(okruh_id):
+    """
+    Vráti alias databázy, v ktorej je okruh, alebo None, ak okruh neexistuje.
+    """
+    from .versions import okruh_course_id
+
+    try:
+        okruh_id = int(okruh_id)
+    except (TypeError, ValueError):
+        return None
+    return shard_for_course(okruh_course_id(okruh_id))
+
+
+def shard_for_question(question_id):
+    """
+    Vráti alias databázy, v ktorej je otázka, alebo None, ak otázka neexistuje.
+    """
+    from .versions import question_course_id
+
+    return shard_for_course(question_course_id(question_id))
+
+
+def shard_for_instance(instance):
+    """
+    Zistí alias databázy pre inštanciu modelu viazaného na kurz podľa jej polí.
+
+    Returns:
+        str | None: Alias databázy, alebo None, ak sa kurz nedá zistiť.
+    """
+    model_name = instance._meta.model_name
+    if model_name in ('score', 'okruh'):
+        return shard_for_course(instance.course_id)
+    if model_name == 'chalangequestion':
+        return shard_for_course(instance.courseID_id)
+    if model_name in ('question', 'okruh_finished_by', 'questionsearch'):
+        return shard_for_okruh(instance.okruh_id)
+    if model_name in ('answer', 'comment'):
+        return shard_for_question(instance.question_id)
+    return None
+
+
+def current_shard():
+    """
+    Vráti alias databázy nastavený pre aktuálnu požiadavku alebo blok `use_shard`, alebo None.
+    """
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Nasmeruje dotazy na modely kurzu bez inštancie v bloku `with` do databázy `alias`.
+    """
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def course_shard(course_id):
+    """
+    Nasmeruje dotazy na modely kurzu v bloku `with` do databázy skupiny kurzu.
+    """
+    return use_shard(shard_for_course(course_id))
+
+
+def group_by_shard(course_ids):
+    """
+    Rozdelí ID kurzov podľa databáz skupín.
+
+    Returns:
+        dict[str, list]: Alias databázy -> ID kurzov v nej.
+    """
+    groups = {}
+    for course_id in course_ids:
+        groups.setdefault(shard_for_course(course_id), []).append(course_id)
+    return groups
+
+
+def fan_out(queryset):
+    """
+    Vráti kópie querysetu nasmerované do databázy každej skupiny kurzov.
+    """
+    return [queryset.using(alias) for alias in shard_aliases()]
+
+
+def fan_out_list(queryset):
+    """
+    Vykoná queryset nad všetkými databázami skupín a vráti spojené výsledky.
+
+    Zoradenie platí iba v rámci jednej databázy.
+    """
+    return list(chain.from_iterable(fan_out(queryset)))
+
+
+def sort_rows(rows, ordering):
+    """
+    Zoradí objekty v pamäti rovnako ako `order_by(*ordering)` (napr. `('created_at', '-id')`).
+    """
+    for field in reversed(tuple(ordering)):
+        rows.sort(key=attrgetter(field.lstrip('-')), reverse=field.startswith('-'))
+    return rows
+
+
+def fan_out_ordered(queryset, ordering):
+    """
+    Vykoná queryset nad všetkými databázami skupín a vráti spojené výsledky v poradí `ordering`.
+    """
+    return sort_rows(fan_out_list(queryset.order_by(*ordering)), ordering)
+
+
+class FanOutListMixin:
+    """
+    Mixin pre `ListAPIView` s globálnym zoznamom modelu kurzu (bez filtra na kurz).
+
+    Pri shardingu sa zoznam načíta zo všetkých databáz skupín a spojí v poradí `keyset_ordering`
+    view. Pri stránkovaní kurzorom sa z každej databázy načíta najviac jedna strana.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not is_sharded():
+            return super().list(request, *args, **kwargs)
+        from rest_framework.response import Response
+
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is not None and paginator.is_requested(request):
+            page = paginator.paginate_fan_out(queryset, request, self.keyset_ordering, paginator.decode_cursor(request))
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(fan_out_ordered(queryset, self.keyset_ordering), many=True).data)
+
+
+def first_in_shards(queryset):
+    """
+    Vráti prvý výsledok querysetu z databáz skupín (v poradí `shard_aliases()`), alebo None.
+    """
+    for shard_queryset in fan_out(queryset):
+        result = shard_queryset.first()
+        if result is not None:
+            return result
+    return None
+
+
+async def afirst_in_shards(queryset):
+    """
+    Asynchrónna verzia `first_in_shards`.
+    """
+    for shard_queryset in fan_out(queryset):
+        result = await shard_queryset.afirst()
+        if result is not None:
+            return result
+    return None
+
+
+def purge_user(user_id):
+    """
+    Zmaže dáta kurzov používateľa z databáz skupín okrem `default`.
+
+    V `default` ich zmaže kaskáda ORM spolu s používateľom.
+    """
+    from .models import Comment, Okruh, Question, Score
+
+    for alias in shard_aliases()[1:]:
+        Okruh.finished_by.through.objects.using(alias).filter(user_id=user_id).delete()
+        Comment.objects.using(alias).filter(created_by_id=user_id).delete()
+        Question.objects.using(alias).filter(created_by_id=user_id).delete()
+        Score.objects.using(alias).filter(user_id=user_id).delete()
+
+
+def purge_course(course_id):
+    """
+    Zmaže dáta kurzu z jeho databázy skupiny, ak to nie je `default`.
+
+    V `default` ich zmaže kaskáda ORM spolu s kurzom.
+    """
+    from .models import ChalangeQuestion, Okruh, Score
+
+    alias = shard_for_course(course_id)
+    if alias in (None, DEFAULT_DB_ALIAS):
+        return
+    ChalangeQuestion.objects.using(alias).filter(courseID_id=course_id).delete()
+    Score.objects.using(alias).filter(course_id=course_id).delete()
+    Okruh.objects.using(alias).filter(course_id=course_id).delete()
+
+
+def misplaced_course_ids(alias):
+    """
+    Vráti ID kurzov, ktorých dáta sú v databáze `alias`, hoci patria do databázy inej skupiny.
+
+    Také dáta vzniknú napr. po zvýšení `COURSE_SHARDS` – aplikácia ich v `alias` nehľadá,
+    kým ich nepresunie `move_course` (príkaz `rebalance_shards`).
+    """
+    from .models import ChalangeQuestion, Okruh, Score
+
+    course_ids = set(Okruh.objects.using(alias).values_list('course_id', flat=True).distinct())
+    course_ids.update(Score.objects.using(alias).values_list('course_id', flat=True).distinct())
+    course_ids.update(ChalangeQuestion.objects.using(alias).values_list('courseID_id', flat=True).distinct())
+    return sorted(course_id for course_id in course_ids if shard_for_course(course_id) != alias)
+
+
+def move_course(course_id, source):
+    """
+    Presunie dáta kurzu z databázy `source` do databázy jeho skupiny.
+
+    Riadky sa skopírujú s pôvodnými primárnymi kľúčmi v jednej transakcii cieľovej databázy
+    (riadky, ktoré v nej už sú, sa preskočia) a potom sa zo `source` zmažú bez signálov –
+    počítadlá okruhov a dokončení v `default` sa presunom nemenia. Skóre, ktoré už v cieľovej
+    databáze existuje pre rovnakú sezónu a používateľa, sa spočíta s presúvaným. Prerušený
+    presun sa dá zopakovať.
+
+    Returns:
+        dict[str, int]: Názov modelu -> počet presunutých riadkov.
+    """
+    from .models import Answer, ChalangeQuestion, Comment, Okruh, Question, QuestionSearch, Score
+
+    target = shard_for_course(course_id)
+    if target is None or target == source:
+        return {}
+    okruh_ids = list(Okruh.objects.using(source).filter(course_id=course_id).values_list('id', flat=True))
+    # Poradie rešpektuje cudzie kľúče v rámci databázy (rodičia pred deťmi)
+    querysets = [
+        Okruh.objects.filter(course_id=course_id),
+        Okruh.finished_by.through.objects.filter(okruh_id__in=okruh_ids),
+        Question.objects.filter(okruh_id__in=okruh_ids),
+        Answer.objects.filter(question__okruh_id__in=okruh_ids),
+        Comment.objects.filter(question__okruh_id__in=okruh_ids),
+        QuestionSearch.objects.filter(okruh_id__in=okruh_ids),
+        ChalangeQuestion.objects.filter(courseID_id=course_id),
+    ]
+    moved = {}
+    with transaction.atomic(using=target):
+        for queryset in querysets:
+            rows = list(queryset.using(source))
+            queryset.model._base_manager.using(target).bulk_create(rows, batch_size=500, ignore_conflicts=True)
+            moved[queryset.model._meta.model_name] = len(rows)
+        moved['score'] = _move_scores(course_id, source, target)
+
+    with transaction.atomic(using=source):
+        for queryset in [Score.objects.filter(course_id=course_id)] + querysets[::-1]:
+            queryset.using(source)._raw_delete(source)
+    return moved
+
+
+def _move_scores(course_id, source, target):
+    """
+    Skopíruje skóre kurzu do databázy `target`, s existujúcim skóre rovnakej sezóny a používateľa ich spočíta.
+    """
+    from .models import Score
+
+    existing = {(score.season_id, score.user_id): score for score in Score.objects.using(target).filter(course_id=course_id)}
+    scores = list(Score.objects.using(source).filter(course_id=course_id))
+    to_update, to_create = [], []
+    for score in scores:
+        current = existing.get((score.season_id, score.user_id))
+        if current is None:
+            to_create.append(score)
+        elif current.pk != score.pk:
+            current.points += score.points
+            to_update.append(current)
+    Score.objects.using(target).bulk_update(to_update, ['points'], batch_size=500)
+    Score.objects.using(target).bulk_create(to_create, batch_size=500)
+    return len(scores)
+
+
+def reserve_id_ranges(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Posunie počítadlá automatických ID modelov kurzu v databáze skupiny na jej rozsah.
+
+    Databáza `i` prideľuje ID od `i * SHARD_ID_SPAN`, takže ID okruhov sú jedinečné
+    naprieč databázami. Volá sa po migrácii (signál `post_migrate`).
+    """
+    from django.apps import apps
+
+    aliases = shard_aliases()
+    if using not in aliases or using == DEFAULT_DB_ALIAS or connections[using].vendor != 'sqlite':
+        return
+    start = aliases.index(using) * SHARD_ID_SPAN
+    tables = [
+        model._meta.db_table
+        for model in apps.get_app_config('otazky').get_models(include_auto_created=True)
+        if is_course_scoped(model) and model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField')
+    ]
+    with connections[using].cursor() as cursor:
+        for table in tables:
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start])
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, start, table],
+            )
+
+
+class CourseScopedQuerySet(models.QuerySet):
+    """
+    QuerySet modelov kurzu, ktorého `create()` zapíše záznam do databázy skupiny kurzu.
+
+    Vstavaný `create()` vyberá databázu bez inštancie, teda iba podľa kurzu požiadavky.
+    """
+
+    def create(self, **kwargs):
+        if self._db is None:
+            alias = shard_for_instance(self.model(**kwargs))
+            if alias is not None:
+                return super(CourseScopedQuerySet, self.using(alias)).create(**kwargs)
+        return super().create(**kwargs)
+
+
+class CourseShardRouter:
+    """
+    Router databáz, ktorý modely kurzu smeruje do databázy skupiny kurzu.
+
+    Zdieľané modely idú vždy do `default`. Model kurzu ide do databázy zistenej z inštancie,
+    inak do databázy nastavenej pre aktuálnu požiadavku; ak nie je nastavená, do `default`.
+    """
+
+    def _db_for_model(self, model, instance):
+        if not is_course_scoped(model):
+            return DEFAULT_DB_ALIAS
+        if instance is not None and is_course_scoped(type(instance)):
+            return shard_for_instance(instance) or instance._state.db or current_shard()
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Všetky databázy tvoria jednu logickú databázu
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in shard_aliases():
+            return None
+        if app_label == 'otazky' and model_name in COURSE_SCOPED_MODELS:
+            return True
+        return db == DEFAULT_DB_ALIAS
+
+
+class CourseShardMiddleware:
+    """
+    Middleware, ktorý pre požiadavku nastaví databázu skupiny kurzu.
+
+    Kurz sa zistí z argumentov URL, query parametrov a tela JSON požiadavky (viď
+    `COURSE_PARAMS`, `OKRUH_PARAMS`, `QUESTION_PARAMS`). Bez shardingu sa middleware
+    nepoužije (`MiddlewareNotUsed`), takže nepridáva réžiu ani pod ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_sharded():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_shard.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_shard.set(None)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _current_shard.set(self.resolve(request, view_kwargs))
+        return None
+
+    def resolve(self, request, view_kwargs):
+        """
+        Vráti alias databázy skupiny kurzu, ktorého sa požiadavka týka, alebo None.
+        """
+        sources = [view_kwargs, request.GET, self._json_body(request)]
+        for params, resolver in (
+            (COURSE_PARAMS, shard_for_course),
+            (OKRUH_PARAMS, shard_for_okruh),
+            (QUESTION_PARAMS, shard_for_question),
+        ):
+            for source in sources:
+                for param in params:
+                    value = source.get(param)
+                    if value not in (None, ''):
+                        alias = resolver(value)
+                        if alias is not None:
+                            return alias
+        return None
+
+    def _json_body(self, request):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or request.content_type != 'application/json':
+            return {}
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        if isinstance(body, list):
+            body = body[0] if body else {}
+        return body if isinstance(body, dict) else {}
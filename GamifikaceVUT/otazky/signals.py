@@ -1,46 +1,437 @@
 """
 Signály pre aplikáciu Gamifikace.
 
-Obsahuje logiku pre automatické udeľovanie achievementov po dokončení všetkých okruhov v kurze.
+Obsahuje logiku pre:
+- Automatické udeľovanie achievementov po dokončení všetkých okruhov v kurze.
+- Aktualizáciu rebríčka pri zmene skóre.
+- Invalidáciu cache zapísaných kurzov.
+- Invalidáciu pripravenej týždennej výzvy pri zmene jej otázok.
+- Údržbu počítadiel dokončenia kurzov.
+- Zvyšovanie verzií obsahu kurzov a achievementov (podmienené GET a cache odpovedí).
+- Invalidáciu cache používateľov pre JWT autentifikáciu.
+- Zahodenie počtov lajkov uložených v cache pri zmene otázky alebo komentára.
+- Udržanie dát kurzov v databáze ich skupiny pri shardingu (viď `otazky/sharding.py`).
+- Prepočítanie dokumentov fulltextového vyhľadávania otázok (viď `otazky/search.py`).
 """
 
-from django.db.models.signals import m2m_changed, post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Okruh, Achievement, User
+from .models import Answer, ChalangeQuestion, Comment, Course, Okruh, Achievement, Question, Score, Season, User
+from .auth import user_cache
+from .challenge import invalidate_challenge
+from .completion import adjust_completion, adjust_completion_for_okruhs, adjust_lecture_count
+from .enrollment import invalidate_course_catalog, invalidate_enrollment
+from .leaderboard import get_leaderboard
+from .likes import forget_stored_likes
+from .search import schedule_reindex
+from .sharding import fan_out_list, is_sharded, purge_course, purge_user, shard_for_instance
+from .tasks import award_course_completion
+from .versions import (
+    CATALOG_VERSION_KEY,
+    bump_achievement_versions,
+    bump_course_versions,
+    bump_versions,
+    forget_okruh,
+    forget_question,
+    okruh_course_id,
+    question_course_id,
+    remember_question_course_id,
+)
 
 @receiver(m2m_changed, sender=Okruh.finished_by.through)
-def check_all_lectures_completed(sender, instance, action, pk_set, **kwargs):
+def check_all_lectures_completed(sender, instance, action, reverse, pk_set, **kwargs):
     """
-    Skontroluje, či používateľ dokončil všetky okruhy v rámci kurzu.
+    Naplánuje kontrolu, či používatelia dokončili všetky okruhy v rámci kurzu.
 
-    Ak áno, priradí mu príslušný achievement.
+    Samotné vyhodnotenie a priradenie achievementu prebehne v Celery úlohe
+    `award_course_completion` až po potvrdení transakcie, takže požiadavka na dokončenie
+    okruhu nečaká na vyhodnotenie. Úloha sa naplánuje raz pre každý dotknutý kurz.
 
     Tento signál sa spustí pri zmene ManyToManyField `finished_by` na modeli Okruh.
 
     Args:
         sender: Trieda modelu, ktorá vyvolala signál.
-        instance: Inštancia Okruh, ktorej sa zmena týka.
+        instance: Inštancia Okruh (alebo User pri zmene z opačnej strany).
         action: Typ akcie na ManyToManyField (napr. 'post_add').
-        pk_set: Sada primárnych kľúčov používateľov, ktorých sa zmena týka.
+        reverse: True, ak sa zmena robí z modelu User.
+        pk_set: Sada primárnych kľúčov, ktorých sa zmena týka.
+        **kwargs: Ďalšie voliteľné argumenty.
+    """
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        course_ids = set(fan_out_list(Okruh.objects.filter(id__in=pk_set).values_list('course_id', flat=True)))
+        dispatch = [(course_id, [instance.pk]) for course_id in course_ids]
+    else:
+        dispatch = [(instance.course_id, list(pk_set))]
+    for course_id, user_ids in dispatch:
+        transaction.on_commit(partial(award_course_completion.delay, course_id, user_ids))
+
+
+@receiver(post_save, sender=Score)
+def update_leaderboard(sender, instance, using, **kwargs):
+    """
+    Zapíše nové body používateľa do rebríčka kurzu po uložení skóre.
+
+    Zápis prebehne až po potvrdení transakcie, takže rebríček nezobrazí body,
+    ktoré sa vrátia späť. Skóre uzavretých sezón sa do rebríčka nezapisuje.
+
+    Args:
+        sender: Trieda modelu, ktorá vyvolala signál.
+        instance: Uložená inštancia Score.
+        using: Alias databázy, do ktorej sa skóre uložilo.
         **kwargs: Ďalšie voliteľné argumenty.
     """
-    if action == "post_add":  # Ak sa pridali noví používatelia
-        # Získa všetky okruhy prislúchajúce ku kurzu
-        course_okruhy = Okruh.objects.filter(course=instance.course)
+    if instance.season_id != Season.objects.current_id():
+        return
+    transaction.on_commit(
+        partial(get_leaderboard().set_score, instance.course_id, instance.user_id, instance.points), using=using
+    )
+
+
+@receiver(post_delete, sender=Score)
+def remove_from_leaderboard(sender, instance, using, **kwargs):
+    """
+    Odstráni používateľa z rebríčka kurzu po zmazaní jeho skóre (po potvrdení transakcie).
+    """
+    if instance.season_id != Season.objects.current_id():
+        return
+    transaction.on_commit(partial(get_leaderboard().remove, instance.course_id, instance.user_id), using=using)
+
+
+@receiver(m2m_changed, sender=Course.visited_by.through)
+def invalidate_enrollment_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Zmaže cache zapísaných kurzov používateľov, ktorých sa zmena `visited_by` týka.
+
+    Pri `clear` sa dotknutí používatelia zistia ešte pred zmazaním (`pre_clear`).
 
-        # Prechádza používateľov pridaných do finished_by
-        for user_id in pk_set:
-            user = User.objects.get(pk=user_id)
+    Args:
+        sender: Spojovacia tabuľka `Course.visited_by`.
+        instance: Inštancia Course (alebo User pri zmene z opačnej strany).
+        action: Typ akcie na ManyToManyField (napr. 'post_add').
+        reverse: True, ak sa zmena robí z modelu User.
+        pk_set: Sada primárnych kľúčov, ktorých sa zmena týka.
+        **kwargs: Ďalšie voliteľné argumenty.
+    """
+    if reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_enrollment([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        invalidate_enrollment(pk_set)
+    elif action == "pre_clear":
+        invalidate_enrollment(sender.objects.filter(course_id=instance.pk).values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Course)
+def invalidate_enrollment_for_course(sender, instance, **kwargs):
+    """
+    Zmaže cache zapísaných kurzov používateľov mazaného kurzu.
+
+    Kaskádové zmazanie riadkov `visited_by` neposiela signál m2m_changed, používatelia
+    sa preto zistia ešte pred zmazaním.
+    """
+    invalidate_enrollment(Course.visited_by.through.objects.filter(course_id=instance.pk).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_catalog_cache(sender, instance, **kwargs):
+    """
+    Zmaže cache katalógu kurzov po uložení alebo zmazaní kurzu.
+    """
+    invalidate_course_catalog()
+
+
+@receiver(post_save, sender=ChalangeQuestion)
+@receiver(post_delete, sender=ChalangeQuestion)
+def invalidate_challenge_for_entry(sender, instance, **kwargs):
+    """
+    Zmaže pripravenú výzvu kurzu po pridaní alebo odobratí otázky výzvy.
+    """
+    invalidate_challenge([instance.courseID_id])
 
-            # Skontroluje, či používateľ dokončil všetky okruhy v danom kurze
-            if all(user in okruh.finished_by.all() for okruh in course_okruhy):
-                achievement_name = f"Dokončené všetky okruhy v {instance.course.name}"
 
-                # Vytvorí alebo nájde achievement pre tento kurz
-                achievement, created = Achievement.objects.get_or_create(name=achievement_name)
+@receiver(post_save, sender=Question)
+def invalidate_challenge_for_question(sender, instance, created, **kwargs):
+    """
+    Zmaže pripravenú výzvu kurzov, v ktorých výzve je upravená otázka.
+
+    Args:
+        sender: Trieda modelu, ktorá vyvolala signál.
+        instance: Uložená inštancia Question.
+        created: True, ak ide o novú otázku (tá ešte nemôže byť vo výzve).
+        **kwargs: Ďalšie voliteľné argumenty.
+    """
+    if not created:
+        invalidate_challenge(
+            ChalangeQuestion.objects.using(instance._state.db).filter(question=instance).values_list('courseID', flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=Okruh.finished_by.through)
+def update_course_completion(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Upraví počítadlá dokončenia kurzu pri zmene `Okruh.finished_by`.
+
+    Odobratia sa započítajú ešte pred zmazaním (`pre_remove`, `pre_clear`), aby sa
+    odpočítali iba záznamy, ktoré naozaj existovali.
+
+    Args:
+        sender: Spojovacia tabuľka `Okruh.finished_by`.
+        instance: Inštancia Okruh (alebo User pri zmene z opačnej strany).
+        action: Typ akcie na ManyToManyField (napr. 'post_add').
+        reverse: True, ak sa zmena robí z modelu User.
+        pk_set: Sada primárnych kľúčov, ktorých sa zmena týka.
+        **kwargs: Ďalšie voliteľné argumenty.
+    """
+    if reverse:
+        finished = sender.objects.filter(user_id=instance.pk)
+        if action == "post_add":
+            adjust_completion_for_okruhs(instance.pk, pk_set, 1)
+        elif action == "pre_remove":
+            adjust_completion_for_okruhs(instance.pk, fan_out_list(finished.filter(okruh_id__in=pk_set).values_list('okruh_id', flat=True)), -1)
+        elif action == "pre_clear":
+            adjust_completion_for_okruhs(instance.pk, fan_out_list(finished.values_list('okruh_id', flat=True)), -1)
+    else:
+        finished = sender.objects.using(instance._state.db).filter(okruh_id=instance.pk)
+        if action == "post_add":
+            adjust_completion(instance.course_id, pk_set, 1)
+        elif action == "pre_remove":
+            adjust_completion(instance.course_id, finished.filter(user_id__in=pk_set).values_list('user_id', flat=True), -1)
+        elif action == "pre_clear":
+            adjust_completion(instance.course_id, finished.values_list('user_id', flat=True), -1)
+
+
+@receiver(pre_save, sender=Okruh)
+@receiver(pre_save, sender=Question)
+def refuse_cross_shard_move(sender, instance, **kwargs):
+    """
+    Zabráni presunu okruhu alebo otázky do kurzu, ktorého dáta sú v inej databáze.
+
+    Raises:
+        ValueError: Ak by sa okruh alebo otázka pri shardingu presunuli do inej databázy.
+    """
+    if instance._state.adding or not is_sharded():
+        return
+    if shard_for_instance(instance) != instance._state.db:
+        raise ValueError("Presun do kurzu v inej databáze skupiny kurzov nie je podporovaný.")
+
+
+@receiver(pre_save, sender=Okruh)
+def move_okruh_completion(sender, instance, **kwargs):
+    """
+    Presunie počet okruhov a dokončenia do nového kurzu, ak sa okruhu zmenil kurz.
+
+    Zvýši aj verziu obsahu pôvodného kurzu a zabudne priradenie okruhu a jeho otázok ku kurzu.
+    """
+    if instance._state.adding:
+        return
+    old_course_id = Okruh.objects.using(instance._state.db).filter(pk=instance.pk).values_list('course_id', flat=True).first()
+    if old_course_id is None or old_course_id == instance.course_id:
+        return
+    finishers = list(instance.finished_by.values_list('id', flat=True))
+    adjust_lecture_count(old_course_id, -1)
+    adjust_lecture_count(instance.course_id, 1)
+    adjust_completion(old_course_id, finishers, -1)
+    adjust_completion(instance.course_id, finishers, 1)
+    bump_course_versions([old_course_id])
+    forget_okruh(instance.pk, instance.question_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Okruh)
+def count_new_okruh(sender, instance, created, **kwargs):
+    """
+    Zvýši počet okruhov kurzu po vytvorení nového okruhu.
+    """
+    if created:
+        adjust_lecture_count(instance.course_id, 1)
+
+
+@receiver(pre_delete, sender=Okruh)
+def uncount_deleted_okruh(sender, instance, **kwargs):
+    """
+    Zníži počet okruhov kurzu a počítadlá používateľov, ktorí mazaný okruh dokončili.
+    """
+    adjust_lecture_count(instance.course_id, -1)
+    adjust_completion(instance.course_id, instance.finished_by.values_list('id', flat=True), -1)
 
-                if created:
-                    print(f"New achievement created: {achievement_name}")
 
-                # Priradí achievement používateľovi (ak ho ešte nemá)
-                achievement.award_to_user(user)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def bump_catalog_version(sender, instance, **kwargs):
+    """
+    Zvýši verziu zoznamu kurzov po uložení alebo zmazaní kurzu.
+    """
+    bump_versions([CATALOG_VERSION_KEY])
+
+
+@receiver(post_save, sender=Okruh)
+def bump_version_for_okruh(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu po uložení okruhu.
+    """
+    bump_course_versions([instance.course_id])
+
+
+@receiver(post_delete, sender=Okruh)
+def bump_version_for_deleted_okruh(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu po zmazaní okruhu a zabudne jeho priradenie ku kurzu.
+    """
+    forget_okruh(instance.pk)
+    bump_course_versions([instance.course_id])
+
+
+@receiver(m2m_changed, sender=Okruh.finished_by.through)
+def bump_version_for_finished_by(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Zvýši verziu obsahu kurzov, ktorých okruhom sa zmenil zoznam `finished_by`.
+
+    Pri `clear` z opačnej strany sa dotknuté okruhy zistia ešte pred zmazaním (`pre_clear`).
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_course_versions([instance.course_id])
+        return
+    if action in ("post_add", "post_remove"):
+        okruhs = Okruh.objects.filter(id__in=pk_set)
+    elif action == "pre_clear":
+        okruhs = Okruh.objects.filter(finished_by=instance)
+    else:
+        return
+    bump_course_versions(set(fan_out_list(okruhs.values_list('course_id', flat=True).distinct())))
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_course(sender, instance, **kwargs):
+    """
+    Zapamätá si kurz upravovanej otázky pred uložením (pre prípad presunu do iného kurzu).
+    """
+    instance._previous_course_id = None if instance._state.adding else question_course_id(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def bump_version_for_question(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu otázky (aj pôvodného kurzu, ak sa otázka presunula).
+    """
+    course_id = okruh_course_id(instance.okruh_id)
+    remember_question_course_id(instance.pk, course_id)
+    bump_course_versions({course_id, getattr(instance, '_previous_course_id', None)})
+
+
+@receiver(post_delete, sender=Question)
+def bump_version_for_deleted_question(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu po zmazaní otázky.
+    """
+    forget_question(instance.pk)
+    bump_course_versions([okruh_course_id(instance.okruh_id)])
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def bump_version_for_answer(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu po uložení alebo zmazaní odpovede.
+    """
+    bump_course_versions([question_course_id(instance.question_id)])
+
+
+# Polia otázky, z ktorých sa skladá dokument vyhľadávania
+SEARCH_FIELDS = {'name', 'text', 'okruh', 'okruh_id'}
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reindex_question_search(sender, instance, update_fields=None, **kwargs):
+    """
+    Naplánuje prepočítanie dokumentu vyhľadávania otázky po zmene otázky, odpovede alebo komentára.
+
+    Uloženie otázky s `update_fields` bez názvu, textu a okruhu (napr. lajky) dokument nemení.
+    Zmazanie otázky zmaže jej dokument kaskádou.
+    """
+    if sender is Question:
+        if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+            return
+        schedule_reindex(instance.pk, instance._state.db)
+    else:
+        schedule_reindex(instance.question_id, instance._state.db)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def forget_likes(sender, instance, **kwargs):
+    """
+    Zahodí počet lajkov uložený v cache zápisom lajkov, platí hodnota z uloženého objektu.
+    """
+    forget_stored_likes(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=ChalangeQuestion)
+@receiver(post_delete, sender=ChalangeQuestion)
+def bump_version_for_challenge(sender, instance, **kwargs):
+    """
+    Zvýši verziu obsahu kurzu po zmene otázok jeho výzvy.
+    """
+    bump_course_versions([instance.courseID_id])
+
+
+@receiver(m2m_changed, sender=Achievement.awarded_to.through)
+def bump_version_for_awarded_to(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Zvýši verziu achievementov používateľov, ktorým sa zmenil zoznam achievementov.
+
+    Pri `clear` sa dotknutí používatelia zistia ešte pred zmazaním (`pre_clear`).
+    """
+    if reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_achievement_versions([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        bump_achievement_versions(pk_set)
+    elif action == "pre_clear":
+        bump_achievement_versions(instance.awarded_to.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(pre_delete, sender=Achievement)
+def bump_version_for_achievement(sender, instance, **kwargs):
+    """
+    Zvýši verziu achievementov všetkých držiteľov po premenovaní alebo zmazaní achievementu.
+    """
+    if not kwargs.get('created'):
+        bump_achievement_versions(instance.awarded_to.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Odstráni používateľa z cache používateľov po jeho uložení alebo zmazaní.
+    """
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def purge_user_course_data(sender, instance, **kwargs):
+    """
+    Zmaže dáta kurzov mazaného používateľa z ostatných databáz skupín kurzov.
+    """
+    purge_user(instance.pk)
+
+
+@receiver(pre_delete, sender=Course)
+def purge_course_data(sender, instance, **kwargs):
+    """
+    Zmaže dáta mazaného kurzu z jeho databázy skupiny kurzov.
+    """
+    purge_course(instance.pk)
@@ -0,0 +1,83 @@
+"""
+Balík otázok okruhu na štúdium (study pack) pre aplikáciu Gamifikace.
+
+Všetky viditeľné a schválené otázky okruhu aj s odpoveďami sa posielajú jednou
+streamovanou odpoveďou vo formáte NDJSON (jeden JSON objekt na riadok). Otázky sa
+čítajú po dávkach cez `iterator(chunk_size=...)` s `prefetch_related` odpovedí, takže
+pamäť servera nezávisí od počtu otázok. Výstup sa pri podpore klienta komprimuje gzipom.
+"""
+
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Question
+from .serializers import QuestionSerializer, QuizAnswerSerializer
+
+STUDY_PACK_CHUNK_SIZE = 200
+STUDY_PACK_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def study_pack_questions(okruh_id):
+    """
+    Vráti queryset otázok, ktoré patria do balíka okruhu, v stabilnom poradí.
+    """
+    return Question.objects.filter(okruh_id=okruh_id, visible=True, approved=True).order_by('created_at', 'id')
+
+
+def study_pack_lines(okruh_id, chunk_size=STUDY_PACK_CHUNK_SIZE, answer_serializer=QuizAnswerSerializer):
+    """
+    Vráti riadky balíka okruhu vo formáte NDJSON.
+
+    Každý riadok obsahuje otázku (`QuestionSerializer`, počet lajkov bez čakajúcich zmien)
+    a jej odpovede v kľúči `answers`.
+
+    Args:
+        okruh_id: ID okruhu.
+        chunk_size (int): Počet otázok načítaných (a prefetchnutých) naraz.
+        answer_serializer (type): Serializér odpovedí (predvolene bez správnosti odpovedí,
+            viď `answer_serializer_class`).
+
+    Returns:
+        Iterator[bytes]: Riadky JSON ukončené znakom nového riadku.
+    """
+    questions = study_pack_questions(okruh_id).prefetch_related('answer_set')
+    # Databáza sa vyberie hneď – prúd sa číta až po skončení požiadavky v middleware
+    # (viď `otazky/sharding.py`)
+    return _study_pack_lines(questions.using(questions.db), chunk_size, answer_serializer)
+
+
+def _study_pack_lines(questions, chunk_size, answer_serializer):
+    """
+    Generuje riadky NDJSON pre otázky querysetu.
+    """
+    for question in questions.iterator(chunk_size=chunk_size):
+        line = dict(QuestionSerializer(question, context={'pending_likes': False}).data)
+        line['answers'] = answer_serializer(question.answer_set.all(), many=True).data
+        yield json.dumps(line, cls=DjangoJSONEncoder, separators=(',', ':')).encode() + b'\n'
+
+
+def gzip_stream(chunks):
+    """
+    Komprimuje prúd bajtov do formátu gzip po častiach.
+
+    Args:
+        chunks (Iterable[bytes]): Nekomprimované časti.
+
+    Yields:
+        bytes: Komprimované časti.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    """
+    Vráti True, ak klient v hlavičke `Accept-Encoding` podporuje gzip.
+    """
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
@@ -1,15 +1,28 @@
 """
-Celery úloha pre týždenné generovanie výzvy v aplikácii Gamifikace.
+Celery úlohy pre aplikáciu Gamifikace.
 
 Obsahuje logiku pre:
 - Ocenenie najlepších hráčov achievementom.
-- Resetovanie skóre.
+- Uzavretie sezóny skóre a archiváciu jej rebríčkov.
 - Generovanie novej sady otázok pre výzvu.
+- Udelenie achievementu za dokončenie všetkých okruhov kurzu.
+- Zápis čakajúcich lajkov otázok a komentárov do databázy.
 """
 
 import random
-from celery import shared_task
-from otazky.models import Achievement, Course, Okruh, Question, ChalangeQuestion, Score, User
+from celery import chord, shared_task
+from django.db import transaction
+from otazky.models import Okruh, Question, ChalangeQuestion, Season
+from otazky.achievements import evaluate_rules
+from otazky.challenge import build_challenge_snapshots
+from otazky.leaderboard import get_leaderboard
+from otazky.likes import flush_pending_likes
+from otazky.seasons import archive_season, prune_season_scores
+from otazky.sharding import fan_out_list, shard_aliases, shard_for_course
+from otazky.versions import bump_course_versions
+
+CHALLENGE_QUESTIONS_PER_OKRUH = 5
+
 
 @shared_task
 def generate_weekly_challenge():
@@ -17,66 +30,148 @@ def generate_weekly_challenge():
     Vygeneruje týždennú výzvu a ocení najlepších hráčov v každom kurze.
 
     Funkcionalita:
-    1. Vyhodnotí najlepších hráčov (1. miesto) podľa skóre v každom kurze a priradí im achievement.
-    2. Vymaže existujúce skóre a predošlé výzvy.
-    3. Pre každý dostupný okruh náhodne vyberie max. 5 otázok a vytvorí nové záznamy výzvy (ChalangeQuestion).
+    1. Uzavrie aktuálnu sezónu skóre a začne novú.
+    2. Vyhodnotí najlepších hráčov (1. miesto) uzavretej sezóny v každom kurze a priradí im
+       achievement; skóre uzavretej sezóny potom archivuje na pozadí úloha `archive_closed_season`.
+    3. Spustí Celery chord – pre každý kurz s dostupným okruhom jednu úlohu
+       `select_challenge_questions`, ktorá vyberie max. 5 otázok z každého okruhu.
+    4. Záverečná úloha `swap_weekly_challenge` atomicky nahradí predošlú výzvu novou
+       a pripraví serializovanú výzvu (ChallengeSnapshot) pre každý kurz.
 
     Logika:
     - Hráči s rovnakým skóre na 1. mieste dostanú rovnaký achievement.
     - Výzvy sa regenerujú každým spustením tasku (raz týždenne cez Celery Beat).
+    - Kurzy sa spracúvajú paralelne na dostupných workeroch.
 
     Returns:
         None
     """
+    # Nová sezóna skóre – staré skóre sa archivuje na pozadí
+    closed_season_ids = Season.objects.start_new()
+    get_leaderboard().reset()
+    print("🧹 Začala nová sezóna skóre.")
+
     print("🛠️ Dávam achivment najlepsim hráčom")
 
-    scores = Score.objects.select_related('course').all().order_by('course__name')
-    top_scores_by_course = {}
-
-    # Nájdeme najlepších hráčov pre každý kurz
-    for score in scores:
-        course_id = score.course.id
-        if course_id not in top_scores_by_course:
-            top_scores_by_course[course_id] = {
-                'users': [score.user],
-                'course': score.course,
-                'points': score.points
-            }
-        elif score.points == top_scores_by_course[course_id]['points']:
-            top_scores_by_course[course_id]['users'].append(score.user)
-
-    # Ocenenie najlepších hráčov
-    for data in top_scores_by_course.values():
-        users = data['users']
-        course = data['course']
-        if course:
-            achievement_name = f"Dosiahnuté 1. miesto v {course.name}"
-            achievement, created = Achievement.objects.get_or_create(name=achievement_name)
-            if created:
-                print(f"New achievement created: {achievement_name}")
-            for user in users:
-                achievement.award_to_user(user)
+    # Ocenenie najlepších hráčov uzavretej sezóny v každom kurze (pravidlo `weekly_first_place`),
+    # pred archiváciou, ktorá skóre sezóny zmaže
+    for season_id in closed_season_ids:
+        evaluate_rules(['weekly_first_place'], season_id=season_id)
+        archive_closed_season.delay(season_id)
 
     print("🚀 Generujem týždennú výzvu...")
 
-    # Resetovanie predošlých výziev a skóre
-    ChalangeQuestion.objects.all().delete()
-    Score.objects.all().delete()
-    print("🧹 Skóre bolo vymazané.")
+    # Výber otázok pre novú výzvu – jedna úloha na kurz
+    course_ids = sorted(set(fan_out_list(Okruh.objects.filter(available=True).values_list('course_id', flat=True).distinct())))
+    if not course_ids:
+        swap_weekly_challenge([])
+        return
+    chord(select_challenge_questions.s(course_id) for course_id in course_ids)(swap_weekly_challenge.s())
+
+
+@shared_task
+def select_challenge_questions(course_id, per_okruh=CHALLENGE_QUESTIONS_PER_OKRUH):
+    """
+    Náhodne vyberie otázky do výzvy pre jeden kurz.
+
+    Načíta iba ID viditeľných a schválených otázok dostupných okruhov kurzu
+    jedným dotazom a z každého okruhu vyberie max. `per_okruh` z nich.
+
+    Args:
+        course_id (int): ID kurzu.
+        per_okruh (int): Maximálny počet otázok z jedného okruhu.
 
-    # Výber otázok pre novú výzvu
-    okruhy = Okruh.objects.filter(available=True)
+    Returns:
+        dict: `course_id` a zoznam vybraných `question_ids` (reťazce UUID).
+    """
+    questions_by_okruh = {}
+    questions = Question.objects.using(shard_for_course(course_id)).filter(
+        okruh__course_id=course_id, okruh__available=True, visible=True, approved=True
+    ).values_list('okruh_id', 'id')
+    for okruh_id, question_id in questions:
+        questions_by_okruh.setdefault(okruh_id, []).append(str(question_id))
 
-    for okruh in okruhy:
-        course = okruh.course
-        questions = Question.objects.filter(okruh=okruh, visible=True, approved=True)
+    selected = []
+    for question_ids in questions_by_okruh.values():
+        selected.extend(random.sample(question_ids, k=min(per_okruh, len(question_ids))))
+    return {'course_id': course_id, 'question_ids': selected}
 
-        if questions.exists():
-            selected_questions = random.sample(
-                list(questions),
-                k=min(5, questions.count())
-            )
-            for question in selected_questions:
-                ChalangeQuestion.objects.create(courseID=course, question=question)
+
+@shared_task
+def swap_weekly_challenge(selections):
+    """
+    Nahradí predošlú výzvu novou v jednej transakcii (pri shardingu v jednej transakcii
+    na každú databázu skupiny kurzov).
+
+    Args:
+        selections (list[dict]): Výsledky úloh `select_challenge_questions`.
+
+    Returns:
+        int: Počet otázok v novej výzve.
+    """
+    rows = {alias: [] for alias in shard_aliases()}
+    for selection in selections:
+        rows[shard_for_course(selection['course_id'])].extend(
+            ChalangeQuestion(courseID_id=selection['course_id'], question_id=question_id)
+            for question_id in selection['question_ids']
+        )
+    for alias, shard_rows in rows.items():
+        with transaction.atomic(using=alias):
+            ChalangeQuestion.objects.using(alias).all().delete()
+            ChalangeQuestion.objects.using(alias).bulk_create(shard_rows, batch_size=500)
+    # bulk_create neposiela signály, verzie kurzov novej výzvy sa zvýšia tu
+    bump_course_versions(selection['course_id'] for selection in selections)
+
+    # Pripraví serializovanú výzvu pre endpoint
+    build_challenge_snapshots()
 
     print("✅ Výzva vygenerovaná a skóre zresetované.")
+    return sum(len(shard_rows) for shard_rows in rows.values())
+
+
+@shared_task
+def archive_closed_season(season_id):
+    """
+    Archivuje rebríčky uzavretej sezóny a zmaže jej skóre z tabuľky `Score`.
+
+    Skóre sa maže až po uložení archívu, po malých dávkach.
+
+    Args:
+        season_id (int): ID uzavretej sezóny.
+
+    Returns:
+        int: Počet zmazaných záznamov skóre.
+    """
+    archive_season(season_id)
+    return prune_season_scores(season_id)
+
+
+@shared_task
+def award_course_completion(course_id, user_ids):
+    """
+    Udelí achievement za dokončenie všetkých okruhov kurzu zadaným používateľom.
+
+    Vyhodnotí pravidlo `course_completed` – používatelia, ktorí dokončili všetky okruhy,
+    sa vyberú jedným agregačným dotazom a achievement sa priradí všetkým naraz.
+
+    Args:
+        course_id (int): ID kurzu.
+        user_ids (list[int]): ID používateľov, ktorým pribudol dokončený okruh.
+
+    Returns:
+        int: Počet spracovaných priradení achievementu.
+    """
+    return evaluate_rules(['course_completed'], course_id=course_id, user_ids=user_ids)
+
+
+@shared_task
+def flush_like_counters():
+    """
+    Zapíše čakajúce lajky otázok a komentárov do databázy (viď `otazky/likes.py`).
+
+    Spúšťa sa periodicky cez Celery Beat každých `LIKE_FLUSH_INTERVAL` sekúnd.
+
+    Returns:
+        int: Počet objektov, ktorým sa zapísal nový počet lajkov.
+    """
+    return flush_pending_likes()
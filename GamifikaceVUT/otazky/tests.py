@@ -1,3 +1,1879 @@
-from django.test import TestCase
+import gzip
+import json
+import threading
+import time
+import uuid
+import zlib
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .leaderboard import InMemoryLeaderboard, RedisLeaderboard, get_leaderboard
+from .leaderboard_stream import leaderboard_events
+from .likes import flush_pending_likes, get_like_buffer
+from . import response_cache
+from .achievements import award, evaluate_rules
+from .auth import user_cache
+from .challenge import CHALLENGE_CACHE_KEY, challenge_payload
+from .completion import course_completion, rebuild_completion
+from .enrollment import COURSE_CATALOG_CACHE_KEY, ENROLLMENT_CACHE_KEY
+from .pagination import KeysetPagination
+from .models import (
+    Achievement, Answer, ChalangeQuestion, ChallengeSnapshot, Comment, ContentVersion, Course, CourseCompletion, Okruh, Question,
+    Score, Season, SeasonStanding,
+)
+from .quiz import claim_session, get_session, grade_session, next_batch
+from .search import rebuild_index, search_questions
+from .seasons import archive_season, prune_season_scores
+from .studypack import STUDY_PACK_CONTENT_TYPE, study_pack_lines
+from .sharding import SHARD_ID_SPAN, misplaced_course_ids, reserve_id_ranges
+from .tasks import (
+    CHALLENGE_QUESTIONS_PER_OKRUH, archive_closed_season, generate_weekly_challenge, select_challenge_questions,
+    swap_weekly_challenge,
+)
+from .versions import achievements_version_key, content_version, course_version_key
+from .views import OtazkaView
+
+
+def query_plan(sql):
+    """
+    Vráti riadky `EXPLAIN QUERY PLAN` pre SQL dotaz (stĺpec `detail`).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(TestCase):
+    """
+    Kontroluje, že dotazy endpointov na čítanie používajú indexy z `otazky/models.py`.
+
+    Dotazy sa zachytia pri volaní endpointu a pre každý dotaz nad sledovanou tabuľkou
+    sa overí plán – nesmie obsahovať prechod celej tabuľky (`SCAN`) ani zoradenie
+    v dočasnom B-strome (`USE TEMP B-TREE`).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f'user{index}') for index in range(30)])
+        cls.user = users[0]
+        cls.course = Course.objects.create(name='Kurz')
+        other_course = Course.objects.create(name='Iný kurz')
+        okruhs = [
+            Okruh.objects.create(name=f'Okruh {index}', course=course, available=True)
+            for index, course in enumerate([cls.course, cls.course, other_course])
+        ]
+        cls.okruh = okruhs[0]
+        questions = Question.objects.bulk_create([
+            Question(
+                name=f'Otázka {index}',
+                okruh=okruh,
+                created_by=cls.user,
+                visible=index % 3 != 0,
+                approved=index % 4 != 0,
+                reported=index % 10 == 0,
+            )
+            for okruh in okruhs
+            for index in range(60)
+        ])
+        cls.question = questions[0]
+        Comment.objects.bulk_create([
+            Comment(question=question, text=f'Komentár {index}', created_by=users[index])
+            for question in questions[::10]
+            for index in range(5)
+        ])
+        ChalangeQuestion.objects.bulk_create([
+            ChalangeQuestion(courseID=okruh.course, question=question)
+            for okruh, question in zip(okruhs, questions[::60])
+        ])
+        season_id = Season.objects.current_id()
+        Score.objects.bulk_create([
+            Score(user=user, course=course, season_id=season_id, points=index * 7 % 50)
+            for index, user in enumerate(users)
+            for course in (cls.course, other_course)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+
+    def assertIndexedPlans(self, queries, table, allow_sort=False):
+        """
+        Overí plány zachytených dotazov nad tabuľkou `table` (aspoň jeden musí byť).
+        """
+        statements = [query['sql'] for query in queries if f'FROM "{table}"' in query['sql']]
+        self.assertTrue(statements, f"Žiadny dotaz nad tabuľkou {table}.")
+        for sql in statements:
+            plan = query_plan(sql)
+            for detail in plan:
+                self.assertFalse(
+                    detail.startswith('SCAN ') and detail != 'SCAN CONSTANT ROW',
+                    f"Prechod celej tabuľky v pláne {plan} pre dotaz {sql}",
+                )
+                if not allow_sort:
+                    self.assertNotIn('USE TEMP B-TREE', detail, f"Zoradenie bez indexu v pláne {plan} pre dotaz {sql}")
+
+    def get_queries(self, url):
+        """
+        Zavolá endpoint a vráti zachytené SQL dotazy.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return context.captured_queries
+
+    def test_questions_for_okruh(self):
+        url = f'/api/question/query?okruhID={self.okruh.id}&page_size=10'
+        self.assertIndexedPlans(self.get_queries(url), 'otazky_question')
+        next_url = self.client.get(url).json()['next']
+        self.assertIndexedPlans(self.get_queries(next_url), 'otazky_question')
+
+    def test_reported_questions_for_lecture(self):
+        url = f'/api/question/reported/query?lectureID={self.okruh.id}'
+        self.assertIndexedPlans(self.get_queries(url), 'otazky_question')
+        self.assertIndexedPlans(self.get_queries(f'{url}&page_size=5'), 'otazky_question')
+
+    def test_comments_for_question(self):
+        url = f'/api/comment/query?questionID={self.question.id}&page_size=2'
+        self.assertIndexedPlans(self.get_queries(url), 'otazky_comment')
+        next_url = self.client.get(url).json()['next']
+        self.assertIndexedPlans(self.get_queries(next_url), 'otazky_comment')
+
+    def test_question_bundle(self):
+        queries = self.get_queries(f'/api/question/bundle?questionID={self.question.id}&page_size=2')
+        self.assertIndexedPlans(queries, 'otazky_comment')
+        self.assertIndexedPlans(queries, 'otazky_question')
+
+    def test_study_pack(self):
+        self.assertIndexedPlans(self.get_queries(f'/api/lectures/studypack?okruhID={self.okruh.id}'), 'otazky_question')
+
+    def test_challenge_selection(self):
+        with CaptureQueriesContext(connection) as context:
+            selection = select_challenge_questions(self.course.id)
+        self.assertTrue(selection['question_ids'])
+        self.assertIndexedPlans(context.captured_queries, 'otazky_question')
+
+    def test_challenge_questions(self):
+        # Otázky výzvy sa zoradia až po výbere podľa indexu, zoradenie niekoľkých riadkov je v poriadku
+        queries = self.get_queries(f'/api/challange/query?courseID={self.course.id}')
+        self.assertIndexedPlans(queries, 'otazky_question', allow_sort=True)
+        self.assertTrue(any('"otazky_chalangequestion"' in query['sql'] for query in queries))
+
+    def test_leaderboard_load(self):
+        self.assertIndexedPlans(self.get_queries(f'/api/score/?courseID={self.course.id}'), 'otazky_score')
+
+    def test_season_history_from_scores(self):
+        url = f'/api/score/history?courseID={self.course.id}&season={Season.objects.current_id()}'
+        self.assertIndexedPlans(self.get_queries(url), 'otazky_score')
+
+
+class QuestionSearchTests(TestCase):
+    """
+    Kontroluje fulltextové vyhľadávanie otázok a udržiavanie jeho indexu signálmi.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='autor')
+        cls.course = Course.objects.create(name='Fyzika')
+        cls.okruh = Okruh.objects.create(name='Kvantovanie', course=cls.course)
+        cls.other_okruh = Okruh.objects.create(name='Mechanika', course=cls.course)
+
+    def create_question(self, okruh, name, text=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Question.objects.create(okruh=okruh, name=name, text=text, created_by=self.user)
+
+    def test_diacritics_insensitive_and_prefix(self):
+        question = self.create_question(self.okruh, 'Čo opisuje Schrödingerova rovnica?', 'Kvantová mechanika')
+        self.create_question(self.other_okruh, 'Newtonove zákony')
+
+        self.assertEqual([q.id for q in search_questions('kvantova')], [question.id])
+        self.assertEqual([q.id for q in search_questions('schrodinger')], [question.id])
+        self.assertEqual(search_questions('zákon', okruh_id=self.okruh.id), [])
+
+    def test_index_follows_answers_and_comments(self):
+        question = self.create_question(self.okruh, 'Otázka')
+        with self.captureOnCommitCallbacks(execute=True):
+            answer = Answer.objects.create(question=question, text='Planckova konštanta')
+            Comment.objects.create(question=question, text='Pozor na jednotky', created_by=self.user)
+        self.assertEqual([q.id for q in search_questions('planckova jednotky')], [question.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.delete()
+        self.assertEqual(search_questions('planckova'), [])
+
+    def test_endpoint_ranks_name_above_comment(self):
+        in_comment = self.create_question(self.okruh, 'Prvá otázka')
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(question=in_comment, text='fotón', created_by=self.user)
+        in_name = self.create_question(self.okruh, 'Energia fotónu')
+        rebuild_index()
+
+        response = self.client.get(f'/api/question/search?q=foton&courseID={self.course.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [str(in_name.id), str(in_comment.id)])
+        self.assertEqual(self.client.get('/api/question/search').status_code, 400)
+
+
+class AsyncViewTests(TestCase):
+    """
+    Kontroluje, že asynchrónne endpointy vracajú rovnaké odpovede ako synchrónne a zdieľajú s nimi cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='autor')
+        course = Course.objects.create(name='Kurz')
+        okruh = Okruh.objects.create(name='Okruh', course=course)
+        Question.objects.bulk_create([Question(name=f'Otázka {index}', okruh=okruh, created_by=user) for index in range(5)])
+        cls.urls = ['courses/', f'lectures/query?courseID={course.id}', f'question/query?okruhID={okruh.id}&page_size=2']
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_same_response_and_shared_cache(self):
+        for url in self.urls:
+            response = await self.async_client.get(f'/api/{url}')
+            async_response = await self.async_client.get(f'/api/async/{url}')
+            self.assertEqual(async_response.status_code, 200, url)
+            self.assertEqual(async_response['X-Cache'], 'HIT', url)
+            self.assertEqual(async_response['ETag'], response['ETag'], url)
+            body, async_body = response.json(), async_response.json()
+            if isinstance(body, dict):
+                # Odkaz na ďalšiu stranu vedie na endpoint, ktorý stranu uložil do zdieľanej cache
+                body, async_body = body['results'], async_body['results']
+            self.assertEqual(async_body, body, url)
+
+    async def test_not_modified(self):
+        response = await self.async_client.get(f'/api/{self.urls[1]}')
+        async_response = await self.async_client.get(
+            f'/api/async/{self.urls[1]}', headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(async_response.status_code, 304)
+
+
+
+class ContentVersionTests(TestCase):
+    """
+    Kontroluje verzie obsahu – odpoveď 304 bez dotazu do databázy a zvýšenie verzie signálmi.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='autor')
+        cls.course = Course.objects.create(name='Kurz')
+        cls.okruh = Okruh.objects.create(name='Okruh', course=cls.course)
+        cls.question = Question.objects.create(name='Otázka', okruh=cls.okruh, created_by=cls.user, visible=True, approved=True)
+        cls.answer = Answer.objects.create(question=cls.question, text='Odpoveď')
+
+    def setUp(self):
+        cache.clear()
+
+    def version(self):
+        return ContentVersion.objects.get(key=course_version_key(self.course.id)).version
+
+    def test_not_modified_without_queries(self):
+        paths = [
+            'courses/',
+            f'lectures/query?courseID={self.course.id}',
+            f'question/query?okruhID={self.okruh.id}',
+            f'answer/query?questionID={self.question.id}',
+        ]
+        urls = [f'/api/{prefix}{path}' for prefix in ('', 'async/') for path in paths]
+        urls.append(f'/api/lectures/studypack?okruhID={self.okruh.id}')
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            for header, value in (('If-None-Match', response['ETag']), ('If-Modified-Since', response['Last-Modified'])):
+                with self.assertNumQueries(0):
+                    not_modified = self.client.get(url, headers={header: value})
+                self.assertEqual(not_modified.status_code, 304, (url, header))
+                self.assertEqual(not_modified['ETag'], response['ETag'], (url, header))
+
+    def test_stale_etag_gets_new_data(self):
+        url = f'/api/question/query?okruhID={self.okruh.id}'
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(name='Nová', okruh=self.okruh, created_by=self.user)
+        fresh = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual((fresh.status_code, len(fresh.json())), (200, 2))
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+
+    def test_signals_bump_course_version(self):
+        changes = [
+            lambda: Question.objects.create(name='Nová', okruh=self.okruh, created_by=self.user),
+            lambda: self.question.save(),
+            lambda: Answer.objects.create(question=self.question, text='Ďalšia'),
+            lambda: self.answer.save(),
+            lambda: self.answer.delete(),
+            lambda: Okruh.objects.create(name='Nový', course=self.course),
+            lambda: self.okruh.save(),
+            lambda: ChalangeQuestion.objects.create(courseID=self.course, question=self.question),
+            lambda: ChalangeQuestion.objects.get().delete(),
+            lambda: Question.objects.get(name='Nová').delete(),
+            lambda: Okruh.objects.get(name='Nový').delete(),
+        ]
+        key = course_version_key(self.course.id)
+        for index, change in enumerate(changes):
+            before = self.version()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertEqual(self.version(), before + 1, index)
+            # Nová verzia sa po potvrdení transakcie zapíše aj do cache
+            self.assertEqual(content_version(key)[0], before + 1, index)
+
+
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Kontroluje cache odpovedí – zásah, invalidáciu zmenou obsahu a počítadlá.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='autor')
+        cls.other = User.objects.create(username='iny')
+        cls.course = Course.objects.create(name='Kurz')
+        cls.okruh = Okruh.objects.create(name='Okruh', course=cls.course)
+        cls.question = Question.objects.create(name='Otázka', okruh=cls.okruh, created_by=cls.user, visible=True, approved=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_and_miss_after_save(self):
+        url = f'/api/question/query?okruhID={self.okruh.id}'
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        self.question.name = 'Premenovaná'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()[0]['name'], 'Premenovaná')
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(response_cache.stats()['questions'], {'hit': 2, 'miss': 2})
+
+        response_cache.reset_stats()
+        self.assertEqual(response_cache.stats()['questions'], {'hit': 0, 'miss': 0})
+
+    def test_stats_per_endpoint(self):
+        self.get('/api/courses/')
+        self.get('/api/courses/')
+        self.get(f'/api/lectures/query?courseID={self.course.id}')
+        stats = response_cache.stats()
+        self.assertEqual(stats['courses'], {'hit': 1, 'miss': 1})
+        self.assertEqual(stats['lectures'], {'hit': 0, 'miss': 1})
+        self.assertEqual(stats['questions'], {'hit': 0, 'miss': 0})
+
+    def test_achievements_version_per_user(self):
+        url = f'/api/user/{self.user.id}/achievements/'
+        other_url = f'/api/user/{self.other.id}/achievements/'
+        self.assertEqual(self.get(url).json(), [])
+        self.get(other_url)
+        key = achievements_version_key(self.user.id)
+        before = content_version(key)[0]
+
+        # `award` vkladá priradenia cez bulk_create bez signálu, verziu zvyšuje sám
+        with self.captureOnCommitCallbacks(execute=True):
+            award({'Prvý krok': [self.user.id]})
+        self.assertEqual(content_version(key)[0], before + 1)
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([row['name'] for row in response.json()], ['Prvý krok'])
+        self.assertEqual(self.get(other_url)['X-Cache'], 'HIT')
+
+        achievement = Achievement.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            achievement.awarded_to.add(self.other)
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(len(self.get(other_url).json()), 1)
+
+
+
+
+class UserAuthTests(TestCase):
+    """
+    Kontroluje claimy v tokenoch a cache používateľov pri JWT autentifikácii.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='spravca', password='heslo-123', is_staff=True)
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def auth(self, user=None):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user or self.user)}'}
+
+    def test_token_claims(self):
+        response = self.client.post('/api/token/', {'username': 'spravca', 'password': 'heslo-123'})
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(refreshed.status_code, 200)
+        for access in (tokens['access'], refreshed.json()['access']):
+            token = AccessToken(access)
+            self.assertEqual((token['username'], token['is_staff']), ('spravca', True))
+            with self.assertNumQueries(0):
+                response = self.client.post('/api/user/', {'access_token': access})
+            self.assertEqual(response.json(), 'spravca')
+
+    def test_cache_hit_without_queries(self):
+        # Token bez claimu `username` (vydaný pred jeho zavedením) – meno sa berie z cache
+        access = str(AccessToken.for_user(self.user))
+        user_url = f'/api/user/query?user_id={self.user.id}'
+        self.assertEqual(self.client.post('/api/user/', {'access_token': access}).json(), 'spravca')
+        self.assertEqual(self.client.get(user_url, **self.auth()).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.post('/api/user/', {'access_token': access}).json(), 'spravca')
+            response = self.client.get(user_url, **self.auth())
+        self.assertEqual([row['username'] for row in response.json()], ['spravca'])
+
+    def test_save_invalidates_cache(self):
+        url = f'/api/user/query?user_id={self.user.id}'
+        self.client.get(url, **self.auth())
+        user = User.objects.get(id=self.user.id)
+        user.username = 'premenovany'
+        user.save()
+        self.assertIsNone(user_cache.get(user.id))
+        self.assertEqual(self.client.get(url, **self.auth()).json()[0]['username'], 'premenovany')
+
+    def test_inactive_user_rejected(self):
+        url = f'/api/user/query?user_id={self.user.id}'
+        inactive = User.objects.get(id=self.user.id)
+        inactive.is_active = False
+        # Neaktívny používateľ už je v cache (napr. z iného procesu pred uplynutím TTL)
+        user_cache.set(inactive.id, inactive)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, **self.auth()).status_code, 401)
+
+        user_cache.clear()
+        self.client.get(url, **self.auth())
+        inactive.save()
+        self.assertEqual(self.client.get(url, **self.auth()).status_code, 401)
+
+
+
+
+class EnrollmentCacheTests(TestCase):
+    """
+    Kontroluje cache zapísaných kurzov a katalógu kurzov a jej invalidáciu signálmi.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, cls.other = User.objects.bulk_create([User(username='student'), User(username='iny')])
+        cls.first, cls.second = Course.objects.bulk_create([Course(name='Prvý'), Course(name='Druhý')])
+        cls.first.visited_by.add(cls.student, cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def visited(self, user=None):
+        response = self.client.get(f'/api/courses/visited?user_id={(user or self.student).id}')
+        self.assertEqual(response.status_code, 200)
+        return [course['name'] for course in response.json()]
+
+    def assertInvalidated(self, *keys):
+        for key in keys:
+            self.assertIsNone(cache.get(key), key)
+
+    def enrollment_key(self, user):
+        return ENROLLMENT_CACHE_KEY.format(user_id=user.id)
+
+    def test_warm_cache_without_queries(self):
+        self.assertEqual(self.visited(), ['Prvý'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.visited(), ['Prvý'])
+
+    def test_visited_by_changes_invalidate(self):
+        changes = [
+            (lambda: self.second.visited_by.add(self.student), ['Prvý', 'Druhý']),
+            (lambda: self.second.visited_by.remove(self.student), ['Prvý']),
+            (lambda: self.student.course_set.add(self.second), ['Prvý', 'Druhý']),
+            (lambda: self.student.course_set.remove(self.first), ['Druhý']),
+            (lambda: self.student.course_set.clear(), []),
+            (lambda: self.second.visited_by.set([self.student, self.other]), ['Druhý']),
+            (lambda: self.second.visited_by.clear(), []),
+        ]
+        for change, expected in changes:
+            self.visited()
+            self.visited(self.other)
+            change()
+            self.assertInvalidated(self.enrollment_key(self.student))
+            self.assertEqual(self.visited(), expected)
+        self.assertEqual(self.visited(self.other), ['Prvý'])
+
+    def test_course_changes_invalidate_catalog(self):
+        self.visited()
+        self.first.name = 'Premenovaný'
+        self.first.save()
+        self.assertInvalidated(COURSE_CATALOG_CACHE_KEY)
+        self.assertEqual(self.visited(), ['Premenovaný'])
+
+        self.first.delete()
+        self.assertInvalidated(COURSE_CATALOG_CACHE_KEY, self.enrollment_key(self.student))
+        self.assertEqual(self.visited(), [])
+
+
+
+
+class CourseCompletionTests(TestCase):
+    """
+    Kontroluje počítadlá dokončenia kurzov voči počtu spočítanému od nuly.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, cls.other = User.objects.bulk_create([User(username='student'), User(username='iny')])
+        cls.first, cls.second = Course.objects.create(name='Prvý'), Course.objects.create(name='Druhý')
+        cls.okruhs = [Okruh.objects.create(name=f'Okruh {index}', course=cls.first) for index in range(3)]
+        cls.okruhs.append(Okruh.objects.create(name='Okruh 3', course=cls.second))
+
+    def assertConsistent(self, step=None):
+        """
+        Porovná počítadlá s počtami spočítanými priamo z `Okruh.finished_by` a `Okruh`.
+        """
+        expected = {}
+        for user_id, course_id in Okruh.finished_by.through.objects.values_list('user_id', 'okruh__course_id'):
+            expected[user_id, course_id] = expected.get((user_id, course_id), 0) + 1
+        counters = {
+            (row.user_id, row.course_id): row.completed for row in CourseCompletion.objects.exclude(completed=0)
+        }
+        self.assertEqual(counters, expected, step)
+        lecture_counts = {course.id: course.okruh_set.count() for course in Course.objects.all()}
+        self.assertEqual(dict(Course.objects.values_list('id', 'lecture_count')), lecture_counts, step)
+
+    def test_counters_follow_changes(self):
+        first, second, third, remote = self.okruhs
+        changes = [
+            lambda: first.finished_by.add(self.student, self.other),
+            lambda: first.finished_by.add(self.student),
+            lambda: self.student.okruh_set.add(second, remote),
+            lambda: first.finished_by.remove(self.other),
+            lambda: self.student.okruh_set.remove(first),
+            lambda: second.finished_by.clear(),
+            lambda: self.other.okruh_set.add(first, second, third),
+            lambda: self.other.okruh_set.clear(),
+            lambda: third.finished_by.set([self.student, self.other]),
+            lambda: Okruh.objects.create(name='Nový', course=self.first),
+            lambda: third.delete(),
+            lambda: setattr(second, 'course', self.second) or second.save(),
+        ]
+        for step, change in enumerate(changes):
+            change()
+            self.assertConsistent(step)
+
+    def test_rebuild_from_scratch(self):
+        first, second, _, remote = self.okruhs
+        first.finished_by.add(self.student, self.other)
+        self.student.okruh_set.add(second, remote)
+        CourseCompletion.objects.update(completed=99)
+        Course.objects.update(lecture_count=0)
+
+        call_command('rebuild_course_completion', stdout=StringIO())
+        self.assertConsistent()
+        self.assertEqual(course_completion(self.student), [
+            {'course': 'Prvý', 'completion_percentage': 66.67},
+            {'course': 'Druhý', 'completion_percentage': 100.0},
+        ])
+
+    def test_query_counts(self):
+        self.okruhs[0].finished_by.add(self.student)
+        with self.assertNumQueries(1):
+            course_completion(self.student)
+        with CaptureQueriesContext(connection) as small:
+            rebuild_completion()
+        # Počet dotazov nezávisí od počtu kurzov, okruhov ani používateľov
+        course = Course.objects.create(name='Tretí')
+        users = User.objects.bulk_create([User(username=f'user{index}') for index in range(5)])
+        for index in range(3):
+            Okruh.objects.create(name=f'Ďalší {index}', course=course).finished_by.add(*users)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(rebuild_completion(), 6)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertConsistent()
+
+
+
+
+def redis_available():
+    """
+    Zistí, či beží Redis server z nastavenia `LEADERBOARD_REDIS_URL`.
+    """
+    try:
+        import redis
+
+        return redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL, socket_connect_timeout=0.2).ping()
+    except Exception:
+        return False
+
+
+class LeaderboardBackendMixin:
+    """
+    Spoločné testy backendov rebríčka, podtrieda vytvorí rebríček v `make_leaderboard`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{index}') for index in range(4)])
+        cls.course = Course.objects.create(name='Kurz')
+        season_id = Season.objects.current_id()
+        cls.scores = Score.objects.bulk_create([
+            Score(user=user, course=cls.course, season_id=season_id, points=points)
+            for user, points in zip(cls.users, (30, 20, 20, 10))
+        ])
+
+    def setUp(self):
+        self.leaderboard = self.make_leaderboard()
+        self.leaderboard.reset()
+        self.addCleanup(self.leaderboard.reset)
+        # Signály a views používajú rebríček testovaného backendu
+        patcher = mock.patch('otazky.leaderboard._leaderboard', self.leaderboard)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def points(self, user):
+        entry = self.leaderboard.rank(self.course.id, user.id)
+        return entry and entry.points
+
+    def test_loads_scores_and_ranks_ties(self):
+        top = self.leaderboard.top(self.course.id)
+        self.assertEqual([(entry.rank, entry.points) for entry in top], [(1, 30), (2, 20), (2, 20), (4, 10)])
+        self.assertEqual(self.leaderboard.rank(self.course.id, self.users[3].id).rank, 4)
+        self.assertEqual([entry.points for entry in self.leaderboard.top(self.course.id, limit=2, offset=1)], [20, 20])
+        above, below = self.leaderboard.around(self.course.id, self.users[0].id, 1)
+        self.assertEqual((above, [entry.points for entry in below]), ([], [20]))
+        self.assertEqual(self.leaderboard.count(self.course.id), 4)
+
+    def test_score_writes_apply_after_commit(self):
+        self.leaderboard.top(self.course.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Score.objects.upsert(self.users[3].id, self.course.id, 50)
+        self.assertEqual(self.points(self.users[3]), 10)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.leaderboard.rank(self.course.id, self.users[3].id).rank, 1)
+
+        # Vrátená transakcia rebríček nezmení
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                Score.objects.upsert(self.users[3].id, self.course.id, 5, increment=True)
+                raise DatabaseError
+        self.assertEqual(self.points(self.users[3]), 50)
+
+    def test_deleted_score_leaves_board(self):
+        self.leaderboard.top(self.course.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.get(pk=self.scores[0].pk).delete()
+        self.assertIsNone(self.leaderboard.rank(self.course.id, self.users[0].id))
+        self.assertEqual(self.leaderboard.rank(self.course.id, self.users[1].id).rank, 1)
+
+    def test_concurrent_load_is_not_overwritten_or_counted_twice(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Score.objects.upsert(self.users[3].id, self.course.id, 5, increment=True)
+        load_from_db = self.leaderboard._load_from_db
+
+        def racing_load(board):
+            # Iný proces načíta rebríček (už s potvrdenou zmenou) tesne pred týmto procesom
+            load_from_db(board)
+            return load_from_db(board)
+
+        with mock.patch.object(self.leaderboard, '_load_from_db', side_effect=racing_load):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.points(self.users[3]), 15)
+
+        # Neskoré načítanie so starými dátami živý rebríček neprepíše
+        board = self.leaderboard._board(self.course.id)
+        self.assertFalse(self.leaderboard._load(board, [(self.users[3].id, 0)]))
+        self.assertEqual(self.points(self.users[3]), 15)
+
+
+class InMemoryLeaderboardTests(LeaderboardBackendMixin, TestCase):
+    """
+    Kontroluje rebríček v pamäti procesu a endpointy rebríčka.
+    """
+
+    def make_leaderboard(self):
+        return InMemoryLeaderboard()
+
+    def test_score_view_rows(self):
+        rows = self.client.get(f'/api/score/?courseID={self.course.id}&limit=2').json()
+        self.assertEqual(
+            [(row['id'], row['rank'], row['user'], row['username'], row['points']) for row in rows],
+            [(str(score.pk), rank, score.user_id, user.username, score.points)
+             for score, user, rank in zip(self.scores[:2], self.users, (1, 2))],
+        )
+
+    def test_score_rank_view(self):
+        data = self.client.get(f'/api/score/rank?courseID={self.course.id}&user_id={self.users[1].id}&around=1').json()
+        self.assertEqual(data['total'], 4)
+        self.assertEqual((data['me']['rank'], data['me']['id']), (2, str(self.scores[1].pk)))
+        self.assertEqual([row['user'] for row in data['above'] + data['below']], [self.users[0].id, self.users[2].id])
+
+
+@skipUnless(redis_available(), "Redis server nie je dostupný (LEADERBOARD_REDIS_URL).")
+class RedisLeaderboardTests(LeaderboardBackendMixin, TestCase):
+    """
+    Kontroluje rebríček v Redis sorted sets (kľúče s predponou `test-leaderboard`).
+    """
+
+    def make_leaderboard(self):
+        return RedisLeaderboard(prefix='test-leaderboard')
+
+class LeaderboardStreamTests(TestCase):
+    """
+    Kontroluje udalosti živého rebríčka po zápisoch skóre.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{index}') for index in range(3)])
+        cls.course = Course.objects.create(name='Kurz')
+        season_id = Season.objects.current_id()
+        Score.objects.bulk_create([
+            Score(user=user, course=cls.course, season_id=season_id, points=points)
+            for user, points in zip(cls.users, (30, 20, 10))
+        ])
+
+    def setUp(self):
+        get_leaderboard().reset()
+
+    def write_score(self, user, points):
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.upsert(user.id, self.course.id, points)
+
+    async def read_events(self, events, count):
+        """
+        Prečíta `count` udalostí a vráti ich ako zoznam dvojíc (názov, dáta).
+        """
+        result = []
+        for _ in range(count):
+            lines = (await anext(events)).splitlines()
+            result.append((lines[0].removeprefix('event: '), json.loads(lines[1].removeprefix('data: '))))
+        return result
+
+    async def test_rank_and_top_follow_score_writes(self):
+        viewer = self.users[2]
+        events = leaderboard_events(self.course.id, user_id=viewer.id, limit=2)
+        (_, top), (_, rank) = await self.read_events(events, 2)
+        self.assertEqual([row['user'] for row in top], [self.users[0].id, self.users[1].id])
+        self.assertEqual(rank, {'rank': 3, 'points': 10})
+
+        # Druhý používateľ predbehne prvého, divák zostáva tretí
+        await sync_to_async(self.write_score)(self.users[1], 40)
+        (_, score), (_, top) = await self.read_events(events, 2)
+        self.assertEqual((score['rank'], score['previous_rank']), (1, 2))
+        self.assertEqual([row['user'] for row in top], [self.users[1].id, self.users[0].id])
+
+        # Divák predbehne oboch
+        await sync_to_async(self.write_score)(viewer, 50)
+        _, _, (name, rank) = await self.read_events(events, 3)
+        self.assertEqual((name, rank), ('rank', {'rank': 1, 'points': 50}))
+        await events.aclose()
+
+    async def test_endpoint_requires_course(self):
+        response = await self.async_client.get('/api/async/score/stream')
+        self.assertEqual(response.status_code, 400)
+
+    def test_endpoint_refused_under_wsgi(self):
+        # Testovací klient je WSGI – prúd by sa nikdy neskončil, požiadavka musí hneď vrátiť 404
+        responses = []
+        thread = threading.Thread(
+            target=lambda: responses.append(self.client.get(f'/api/async/score/stream?courseID={self.course.id}'))
+        )
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), "Požiadavka na prúd pod WSGI sa neskončila.")
+        self.assertEqual(responses[0].status_code, 404)
+
+
+class LikeTests(TestCase):
+    """
+    Kontroluje lajky s kombinovaním zápisov – deduplikáciu, čítanie s čakajúcimi zmenami a dávkový zápis.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{index}') for index in range(3)])
+        okruh = Okruh.objects.create(name='Okruh', course=Course.objects.create(name='Kurz'))
+        cls.question = Question.objects.create(name='Otázka', okruh=okruh, created_by=cls.users[0], likes=5)
+        cls.comment = Comment.objects.create(question=cls.question, text='Komentár', created_by=cls.users[0])
+
+    def setUp(self):
+        cache.clear()
+        get_like_buffer().clear()
+
+    def request(self, method, url, user):
+        return getattr(self.client, method)(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}').json()
+
+    def test_likes_are_deduplicated_and_read_live(self):
+        url = f'/api/question/{self.question.id}/like'
+        for user in self.users[:2]:
+            self.request('post', url, user)
+        self.assertEqual(self.request('post', url, self.users[0]), {'likes': 7, 'liked': True})
+        self.assertEqual(self.request('delete', url, self.users[1]), {'likes': 6, 'liked': False})
+        self.assertEqual(self.request('delete', url, self.users[1])['likes'], 6)
+
+        # Databáza sa zatiaľ nezmenila, čítanie pripočíta čakajúci rozdiel
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.likes, 5)
+        row = self.client.get(f'/api/question/query?okruhID={self.question.okruh_id}').json()[0]
+        self.assertEqual(row['likes'], 6)
+
+    def test_cached_list_reads_live_likes(self):
+        urls = [f'/api/{prefix}question/query?okruhID={self.question.okruh_id}' for prefix in ('', 'async/')]
+        first = self.client.get(urls[0])
+        self.assertEqual((first['X-Cache'], first.json()[0]['likes']), ('MISS', 5))
+
+        for user in self.users[:2]:
+            self.request('post', f'/api/question/{self.question.id}/like', user)
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual((response['X-Cache'], response.json()[0]['likes']), ('HIT', 7), url)
+
+        # Zápis lajkov nemení verziu obsahu ani uložené odpovede, počet zostáva aktuálny
+        self.assertEqual(flush_pending_likes(), 1)
+        self.request('delete', f'/api/question/{self.question.id}/like', self.users[0])
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual((response['X-Cache'], response['ETag']), ('HIT', first['ETag']), url)
+            self.assertEqual(response.json()[0]['likes'], 6, url)
+        self.assertEqual(self.client.get(urls[0], HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_flush_writes_pending_deltas(self):
+        for user in self.users:
+            self.request('post', f'/api/question/{self.question.id}/like', user)
+            self.request('post', f'/api/comment/{self.comment.id}/like', user)
+        self.request('delete', f'/api/comment/{self.comment.id}/like', self.users[0])
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(flush_pending_likes(), 2)
+        # Jeden UPDATE pre otázky a jeden pre komentáre
+        self.assertEqual(sum('SET "likes"' in query['sql'] for query in context.captured_queries), 2)
+        self.question.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.question.likes, self.comment.likes), (8, 2))
+
+        self.assertEqual(flush_pending_likes(), 0)
+        self.assertEqual(self.request('get', f'/api/question/{self.question.id}/like', self.users[0]), {'likes': 8, 'liked': True})
+
+    def test_pending_likes_survive_cache_loss(self):
+        for user in self.users[:2]:
+            self.request('post', f'/api/question/{self.question.id}/like', user)
+        # Vyradenie kľúčov z cache (napr. pri preplnení LocMemCache) čakajúce lajky nezahodí
+        cache.clear()
+        self.assertEqual(flush_pending_likes(), 1)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.likes, 7)
+
+    def test_failed_flush_is_retried(self):
+        self.request('post', f'/api/question/{self.question.id}/like', self.users[0])
+        with mock.patch.object(QuerySet, 'update', side_effect=DatabaseError):
+            with self.assertRaises(RuntimeError):
+                flush_pending_likes()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.likes, 5)
+
+        # Ďalší lajk aj zlyhaný rozdiel sa zapíšu pri ďalšom spustení
+        self.request('post', f'/api/question/{self.question.id}/like', self.users[1])
+        self.assertEqual(flush_pending_likes(), 1)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.likes, 7)
+        self.assertEqual(flush_pending_likes(), 0)
+
+
+
+class WeeklyFirstPlaceTests(TestCase):
+    """
+    Kontroluje, že achievement za 1. miesto sa udeľuje iba za uzavretú sezónu.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.leader, cls.runner_up = User.objects.bulk_create([User(username='leader'), User(username='runner_up')])
+        cls.course = Course.objects.create(name='Kurz')
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+
+    def winners(self):
+        return set(
+            Achievement.objects.filter(name='Dosiahnuté 1. miesto v Kurz').values_list('awarded_to', flat=True)
+        ) - {None}
+
+    def test_awarded_for_last_closed_season_only(self):
+        Score.objects.upsert(self.leader.id, self.course.id, 10)
+        Score.objects.upsert(self.runner_up.id, self.course.id, 5)
+        evaluate_rules()
+        self.assertEqual(self.winners(), set())
+
+        closed_season_id = Season.objects.current_id()
+        Season.objects.start_new()
+        # Priebežné poradie novej sezóny sa neoceňuje
+        Score.objects.upsert(self.runner_up.id, self.course.id, 20)
+        evaluate_rules()
+        self.assertEqual(self.winners(), {self.leader.id})
+
+        # Po archivácii sa víťaz číta z archívu rebríčka
+        archive_closed_season(closed_season_id)
+        self.assertFalse(Score.objects.filter(season_id=closed_season_id).exists())
+        Achievement.awarded_to.through.objects.all().delete()
+        evaluate_rules(['weekly_first_place'])
+        self.assertEqual(self.winners(), {self.leader.id})
+
+
+class WeeklyChallengeTests(TestCase):
+    """
+    Kontroluje generovanie týždennej výzvy (chord `select_challenge_questions` a `swap_weekly_challenge`).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='autor')
+        cls.large, cls.small, cls.closed = (Course.objects.create(name=name) for name in ('Veľký', 'Malý', 'Zatvorený'))
+        cls.questions = {}
+        for course, available, count in ((cls.large, True, 7), (cls.small, True, 2), (cls.closed, False, 3)):
+            okruh = Okruh.objects.create(name='Okruh', course=course, available=available)
+            cls.questions[course.id] = {
+                Question.objects.create(name=f'Otázka {index}', okruh=okruh, created_by=cls.user, visible=True, approved=True).id
+                for index in range(count)
+            }
+        Question.objects.create(name='Skrytá', okruh=okruh, created_by=cls.user, visible=False, approved=True)
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+
+    def versions(self):
+        return dict(ContentVersion.objects.filter(
+            key__in=[course_version_key(course_id) for course_id in self.questions]
+        ).values_list('key', 'version'))
+
+    def test_generate_replaces_challenge(self):
+        stale = ChalangeQuestion.objects.create(courseID=self.closed, question_id=next(iter(self.questions[self.closed.id])))
+        challenge_payload(self.closed.id)
+        before = self.versions()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_weekly_challenge()
+
+        self.assertFalse(ChalangeQuestion.objects.filter(id=stale.id).exists())
+        selected = {}
+        for course_id, question_id in ChalangeQuestion.objects.values_list('courseID', 'question'):
+            selected.setdefault(course_id, set()).add(question_id)
+        self.assertEqual(set(selected), {self.large.id, self.small.id})
+        self.assertEqual(len(selected[self.large.id]), CHALLENGE_QUESTIONS_PER_OKRUH)
+        self.assertLessEqual(selected[self.large.id], self.questions[self.large.id])
+        self.assertEqual(selected[self.small.id], self.questions[self.small.id])
+
+        after = self.versions()
+        for course in (self.large, self.small):
+            key = course_version_key(course.id)
+            self.assertEqual(after[key], before.get(key, 0) + 1, course.name)
+            self.assertEqual(content_version(key)[0], after[key], course.name)
+
+        for course_id in self.questions:
+            snapshot = ChallengeSnapshot.objects.get(course_id=course_id)
+            ids = {uuid.UUID(row['id']) for row in snapshot.payload}
+            self.assertEqual(ids, selected.get(course_id, set()), course_id)
+            self.assertEqual(cache.get(CHALLENGE_CACHE_KEY.format(course_id=course_id)), (snapshot.payload, snapshot.etag))
+
+
+
+class SeasonArchiveTests(TestCase):
+    """
+    Kontroluje archiváciu uzavretej sezóny, mazanie jej skóre a rebríček uzavretej sezóny.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'hrac{index}') for index in range(3)])
+        cls.course, cls.other_course = Course.objects.create(name='Kurz'), Course.objects.create(name='Iný')
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+        self.closed_id = Season.objects.current_id()
+        for user, points in zip(self.users, (10, 10, 5)):
+            Score.objects.upsert(user.id, self.course.id, points)
+        Score.objects.upsert(self.users[2].id, self.other_course.id, 3)
+        Season.objects.start_new()
+        Score.objects.upsert(self.users[0].id, self.course.id, 1)
+
+    def history(self, query=''):
+        response = self.client.get(f'/api/score/history?courseID={self.course.id}{query}')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['season']['id'], [
+            (row['rank'], row['user'], row['username'], row['points']) for row in data['results']
+        ]
+
+    def test_archive_season(self):
+        self.assertEqual(archive_season(self.closed_id), 2)
+        standing = SeasonStanding.objects.get(season_id=self.closed_id, course=self.course)
+        self.assertEqual(standing.ranking, [
+            [1, self.users[0].id, 10], [1, self.users[1].id, 10], [3, self.users[2].id, 5],
+        ])
+        self.assertFalse(SeasonStanding.objects.filter(season_id=Season.objects.current_id()).exists())
+
+        # Opakovaná archivácia archív prepíše
+        Score.objects.filter(season_id=self.closed_id, user=self.users[2], course=self.course).update(points=20)
+        self.assertEqual(archive_season(self.closed_id), 2)
+        standing.refresh_from_db()
+        self.assertEqual(standing.ranking[0], [1, self.users[2].id, 20])
+
+    def test_prune_season_scores(self):
+        self.assertEqual(prune_season_scores(self.closed_id, batch_size=3), 4)
+        self.assertFalse(Score.objects.filter(season_id=self.closed_id).exists())
+        self.assertEqual(Score.objects.filter(season_id=Season.objects.current_id()).count(), 1)
+        self.assertEqual(prune_season_scores(self.closed_id), 0)
+
+    def test_history_from_scores_and_archive(self):
+        expected = (self.closed_id, [
+            (1, self.users[0].id, 'hrac0', 10), (1, self.users[1].id, 'hrac1', 10), (3, self.users[2].id, 'hrac2', 5),
+        ])
+        self.assertEqual(self.history(), expected)
+        archive_season(self.closed_id)
+        prune_season_scores(self.closed_id)
+        # Po zmazaní skóre sa rebríček číta z archívu
+        self.assertEqual(self.history(), expected)
+        self.assertEqual(self.history(f'&season={self.closed_id}&limit=2'), (self.closed_id, expected[1][:2]))
+
+        # Predvolená je naposledy uzavretá sezóna
+        current_id = Season.objects.current_id()
+        Season.objects.start_new()
+        self.assertEqual(self.history(), (current_id, [(1, self.users[0].id, 'hrac0', 1)]))
+        self.assertEqual(self.client.get(f'/api/score/history?courseID={self.course.id}&season=999').status_code, 404)
+
+    def test_history_without_closed_season(self):
+        Season.objects.all().delete()
+        cache.clear()
+        self.assertEqual(self.client.get(f'/api/score/history?courseID={self.course.id}').status_code, 404)
+
+
+
+class QuizTestCase(TestCase):
+    """
+    Spoločné dáta testov kvízu: okruh s 12 zverejnenými otázkami (jedna správna a jedna
+    nesprávna odpoveď) a jednou skrytou a jednou neschválenou otázkou.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student, cls.other = User.objects.bulk_create([User(username='student'), User(username='other')])
+        cls.course = Course.objects.create(name='Kurz')
+        cls.okruh = Okruh.objects.create(name='Okruh', course=cls.course)
+        cls.questions = [
+            Question.objects.create(name=f'Otázka {index}', okruh=cls.okruh, created_by=cls.student, visible=True, approved=True)
+            for index in range(12)
+        ]
+        cls.hidden = [
+            Question.objects.create(name='Skrytá', okruh=cls.okruh, created_by=cls.student, visible=False, approved=True),
+            Question.objects.create(name='Neschválená', okruh=cls.okruh, created_by=cls.student, visible=True, approved=False),
+        ]
+        cls.correct, cls.wrong = {}, {}
+        for question in cls.questions + cls.hidden:
+            cls.correct[question.id] = Answer.objects.create(question=question, text='Áno', answer_type=True).id
+            cls.wrong[question.id] = Answer.objects.create(question=question, text='Nie', answer_type=False).id
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+
+    def api(self, method, url, user=None, data=None):
+        token = AccessToken.for_user(user or self.student)
+        return getattr(self.client, method)(
+            f'/api/{url}', data=data, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def start(self, user=None):
+        response = self.api('post', 'quiz/start', user, {'okruhID': self.okruh.id})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['session']
+
+    def batch(self, session_id, count='', user=None):
+        response = self.api('get', f'quiz/{session_id}/next?count={count}', user)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+class QuizSessionTests(QuizTestCase):
+    """
+    Kontroluje kvízové relácie – výber otázok, dávky, vlastníctvo a expiráciu.
+    """
+
+    def test_only_published_questions_are_served(self):
+        data = self.batch(self.start(), count=50)
+        self.assertEqual((data['total'], data['position'], data['done']), (12, 12, True))
+        self.assertEqual({question['id'] for question in data['questions']}, {str(question.id) for question in self.questions})
+
+    def test_batches_leave_out_answer_type(self):
+        questions = self.batch(self.start())['questions']
+        answers = [answer for question in questions for answer in question['answers']]
+        self.assertEqual(len(answers), 20)
+        self.assertTrue(all(set(answer) == {'id', 'text', 'question'} for answer in answers))
+
+    def test_batch_size_is_clamped(self):
+        session_id = self.start()
+        with mock.patch('otazky.views.MAX_BATCH_SIZE', 5):
+            self.assertEqual(len(self.batch(session_id, count=100)['questions']), 5)
+        # Neplatný počet použije predvolenú veľkosť dávky (10), zostáva iba 7 otázok
+        data = self.batch(session_id, count=0)
+        self.assertEqual((len(data['questions']), data['position'], data['done']), (7, 12, True))
+        self.assertEqual(self.batch(session_id)['questions'], [])
+
+    def test_session_belongs_to_its_user(self):
+        session_id = self.start()
+        self.assertEqual(self.api('get', f'quiz/{session_id}/next', self.other).status_code, 404)
+        self.assertEqual(self.api('post', f'quiz/{session_id}/finish', self.other).status_code, 404)
+        self.assertEqual(self.api('post', f'quiz/{session_id}/grade', self.other, {'answers': []}).status_code, 404)
+        # Pokusy iného používateľa reláciu neukončili
+        self.assertEqual(len(self.batch(session_id, count=3)['questions']), 3)
+        self.assertEqual(self.api('post', f'quiz/{session_id}/finish').json(), {'served': 3, 'total': 12})
+        self.assertEqual(self.api('get', f'quiz/{session_id}/next').status_code, 404)
+
+    def test_session_expires(self):
+        session_id = self.start()
+        expired = time.time() + settings.QUIZ_SESSION_TIMEOUT + 1
+        with mock.patch('time.time', return_value=expired):
+            self.assertEqual(self.api('get', f'quiz/{session_id}/next').status_code, 404)
+
+    def test_concurrent_batches_are_disjoint(self):
+        session_id = self.start()
+        # Obe požiadavky načítali reláciu pred posunutím pozície tou druhou
+        first, second = get_session(session_id, self.student.id), get_session(session_id, self.student.id)
+        batches = [[question.id for question in next_batch(session, 4)] for session in (first, second)]
+        self.assertEqual([len(batch) for batch in batches], [4, 4])
+        self.assertFalse(set(batches[0]) & set(batches[1]))
+        self.assertEqual(second['position'], 8)
+        self.assertEqual(get_session(session_id, self.student.id)['position'], 8)
+
+        claim_session(first)
+        self.assertEqual(next_batch(second, 4), [])
+        self.assertIsNone(get_session(session_id, self.student.id))
+
+    def test_batch_extends_session(self):
+        session_id = self.start()
+        later = time.time() + settings.QUIZ_SESSION_TIMEOUT - 1
+        with mock.patch('time.time', return_value=later):
+            self.batch(session_id, count=2)
+        with mock.patch('time.time', return_value=later + settings.QUIZ_SESSION_TIMEOUT - 1):
+            self.assertEqual(self.batch(session_id, count=2)['position'], 4)
+
+    def test_okruh_without_published_questions(self):
+        empty = Okruh.objects.create(name='Prázdny', course=self.course)
+        Question.objects.create(name='Skrytá', okruh=empty, created_by=self.student, visible=False, approved=True)
+        self.assertEqual(self.api('post', 'quiz/start', data={'okruhID': empty.id}).status_code, 404)
+        self.assertEqual(self.api('post', 'quiz/start', data={'okruhID': 'x'}).status_code, 400)
+
+
+class QuizGradeTests(QuizTestCase):
+    """
+    Kontroluje vyhodnotenie kvízu a zápis bodov do skóre.
+    """
+
+    def serve(self, count, okruh=None):
+        okruh = okruh or self.okruh
+        response = self.api('post', 'quiz/start', data={'okruhID': okruh.id})
+        session_id = response.json()['session']
+        served = [question['id'] for question in self.batch(session_id, count=count)['questions']]
+        return session_id, served
+
+    def grade(self, session_id, answers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.api('post', f'quiz/{session_id}/grade', data={'answers': [str(answer) for answer in answers]})
+
+    def points(self):
+        return Score.objects.get(user=self.student, course=self.course).points
+
+    def test_correct_and_wrong_selection(self):
+        session_id, served = self.serve(3)
+        right, wrong, skipped = (uuid.UUID(question_id) for question_id in served)
+        data = self.grade(session_id, [self.correct[right], self.wrong[wrong]]).json()
+        results = {result['question']: result for result in data['results']}
+        self.assertEqual({question_id: result['correct'] for question_id, result in results.items()},
+                         {str(right): True, str(wrong): False, str(skipped): False})
+        self.assertEqual(results[str(wrong)]['correct_answers'], [str(self.correct[wrong])])
+        self.assertEqual((data['correct'], data['served'], data['total'], data['points']), (1, 3, 12, 1))
+        self.assertEqual(self.points(), 1)
+        self.assertEqual(get_leaderboard().rank(self.course.id, self.student.id).points, 1)
+
+    def test_partial_selection_is_wrong(self):
+        okruh = Okruh.objects.create(name='Viac odpovedí', course=self.course)
+        question = Question.objects.create(name='Otázka', okruh=okruh, created_by=self.student, visible=True, approved=True)
+        first, second = (Answer.objects.create(question=question, text=text, answer_type=True).id for text in 'AB')
+        wrong = Answer.objects.create(question=question, text='C', answer_type=False).id
+        for answers, correct in (([first], 0), ([first, second, wrong], 0), ([second, first], 1)):
+            session_id, _ = self.serve(1, okruh)
+            data = self.grade(session_id, answers).json()
+            self.assertEqual(data['correct'], correct, answers)
+            self.assertEqual(data['results'][0]['correct_answers'], sorted([str(first), str(second)]))
+
+    def test_answers_to_unserved_questions_are_ignored(self):
+        session_id, served = self.serve(2)
+        everything = list(self.correct.values())
+        data = self.grade(session_id, everything).json()
+        self.assertEqual({result['question'] for result in data['results']}, set(served))
+        self.assertEqual((data['correct'], data['served'], data['points']), (2, 2, 2))
+        self.assertEqual(self.points(), 2)
+
+    def test_session_is_graded_once(self):
+        session_id, served = self.serve(2)
+        answers = [self.correct[uuid.UUID(question_id)] for question_id in served]
+        self.assertEqual(self.grade(session_id, answers).status_code, 200)
+        self.assertEqual(self.grade(session_id, answers).status_code, 404)
+        self.assertEqual(self.api('post', f'quiz/{session_id}/finish').status_code, 404)
+        self.assertEqual(self.points(), 2)
+
+    def test_concurrent_grading_counts_once(self):
+        session_id, served = self.serve(2)
+        answers = [self.correct[uuid.UUID(question_id)] for question_id in served]
+        # Obe požiadavky načítali reláciu skôr, než ju ktorákoľvek vyhodnotila
+        first, second = (get_session(session_id, self.student.id) for _ in range(2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(grade_session(first, answers)['points'], 2)
+            self.assertIsNone(grade_session(second, answers))
+        self.assertEqual(self.points(), 2)
+
+    def test_session_is_claimed_by_one_thread(self):
+        session_id = self.start()
+        session = get_session(session_id, self.student.id)
+        barrier = threading.Barrier(8)
+        claimed = []
+
+        def claim():
+            barrier.wait()
+            claimed.append(claim_session(session))
+
+        threads = [threading.Thread(target=claim) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), [False] * 7 + [True])
+
+    def test_points_are_added_through_upsert(self):
+        Score.objects.create(user=self.student, course=self.course, points=5)
+        session_id, served = self.serve(3)
+        answers = [self.correct[uuid.UUID(question_id)] for question_id in served[:2]]
+        with mock.patch.object(Score.objects, 'upsert', wraps=Score.objects.upsert) as upsert:
+            self.assertEqual(self.grade(session_id, answers).json()['points'], 2)
+        upsert.assert_called_once_with(self.student.id, self.course.id, 2, increment=True)
+        self.assertEqual(self.points(), 7)
+        self.assertEqual(get_leaderboard().rank(self.course.id, self.student.id).points, 7)
+
+    def test_no_points_without_correct_answers(self):
+        session_id, served = self.serve(2)
+        with mock.patch.object(Score.objects, 'upsert') as upsert:
+            data = self.grade(session_id, [self.wrong[uuid.UUID(served[0])]]).json()
+        self.assertEqual((data['correct'], data['points']), (0, 0))
+        upsert.assert_not_called()
+
+    def test_answer_key_is_staff_only(self):
+        staff = User.objects.create(username='admin', is_staff=True)
+        question = self.questions[0]
+        url = f'/api/answer/query?questionID={question.id}'
+        for prefix in ('/api/answer/query', '/api/async/answer/query'):
+            response = self.client.get(f'{prefix}?questionID={question.id}')
+            self.assertEqual(response.status_code, 200, prefix)
+            self.assertTrue(all('answer_type' not in answer for answer in response.json()), prefix)
+        anonymous = self.client.get(url)
+        self.assertIn('Authorization', anonymous['Vary'])
+
+        admin = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(staff)}')
+        self.assertEqual(sorted(answer['answer_type'] for answer in admin.json()), [False, True])
+        self.assertNotEqual(admin['ETag'], anonymous['ETag'])
+        # Odpoveď bez správnosti sa správcovi nepotvrdí ako aktuálna
+        response = self.client.get(
+            url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(staff)}', HTTP_IF_NONE_MATCH=anonymous['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+        bundle = self.api('get', f'question/bundle?questionID={question.id}').json()
+        self.assertTrue(all('answer_type' not in answer for answer in bundle['answers']))
+        pack = self.api('get', f'lectures/studypack?okruhID={self.okruh.id}')
+        lines = [json.loads(line) for line in b''.join(pack.streaming_content).splitlines()]
+        self.assertEqual(len(lines), 12)
+        self.assertTrue(all('answer_type' not in answer for line in lines for answer in line['answers']))
+        pack = self.api('get', f'lectures/studypack?okruhID={self.okruh.id}', staff)
+        line = json.loads(b''.join(pack.streaming_content).splitlines()[0])
+        self.assertTrue(all('answer_type' in answer for answer in line['answers']))
+
+
+class ScoreWriteTests(TestCase):
+    """
+    Kontroluje zápis skóre jedným príkazom (`ScoreManager.upsert`, `bulk_upsert`) a endpointy,
+    ktoré ho používajú.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{index}') for index in range(3)])
+        cls.course, cls.other_course = (Course.objects.create(name=name) for name in ('Kurz', 'Iný kurz'))
+
+    def setUp(self):
+        get_leaderboard().reset()
+
+    def points(self, user, course=None):
+        return Score.objects.get(user=user, course=course or self.course).points
+
+    def leaderboard_points(self, user, course=None):
+        entry = get_leaderboard().rank((course or self.course).id, user.id)
+        return entry and entry.points
+
+    def test_upsert_sets_points(self):
+        user = self.users[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.upsert(user.id, self.course.id, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.upsert(user.id, self.course.id, 4)
+        self.assertEqual(Score.objects.filter(user=user).count(), 1)
+        self.assertEqual((self.points(user), self.leaderboard_points(user)), (4, 4))
+
+    def test_upsert_increments_points(self):
+        user = self.users[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.upsert(user.id, self.course.id, 3, increment=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.upsert(user.id, self.course.id, 5, increment=True)
+        self.assertEqual(Score.objects.filter(user=user).count(), 1)
+        self.assertEqual((self.points(user), self.leaderboard_points(user)), (8, 8))
+
+    def test_upsert_retries_after_concurrent_insert(self):
+        user = self.users[0]
+        update = QuerySet.update
+        calls = []
+
+        def update_then_insert(queryset, **kwargs):
+            updated = update(queryset, **kwargs)
+            if not calls:
+                # Súbežná požiadavka vytvorí záznam medzi UPDATE a INSERT
+                Score.objects.bulk_create([Score(user_id=user.id, course_id=self.course.id, points=3)])
+            calls.append(updated)
+            return updated
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_then_insert):
+            with self.captureOnCommitCallbacks(execute=True):
+                Score.objects.upsert(user.id, self.course.id, 5, increment=True)
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(Score.objects.filter(user=user).count(), 1)
+        self.assertEqual((self.points(user), self.leaderboard_points(user)), (8, 8))
+
+    def test_bulk_upsert_statuses(self):
+        first, second, third = self.users
+        Score.objects.create(user=first, course=self.course, points=10)
+        entries = [
+            (first.id, self.course.id, 1),
+            (second.id, self.course.id, 2),
+            (first.id, self.course.id, 3),
+            (first.id, self.other_course.id, 4),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            statuses = Score.objects.bulk_upsert(entries, increment=True)
+        self.assertEqual(statuses, {
+            (first.id, self.course.id): 'updated',
+            (second.id, self.course.id): 'created',
+            (first.id, self.other_course.id): 'created',
+        })
+        self.assertEqual((self.points(first), self.points(second), self.points(first, self.other_course)), (14, 2, 4))
+        self.assertEqual(self.leaderboard_points(first), 14)
+        self.assertIsNone(self.leaderboard_points(third))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            statuses = Score.objects.bulk_upsert([(first.id, self.course.id, 1), (first.id, self.course.id, 6)])
+        self.assertEqual(statuses, {(first.id, self.course.id): 'updated'})
+        self.assertEqual((self.points(first), self.leaderboard_points(first)), (6, 6))
+        self.assertEqual(Score.objects.bulk_upsert([]), {})
+
+    def test_score_entry(self):
+        user = self.users[0]
+        data = {'user_id': user.id, 'courseID': self.course.id, 'point': 7}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/score/entry', data).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/score/entry', {**data, 'mode': 'add'}).status_code, 200)
+        self.assertEqual((self.points(user), self.leaderboard_points(user)), (14, 14))
+
+    def test_score_entry_errors(self):
+        data = {'user_id': self.users[0].id, 'courseID': self.course.id, 'point': 'x'}
+        self.assertEqual(self.client.post('/api/score/entry', data).status_code, 400)
+        self.assertEqual(self.client.post('/api/score/entry', {**data, 'point': 1, 'user_id': 0}).status_code, 404)
+        self.assertEqual(self.client.post('/api/score/entry', {**data, 'point': 1, 'courseID': 0, 'mode': 'add'}).status_code, 404)
+        self.assertFalse(Score.objects.exists())
+
+    def test_score_batch_entry(self):
+        first, second, _ = self.users
+        Score.objects.create(user=first, course=self.course, points=10)
+        payload = {
+            'user_id': first.id,
+            'mode': 'add',
+            'entries': [
+                {'courseID': self.course.id, 'point': 5},
+                {'user_id': second.id, 'courseID': self.course.id, 'point': 2},
+                {'courseID': self.other_course.id, 'point': 'x'},
+                {'user_id': 0, 'courseID': self.course.id, 'point': 1},
+                {'courseID': 0, 'point': 1},
+            ],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/score/batch', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['index'], result['status']) for result in response.json()['results']],
+            [(0, 'updated'), (1, 'created'), (2, 'invalid'), (3, 'not_found'), (4, 'not_found')],
+        )
+        self.assertEqual((self.points(first), self.points(second)), (15, 2))
+        self.assertEqual(self.leaderboard_points(second), 2)
+
+        response = self.client.post('/api/score/batch', {'entries': [{'courseID': self.course.id, 'point': 1}]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['results'][0]['status'], 'invalid')
+        self.assertEqual(self.client.post('/api/score/batch', {'entries': []}, content_type='application/json').status_code, 400)
+
+
+class KeysetPaginationTests(QuizTestCase):
+    """
+    Kontroluje kurzorové stránkovanie – prechod cez odkazy `next`, zhodné hodnoty zoradenia a neplatné kurzory.
+    """
+
+    def pages(self, url):
+        """
+        Prejde všetky strany od `url` cez odkazy `next` a vráti ID riadkov a počet strán.
+        """
+        ids, count = [], 0
+        while url:
+            response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}')
+            self.assertEqual(response.status_code, 200, url)
+            data = response.json()
+            ids.extend(row['id'] for row in data['results'])
+            url, count = data['next'], count + 1
+        return ids, count
+
+    def ordered_ids(self):
+        return [str(pk) for pk in Question.objects.filter(okruh=self.okruh).order_by('created_at', 'id').values_list('id', flat=True)]
+
+    def test_next_links_cover_list(self):
+        for prefix in ('', 'async/'):
+            url = f'/api/{prefix}question/query?okruhID={self.okruh.id}'
+            expected = {row['id'] for row in self.client.get(url).json()}
+            ids, count = self.pages(f'{url}&page_size=5')
+            self.assertEqual(ids, self.ordered_ids(), prefix)
+            self.assertEqual(set(ids), expected, prefix)
+            self.assertEqual(count, -(-len(expected) // 5), prefix)
+
+    def test_ties_on_ordering_key(self):
+        # Rovnaký `created_at` pre všetky otázky – poradie určí až `id`
+        Question.objects.filter(okruh=self.okruh).update(created_at=self.questions[0].created_at)
+        url = f'/api/question/query?okruhID={self.okruh.id}'
+        expected = self.ordered_ids()
+        self.assertEqual(expected, sorted(expected))
+        for page_size in (1, 4, 7):
+            self.assertEqual(self.pages(f'{url}&page_size={page_size}')[0], expected, page_size)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPagination()
+        cursors = [
+            '!!!',
+            'bm90IGpzb24',
+            paginator.encode_cursor({'id': 1}),
+            paginator.encode_cursor([1]),
+            paginator.encode_cursor(['nie je dátum', str(uuid.uuid4())]),
+            paginator.encode_cursor([self.questions[0].created_at.isoformat(), 'nie je uuid']),
+            paginator.encode_cursor([{'a': 1}, [1]]),
+        ]
+        for cursor in cursors:
+            response = self.api('get', f'question/query?okruhID={self.okruh.id}&cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_unpaginated_by_default(self):
+        response = self.api('get', f'question/query?okruhID={self.okruh.id}')
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), Question.objects.filter(okruh=self.okruh).count())
+        self.assertIn('results', self.api('get', f'question/query?okruhID={self.okruh.id}&page_size=5').json())
+
+
+
+class ChallengePayloadTests(QuizTestCase):
+    """
+    Kontroluje čítanie pripravenej výzvy (cache, snapshot, zostavenie) a jej invalidáciu.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.key = CHALLENGE_CACHE_KEY.format(course_id=self.course.id)
+        ChalangeQuestion.objects.bulk_create(
+            ChalangeQuestion(courseID=self.course, question=question) for question in self.questions[:3]
+        )
+
+    def question_ids(self, payload):
+        return {row['id'] for row in payload[0]}
+
+    def test_read_order(self):
+        expected = {str(question.id) for question in self.questions[:3]}
+        # Bez cache a snapshotu sa výzva zostaví a uloží do oboch
+        self.assertEqual(self.question_ids(challenge_payload(self.course.id)), expected)
+        snapshot = ChallengeSnapshot.objects.get(course_id=self.course.id)
+        self.assertEqual(cache.get(self.key), (snapshot.payload, snapshot.etag))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.question_ids(challenge_payload(self.course.id)), expected)
+
+        # Bez cache sa použije snapshot (jeden dotaz), nie zostavenie z ChalangeQuestion
+        ChallengeSnapshot.objects.filter(course_id=self.course.id).update(payload=[{'id': 'snapshot'}], etag='"snapshot"')
+        cache.delete(self.key)
+        with self.assertNumQueries(1):
+            self.assertEqual(challenge_payload(self.course.id), ([{'id': 'snapshot'}], '"snapshot"'))
+        self.assertEqual(cache.get(self.key), ([{'id': 'snapshot'}], '"snapshot"'))
+
+        cache.set(self.key, ([{'id': 'cache'}], '"cache"'))
+        self.assertEqual(challenge_payload(self.course.id), ([{'id': 'cache'}], '"cache"'))
+
+    def test_missing_course_not_cached(self):
+        missing_id = Course.objects.order_by('-id').values_list('id', flat=True).first() + 1
+        self.assertEqual(challenge_payload(missing_id)[0], [])
+        self.assertIsNone(cache.get(CHALLENGE_CACHE_KEY.format(course_id=missing_id)))
+        self.assertFalse(ChallengeSnapshot.objects.filter(course_id=missing_id).exists())
+
+        course = Course.objects.create(id=missing_id, name='Nový')
+        Okruh.objects.create(name='Okruh', course=course)
+        entry = ChalangeQuestion.objects.create(courseID=course, question=self.questions[5])
+        self.assertEqual(self.question_ids(challenge_payload(missing_id)), {str(entry.question_id)})
+
+    def test_entry_change_invalidates(self):
+        challenge_payload(self.course.id)
+        ChalangeQuestion.objects.create(courseID=self.course, question=self.questions[3])
+        self.assertIsNone(cache.get(self.key))
+        self.assertFalse(ChallengeSnapshot.objects.filter(course_id=self.course.id).exists())
+        self.assertEqual(len(challenge_payload(self.course.id)[0]), 4)
+
+        self.questions[0].name = 'Upravená'
+        self.questions[0].save()
+        self.assertIsNone(cache.get(self.key))
+        self.assertIn('Upravená', [row['name'] for row in challenge_payload(self.course.id)[0]])
+
+    def test_swap_replaces_payload(self):
+        old = challenge_payload(self.course.id)
+        new_ids = [str(question.id) for question in self.questions[6:9]]
+        swap_weekly_challenge([{'course_id': self.course.id, 'question_ids': new_ids}])
+        payload = cache.get(self.key)
+        self.assertEqual(self.question_ids(payload), set(new_ids))
+        self.assertNotEqual(payload[1], old[1])
+        self.assertEqual(ChallengeSnapshot.objects.get(course_id=self.course.id).etag, payload[1])
+        response = self.api('get', f'challange/query?courseID={self.course.id}')
+        self.assertEqual({row['id'] for row in response.json()}, set(new_ids))
+
+
+
+class QuestionBundleTests(QuizTestCase):
+    """
+    Kontroluje endpoint s otázkou, odpoveďami a prvou stranou komentárov.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.questions[0]
+        self.url = f'question/bundle?questionID={self.question.id}&page_size=2'
+        Comment.objects.bulk_create(
+            Comment(question=self.question, text=f'Komentár {index}', created_by=user)
+            for index, user in enumerate((self.student, self.other, self.student))
+        )
+
+    def test_four_queries(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/{self.url}')
+        data = response.json()
+        self.assertEqual(data['question']['id'], str(self.question.id))
+        self.assertEqual(len(data['answers']), 2)
+        self.assertEqual([comment['created_by'] for comment in data['comments']['results']], ['student', 'other'])
+        self.assertIn('cursor=', data['comments']['next'])
+        # Počet dotazov nezávisí od počtu komentárov na strane
+        with self.assertNumQueries(4):
+            self.client.get(f'/api/question/bundle?questionID={self.question.id}&page_size=50')
+
+    def test_not_modified(self):
+        response = self.client.get(f'/api/{self.url}')
+        etag = response['ETag']
+        not_modified = self.client.get(f'/api/{self.url}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((not_modified.status_code, not_modified['ETag']), (304, etag))
+
+        Answer.objects.filter(id=self.correct[self.question.id]).update(text='Upravená')
+        changed = self.client.get(f'/api/{self.url}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_answer_key_is_staff_only(self):
+        staff = User.objects.create(username='spravca', is_staff=True)
+        student = self.api('get', self.url)
+        self.assertTrue(all('answer_type' not in answer for answer in student.json()['answers']))
+        response = self.api('get', self.url, staff)
+        self.assertEqual({answer['answer_type'] for answer in response.json()['answers']}, {True, False})
+        self.assertNotEqual(response['ETag'], student['ETag'])
+        # ETag študenta neplatí pre správcu
+        token = AccessToken.for_user(staff)
+        response = self.client.get(
+            f'/api/{self.url}', HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_IF_NONE_MATCH=student['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+
+class StudyPackTests(QuizTestCase):
+    """
+    Kontroluje balík otázok okruhu – obsah NDJSON, kompresiu gzip a odpoveď 304.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/lectures/studypack?okruhID={self.okruh.id}'
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_content(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], STUDY_PACK_CONTENT_TYPE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        content = self.content(response)
+        self.assertTrue(content.endswith(b'\n'))
+        lines = [json.loads(line) for line in content.splitlines()]
+        expected = Question.objects.filter(id__in=[question.id for question in self.questions]).order_by('created_at', 'id')
+        self.assertEqual([line['id'] for line in lines], [str(pk) for pk in expected.values_list('id', flat=True)])
+        for line in lines:
+            self.assertEqual(
+                {answer['id'] for answer in line['answers']},
+                {str(self.correct[uuid.UUID(line['id'])]), str(self.wrong[uuid.UUID(line['id'])])},
+            )
+            self.assertTrue(all('answer_type' not in answer for answer in line['answers']))
+        # Veľkosť dávok načítania nemení obsah
+        self.assertEqual(b''.join(study_pack_lines(self.okruh.id, chunk_size=5)), content)
+
+    def test_gzip(self):
+        plain = self.content(self.client.get(self.url))
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        compressed = self.content(response)
+        self.assertEqual(gzip.decompress(compressed), plain)
+        self.assertEqual(zlib.decompress(compressed, 16 + zlib.MAX_WBITS), plain)
+        self.assertLess(len(compressed), len(plain))
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(self.content(response), plain)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        for headers in ({'If-None-Match': response['ETag']}, {'If-Modified-Since': response['Last-Modified']}):
+            not_modified = self.client.get(self.url, headers={**headers, 'Accept-Encoding': 'gzip'})
+            self.assertEqual(not_modified.status_code, 304, headers)
+            self.assertFalse(not_modified.has_header('Content-Encoding'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.questions[0].save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_answer_key_is_staff_only(self):
+        staff = User.objects.create(username='spravca', is_staff=True)
+        auth = f'Bearer {AccessToken.for_user(staff)}'
+        student = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=auth, HTTP_IF_NONE_MATCH=student['ETag'])
+        lines = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual({answer['answer_type'] for line in lines for answer in line['answers']}, {True, False})
+        self.assertIn('Authorization', response['Vary'])
+
+
+
+SHARDED = {
+    'COURSE_SHARDS': 2,
+    'COURSE_SHARD_ALIASES': ['default', 'shard_1'],
+    'DATABASE_ROUTERS': ['otazky.sharding.CourseShardRouter'],
+}
+UNSHARDED = {'COURSE_SHARDS': 1, 'COURSE_SHARD_ALIASES': ['default'], 'DATABASE_ROUTERS': []}
+
+
+@override_settings(**SHARDED)
+class ShardingTests(TestCase):
+    """
+    Kontroluje rozdelenie dát kurzov do dvoch databáz – smerovanie, mazanie naprieč databázami,
+    rozsahy ID a presun dát po zvýšení `COURSE_SHARDS`.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='student')
+        # Kurz 2 patrí do `default`, kurz 3 do `shard_1`
+        cls.home = Course.objects.create(id=2, name='Kurz A')
+        cls.remote = Course.objects.create(id=3, name='Kurz B')
+        # Testové databázy sa migrovali bez shardingu, rozsahy ID sa vyhradia ako po `migrate_shards`
+        for alias in SHARDED['COURSE_SHARD_ALIASES']:
+            reserve_id_ranges(using=alias)
+
+    def setUp(self):
+        cache.clear()
+        get_leaderboard().reset()
+
+    def create_course_data(self, course, user=None):
+        user = user or self.user
+        okruh = Okruh.objects.create(name='Okruh', course=course)
+        question = Question.objects.create(name='Otázka', okruh=okruh, created_by=user, visible=True, approved=True)
+        Answer.objects.create(question=question, text='Odpoveď')
+        Comment.objects.create(question=question, text='Komentár', created_by=user)
+        okruh.finished_by.add(user)
+        Score.objects.upsert(user.id, course.id, 10)
+        return okruh
+
+    def assertRows(self, alias, course, count):
+        okruhy = Okruh.objects.using(alias).filter(course=course)
+        self.assertEqual(okruhy.count(), count)
+        self.assertEqual(Question.objects.using(alias).filter(okruh__course=course).count(), count)
+        self.assertEqual(Answer.objects.using(alias).filter(question__okruh__course=course).count(), count)
+        self.assertEqual(Comment.objects.using(alias).filter(question__okruh__course=course).count(), count)
+        self.assertEqual(Okruh.finished_by.through.objects.using(alias).filter(okruh__course=course).count(), count)
+        self.assertEqual(Score.objects.using(alias).filter(course=course).count(), min(count, 1))
+
+    def test_course_data_is_routed_to_course_shard(self):
+        home_okruh = self.create_course_data(self.home)
+        remote_okruh = self.create_course_data(self.remote)
+        self.assertRows('default', self.home, 1)
+        self.assertRows('shard_1', self.home, 0)
+        self.assertRows('shard_1', self.remote, 1)
+        self.assertRows('default', self.remote, 0)
+
+        # Požiadavky čítajú z databázy kurzu, ktorú zistí middleware
+        for okruh in (home_okruh, remote_okruh):
+            rows = self.client.get(f'/api/question/query?okruhID={okruh.id}').json()
+            self.assertEqual(len(rows), 1)
+        self.assertEqual(get_leaderboard().rank(self.remote.id, self.user.id).points, 10)
+        self.assertEqual(CourseCompletion.objects.get(user=self.user, course=self.remote).completed, 1)
+
+    def test_global_lists_fan_out(self):
+        for course in (self.home, self.remote, self.home, self.remote):
+            self.create_course_data(course)
+        # Zoznam otázok nemá v `gamifikace/urls.py` cestu, volá sa priamo view
+        question_list = OtazkaView.as_view()
+        fetchers = {
+            Question: lambda url: question_list(APIRequestFactory().get(url)).data,
+            Comment: lambda url: self.client.get(url).json(),
+        }
+        for model, fetch in fetchers.items():
+            url = '/api/comment/' if model is Comment else '/api/question/'
+            expected = [
+                str(obj.id) for obj in sorted(
+                    (obj for alias in SHARDED['COURSE_SHARD_ALIASES'] for obj in model.objects.using(alias).all()),
+                    key=lambda obj: (obj.created_at, obj.id),
+                )
+            ]
+            self.assertEqual(len(expected), 4)
+            self.assertEqual([str(row['id']) for row in fetch(url)], expected, url)
+
+            # Strany po jednom riadku prejdú obe databázy bez duplicít a medzier
+            served, next_url = [], f'{url}?page_size=1'
+            while next_url:
+                page = fetch(next_url)
+                served += [str(row['id']) for row in page['results']]
+                next_url = page['next']
+            self.assertEqual(served, expected, url)
+
+    def test_deleting_user_and_course_purges_all_shards(self):
+        other = User.objects.create(username='other')
+        for course in (self.home, self.remote):
+            self.create_course_data(course)
+            self.create_course_data(course, other)
+
+        self.user.delete()
+        for alias in ('default', 'shard_1'):
+            self.assertFalse(Score.objects.using(alias).filter(user_id=self.user.id).exists())
+            self.assertFalse(Question.objects.using(alias).filter(created_by_id=self.user.id).exists())
+            self.assertFalse(Comment.objects.using(alias).filter(created_by_id=self.user.id).exists())
+            self.assertFalse(Okruh.finished_by.through.objects.using(alias).filter(user_id=self.user.id).exists())
+        self.assertTrue(Score.objects.using('shard_1').filter(user=other).exists())
+
+        self.remote.delete()
+        self.assertFalse(Okruh.objects.using('shard_1').filter(course_id=self.remote.id).exists())
+        self.assertFalse(Score.objects.using('shard_1').filter(course_id=self.remote.id).exists())
+        self.assertTrue(Okruh.objects.using('default').filter(course=self.home).exists())
+
+    def test_shard_ids_start_at_shard_range(self):
+        self.assertGreater(self.create_course_data(self.remote).id, SHARD_ID_SPAN)
+        self.assertLess(self.create_course_data(self.home).id, SHARD_ID_SPAN)
+
+    def test_rebalance_moves_data_written_before_sharding(self):
+        with self.settings(**UNSHARDED):
+            self.create_course_data(self.remote)
+        self.assertRows('default', self.remote, 1)
+        self.assertEqual(misplaced_course_ids('default'), [self.remote.id])
+        # Skóre zapísané po zvýšení COURSE_SHARDS sa s presúvaným spočíta
+        Score.objects.upsert(self.user.id, self.remote.id, 5, increment=True)
+
+        call_command('rebalance_shards', stdout=StringIO())
+        self.assertRows('default', self.remote, 0)
+        self.assertRows('shard_1', self.remote, 1)
+        self.assertEqual(misplaced_course_ids('default'), [])
+        self.assertEqual(get_leaderboard().rank(self.remote.id, self.user.id).points, 15)
+        # Počítadlá okruhov a dokončení v `default` sa presunom nezmenia
+        self.remote.refresh_from_db()
+        self.assertEqual(self.remote.lecture_count, 1)
+        self.assertEqual(CourseCompletion.objects.get(user=self.user, course=self.remote).completed, 1)
+
+
+class MergeDuplicateScoresMigrationTests(TransactionTestCase):
+    """
+    Kontroluje, že migrácia 0020 ponechá z duplicitných záznamov skóre ten s najvyšším počtom bodov.
+    """
+    migrate_from = [('otazky', '0019_alter_question_ai_context')]
+    migrate_to = [('otazky', '0020_score_unique_user_course')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_keeps_highest_score_per_user_and_course(self):
+        apps = self.migrate(self.migrate_from)
+        user = apps.get_model('auth', 'User').objects.create(username='student')
+        other = apps.get_model('auth', 'User').objects.create(username='other')
+        Course = apps.get_model('otazky', 'Course')
+        course, second_course = Course.objects.create(name='Kurz A'), Course.objects.create(name='Kurz B')
+        Score = apps.get_model('otazky', 'Score')
+        duplicates = [Score.objects.create(user=user, course=course, points=points) for points in (5, 12, 7)]
+        single = [
+            Score.objects.create(user=user, course=second_course, points=3),
+            Score.objects.create(user=other, course=course, points=1),
+        ]
+
+        apps = self.migrate(self.migrate_to)
+        rows = set(apps.get_model('otazky', 'Score').objects.values_list('id', 'user_id', 'course_id', 'points'))
+        self.assertEqual(rows, {
+            (score.id, score.user_id, score.course_id, score.points) for score in [duplicates[1]] + single
+        })
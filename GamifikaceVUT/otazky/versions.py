@@ -0,0 +1,277 @@
+"""
+Verzie obsahu kurzov pre podmienené GET požiadavky v aplikácii Gamifikace.
+
+Každý kurz má monotónne rastúce číslo verzie obsahu (`ContentVersion` s kľúčom
+`course:<id>`), ktoré zvyšujú signály pri zmene otázok, odpovedí, okruhov a otázok
+výzvy (viď `otazky/signals.py`). Zoznam kurzov má vlastnú verziu `courses`, achievementy
+používateľa verziu `achievements:<id>`.
+Endpointy na čítanie z verzie odvodia ETag a `Last-Modified`, takže na `If-None-Match`
+alebo `If-Modified-Since` odpovedia 304 po čítaní z cache, bez dotazu do databázy.
+
+Verzie sú uložené v databáze, cache obsahuje iba ich kópiu. Priradenie okruhu
+a otázky ku kurzu sa tiež drží v cache (podľa neho sa pri shardingu vyberá databáza
+okruhu a otázky, viď `otazky/sharding.py`). Funkcie s predponou `a` sú asynchrónne
+verzie pre asynchrónne endpointy (viď `otazky/async_views.py`).
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import is_not_modified
+from .models import ContentVersion, Okruh, Question
+from .sharding import afirst_in_shards, first_in_shards
+
+VERSION_CACHE_KEY = 'version:{key}'
+OKRUH_COURSE_CACHE_KEY = 'okruh_course:{okruh_id}'
+QUESTION_COURSE_CACHE_KEY = 'question_course:{question_id}'
+CATALOG_VERSION_KEY = 'courses'
+
+
+def course_version_key(course_id):
+    """
+    Vráti kľúč verzie obsahu kurzu.
+    """
+    return f'course:{int(course_id)}'
+
+
+def content_version(key):
+    """
+    Vráti aktuálnu verziu obsahu a čas jej poslednej zmeny.
+
+    Args:
+        key (str): Kľúč verzie (napr. `course_version_key(5)`).
+
+    Returns:
+        tuple[int, datetime | None]: Číslo verzie (0, ak sa obsah ešte nemenil) a čas zmeny.
+    """
+    cache_key = VERSION_CACHE_KEY.format(key=key)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    row = ContentVersion.objects.filter(key=key).values_list('version', 'updated_at').first()
+    cached = tuple(row) if row else (0, None)
+    # `add` neprepíše novšiu hodnotu, ktorú medzitým zapísal `bump_versions`
+    cache.add(cache_key, cached, timeout=None)
+    return cached
+
+
+async def acontent_version(key):
+    """
+    Asynchrónna verzia `content_version`.
+    """
+    cache_key = VERSION_CACHE_KEY.format(key=key)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        return cached
+    row = await ContentVersion.objects.filter(key=key).values_list('version', 'updated_at').afirst()
+    cached = tuple(row) if row else (0, None)
+    await cache.aadd(cache_key, cached, timeout=None)
+    return cached
+
+
+def bump_versions(keys):
+    """
+    Zvýši verzie obsahu pre zadané kľúče.
+
+    Verzie sa zvýšia v databáze jedným príkazom, do cache sa zapíšu po potvrdení transakcie.
+
+    Args:
+        keys (Iterable[str]): Kľúče verzií.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    ContentVersion.objects.bulk_create([ContentVersion(key=key) for key in keys], ignore_conflicts=True)
+    ContentVersion.objects.filter(key__in=keys).update(version=F('version') + 1, updated_at=timezone.now())
+
+    def publish():
+        rows = ContentVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+        cache.set_many(
+            {VERSION_CACHE_KEY.format(key=key): (version, updated_at) for key, version, updated_at in rows},
+            timeout=None,
+        )
+
+    transaction.on_commit(publish)
+
+
+def bump_course_versions(course_ids):
+    """
+    Zvýši verzie obsahu zadaných kurzov.
+
+    Args:
+        course_ids (Iterable): ID kurzov (None sa ignoruje).
+    """
+    bump_versions(course_version_key(course_id) for course_id in course_ids if course_id is not None)
+
+
+def achievements_version_key(user_id):
+    """
+    Vráti kľúč verzie achievementov používateľa.
+    """
+    return f'achievements:{int(user_id)}'
+
+
+def bump_achievement_versions(user_ids):
+    """
+    Zvýši verzie achievementov zadaných používateľov.
+
+    Args:
+        user_ids (Iterable): ID používateľov.
+    """
+    bump_versions(achievements_version_key(user_id) for user_id in user_ids)
+
+
+def okruh_course_id(okruh_id):
+    """
+    Vráti ID kurzu, ku ktorému okruh patrí, alebo None, ak okruh neexistuje.
+    """
+    key = OKRUH_COURSE_CACHE_KEY.format(okruh_id=okruh_id)
+    course_id = cache.get(key)
+    if course_id is None:
+        course_id = first_in_shards(Okruh.objects.filter(id=okruh_id).values_list('course_id', flat=True))
+        if course_id is not None:
+            cache.set(key, course_id, timeout=None)
+    return course_id
+
+
+def question_course_id(question_id):
+    """
+    Vráti ID kurzu, ku ktorému otázka patrí, alebo None, ak otázka neexistuje.
+    """
+    try:
+        question_id = uuid.UUID(str(question_id))
+    except ValueError:
+        return None
+    key = QUESTION_COURSE_CACHE_KEY.format(question_id=question_id)
+    course_id = cache.get(key)
+    if course_id is None:
+        course_id = first_in_shards(Question.objects.filter(id=question_id).values_list('okruh__course_id', flat=True))
+        if course_id is not None:
+            cache.set(key, course_id, timeout=None)
+    return course_id
+
+
+async def aokruh_course_id(okruh_id):
+    """
+    Asynchrónna verzia `okruh_course_id`.
+    """
+    key = OKRUH_COURSE_CACHE_KEY.format(okruh_id=okruh_id)
+    course_id = await cache.aget(key)
+    if course_id is None:
+        course_id = await afirst_in_shards(Okruh.objects.filter(id=okruh_id).values_list('course_id', flat=True))
+        if course_id is not None:
+            await cache.aset(key, course_id, timeout=None)
+    return course_id
+
+
+async def aquestion_course_id(question_id):
+    """
+    Asynchrónna verzia `question_course_id`.
+    """
+    try:
+        question_id = uuid.UUID(str(question_id))
+    except ValueError:
+        return None
+    key = QUESTION_COURSE_CACHE_KEY.format(question_id=question_id)
+    course_id = await cache.aget(key)
+    if course_id is None:
+        course_id = await afirst_in_shards(
+            Question.objects.filter(id=question_id).values_list('okruh__course_id', flat=True)
+        )
+        if course_id is not None:
+            await cache.aset(key, course_id, timeout=None)
+    return course_id
+
+
+def remember_question_course_id(question_id, course_id):
+    """
+    Uloží do cache priradenie otázky ku kurzu (napr. po uložení otázky).
+    """
+    if course_id is not None:
+        cache.set(QUESTION_COURSE_CACHE_KEY.format(question_id=question_id), course_id, timeout=None)
+
+
+def forget_okruh(okruh_id, question_ids=()):
+    """
+    Zmaže z cache priradenie okruhu (a jeho otázok) ku kurzu, napr. po presune okruhu.
+    """
+    keys = [OKRUH_COURSE_CACHE_KEY.format(okruh_id=okruh_id)]
+    keys += [QUESTION_COURSE_CACHE_KEY.format(question_id=question_id) for question_id in question_ids]
+    cache.delete_many(keys)
+
+
+def forget_question(question_id):
+    """
+    Zmaže z cache priradenie otázky ku kurzu.
+    """
+    cache.delete(QUESTION_COURSE_CACHE_KEY.format(question_id=question_id))
+
+
+def version_etag(key, version):
+    """
+    Vráti ETag pre danú verziu obsahu.
+    """
+    return quote_etag(f'{key}-{version}')
+
+
+def version_headers(response, key, version, updated_at):
+    """
+    Nastaví odpovedi hlavičky `ETag` a `Last-Modified` podľa verzie obsahu.
+    """
+    response['ETag'] = version_etag(key, version)
+    if updated_at is not None:
+        response['Last-Modified'] = http_date(updated_at.timestamp())
+    return response
+
+
+def versioned_response(request, key, get_response):
+    """
+    Vráti odpoveď 304, ak má klient aktuálnu verziu obsahu, inak odpoveď z `get_response`.
+
+    O 304 sa rozhodne iba z verzie v cache, `get_response` sa pri nej nevolá.
+
+    Args:
+        request (Request): Objekt HTTP požiadavky.
+        key (str): Kľúč verzie obsahu.
+        get_response (callable): Funkcia bez argumentov vracajúca odpoveď s dátami.
+
+    Returns:
+        HttpResponse: Odpoveď s hlavičkami `ETag` a `Last-Modified`.
+    """
+    version, updated_at = content_version(key)
+    if is_not_modified(request, version_etag(key, version), updated_at):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = get_response()
+    return version_headers(response, key, version, updated_at)
+
+
+class ContentVersionMixin:
+    """
+    Mixin pre `ListAPIView`, ktorý pridá podmienené GET podľa verzie obsahu.
+
+    Podtrieda implementuje `get_version_key()`. Ak vráti None (napr. chýba parameter),
+    zoznam sa vráti bez ETagu.
+    """
+
+    def get_version_key(self):
+        """
+        Vráti kľúč verzie obsahu pre aktuálnu požiadavku, alebo None.
+        """
+        return None
+
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti zoznam, alebo 304, ak má klient aktuálnu verziu obsahu.
+        """
+        key = self.get_version_key()
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        return versioned_response(request, key, lambda: super(ContentVersionMixin, self).list(request, *args, **kwargs))
@@ -1,7 +1,11 @@
-from django.http import HttpResponse
+import uuid
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
 from rest_framework import generics
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .auth import CachedJWTAuthentication, get_cached_user
 from .models import *
 from .serializers import *
 from rest_framework.response import Response
@@ -12,37 +16,75 @@ from rest_framework_simplejwt.tokens import AccessToken,RefreshToken
 from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-
-class OtazkaView(generics.ListCreateAPIView):
+from .challenge import challenge_payload
+from .completion import course_completion
+from .conditional import compute_etag, conditional_response, is_not_modified
+from .enrollment import enrolled_courses
+from .leaderboard import get_leaderboard, leaderboard_rows
+from .likes import is_liked, like, like_count, object_course_id, unlike
+from .pagination import KeysetPagination
+from .search import DEFAULT_LIMIT, MAX_LIMIT, search_questions
+from .seasons import season_standing
+from .sharding import FanOutListMixin
+from .studypack import STUDY_PACK_CONTENT_TYPE, accepts_gzip, gzip_stream, study_pack_lines
+from .quiz import (
+    DEFAULT_BATCH_SIZE,
+    MAX_BATCH_SIZE,
+    finish_session,
+    get_session,
+    grade_session,
+    next_batch,
+    session_total,
+    start_session,
+)
+from .response_cache import CachedResponseMixin, cached_response, variant_key
+from .versions import (
+    CATALOG_VERSION_KEY,
+    achievements_version_key,
+    content_version,
+    course_version_key,
+    okruh_course_id,
+    question_course_id,
+    version_etag,
+    version_headers,
+    versioned_response,
+)
+
+class OtazkaView(FanOutListMixin, generics.ListCreateAPIView):
     """
     API endpoint na získanie zoznamu všetkých otázok a pridanie novej otázky.
 
-    - GET: Vráti zoznam všetkých otázok.
+    - GET: Vráti zoznam všetkých otázok (voliteľne stránkovaný kurzorom), pri shardingu
+      zo všetkých databáz skupín kurzov.
     - POST: Uloží novú otázku do databázy.
     """
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    keyset_ordering = ('created_at', 'id')
 
 
-class CommentView(generics.ListCreateAPIView):
+class CommentView(FanOutListMixin, generics.ListCreateAPIView):
     """
     API endpoint na získanie zoznamu komentárov a pridanie nového komentára.
 
-    - GET: Vráti zoznam všetkých komentárov.
+    - GET: Vráti zoznam všetkých komentárov (voliteľne stránkovaný kurzorom), pri shardingu
+      zo všetkých databáz skupín kurzov.
     - POST: Uloží nový komentár.
     """
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.prefetch_related('created_by')
     serializer_class = CommentSerializer
+    keyset_ordering = ('created_at', 'id')
 
 
 class CommentsForQuestionView(generics.ListCreateAPIView):
     """
     API endpoint na získanie komentárov k danej otázke podľa parametra `questionID`.
 
-    - GET: Vráti zoznam komentárov prislúchajúcich k danej otázke.
+    - GET: Vráti zoznam komentárov prislúchajúcich k danej otázke (voliteľne stránkovaný kurzorom).
     """
     Model = Comment
     serializer_class = CommentSerializer
+    keyset_ordering = ('created_at', 'id')
 
     def get_queryset(self):
         """
@@ -55,22 +97,29 @@ class CommentsForQuestionView(generics.ListCreateAPIView):
         Returns:
             QuerySet: Django QuerySet obsahujúci filtrované komentáre.
         """
-        queryset= Comment.objects.all()
+        queryset= Comment.objects.prefetch_related('created_by')
         questionID = self.request.query_params.get('questionID')
         if questionID:
             queryset = queryset.filter(question=questionID)
         return queryset
 
 
-class CourseView(generics.ListCreateAPIView):
+class CourseView(CachedResponseMixin, generics.ListCreateAPIView):
     """
     API endpoint na získanie zoznamu kurzov a pridanie nového kurzu.
 
-    - GET: Vráti zoznam všetkých kurzov.
+    - GET: Vráti zoznam všetkých kurzov (podporuje `If-None-Match` a `If-Modified-Since`).
     - POST: Uloží nový kurz.
     """
     Model = Course
     serializer_class = CourseSerializer
+    cache_endpoint = 'courses'
+
+    def get_version_key(self):
+        """
+        Vráti kľúč verzie zoznamu kurzov.
+        """
+        return CATALOG_VERSION_KEY
 
     def get_queryset(self):
         """
@@ -85,35 +134,147 @@ class CourseView(generics.ListCreateAPIView):
 
 class ScoreView(generics.ListCreateAPIView):
     """
-    API endpoint na získanie zoznamu skóre pre zadaný kurz (`courseID`).
+    API endpoint na získanie rebríčka pre zadaný kurz (`courseID`).
 
-    - GET: Vráti skóre zoradené zostupne podľa bodov.
+    - GET: Vráti skóre zoradené zostupne podľa bodov aj s poradím. Voliteľný parameter
+      `limit` obmedzí odpoveď na top N používateľov, parametre `page_size` a `cursor`
+      zapnú stránkovanie. Živé zmeny rebríčka posiela `/api/async/score/stream`
+      (viď `otazky/leaderboard_stream.py`).
     """
     Model = Score
     serializer_class = ScoreSerializer
+    pagination_class = KeysetPagination
 
-    def get_queryset(self):
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti rebríček kurzu načítaný zo zoradenej množiny (bez zoradenia tabuľky `Score`).
+
+        Returns:
+            Response: Zoznam riadkov rebríčka (prázdny, ak chýba `courseID`).
         """
-        Vráti queryset skóre filtrovaných podľa `courseID` a zoradených zostupne.
+        course_id = request.query_params.get('courseID')
+        if not course_id or not course_id.isdigit():
+            return Response([])
+        leaderboard = get_leaderboard()
+        page = self.paginator.paginate_sequence(
+            lambda offset, limit: leaderboard.top(course_id, limit=limit, offset=offset), request
+        )
+        if page is not None:
+            serializer = LeaderboardEntrySerializer(leaderboard_rows(course_id, page), many=True)
+            return self.get_paginated_response(serializer.data)
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        entries = leaderboard.top(course_id, limit=limit)
+        serializer = LeaderboardEntrySerializer(leaderboard_rows(course_id, entries), many=True)
+        return Response(serializer.data)
+
+
+class ScoreRank(APIView):
+    """
+    API endpoint na získanie poradia používateľa v rebríčku kurzu.
+    """
+    def get(self, request, format=None):
+        """
+        Vráti poradie používateľa a jeho okolie v rebríčku kurzu.
 
-        Načíta `courseID` z query parametrov požiadavky, filtruje skóre
-        pre daný kurz a zoradí výsledky zostupne podľa atribútu `points`.
+        Očakáva `courseID` a `user_id` v query parametroch. Voliteľný parameter
+        `around` určuje, koľko používateľov nad a pod používateľom sa vráti (predvolene 5).
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
 
         Returns:
-            QuerySet: Django QuerySet obsahujúci filtrované a zoradené skóre.
+            Response: Poradie používateľa (`me`, alebo None ak nemá skóre), susedov
+                      v rebríčku (`above`, `below`) a celkový počet používateľov (`total`).
         """
-        courseID = self.request.query_params.get('courseID')
-        queryset = Score.objects.filter(course = courseID)
-        queryset = queryset.order_by('-points')
-        return queryset
+        course_id = request.query_params.get('courseID')
+        user_id = request.query_params.get('user_id')
+        if not course_id or not user_id or not course_id.isdigit() or not user_id.isdigit():
+            return Response({"message": "courseID and user_id are required."}, status=status.HTTP_400_BAD_REQUEST)
+        around = request.query_params.get('around', '5')
+        around = min(int(around), 50) if around.isdigit() else 5
+
+        leaderboard = get_leaderboard()
+        me = leaderboard.rank(course_id, user_id)
+        above, below = leaderboard.around(course_id, user_id, around) if me else ([], [])
+        rows = leaderboard_rows(course_id, above + ([me] if me else []) + below)
+        serializer = LeaderboardEntrySerializer(rows, many=True)
+        data = serializer.data
+        return Response({
+            "total": leaderboard.count(course_id),
+            "me": data[len(above)] if me else None,
+            "above": data[:len(above)],
+            "below": data[len(above) + 1:] if me else [],
+        })
+
+
+class ScoreHistory(APIView):
+    """
+    API endpoint na získanie rebríčka kurzu za uzavretú sezónu.
+    """
+    def get(self, request, format=None):
+        """
+        Vráti archivovaný rebríček kurzu za sezónu.
 
+        Očakáva `courseID` v query parametroch. Voliteľný parameter `season` určuje
+        sezónu (predvolene naposledy uzavretá sezóna), `limit` počet riadkov (predvolene 10).
 
-class AnswersForQuestion(generics.ListCreateAPIView):
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Sezóna (`season`) a riadky jej rebríčka (`results`).
+        """
+        course_id = request.query_params.get('courseID')
+        season_id = request.query_params.get('season')
+        if not course_id or not course_id.isdigit() or (season_id and not season_id.isdigit()):
+            return Response({"message": "courseID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = request.query_params.get('limit', '10')
+        limit = int(limit) if limit.isdigit() else 10
+
+        season = Season.objects.filter(id=season_id or Season.objects.last_closed_id()).first()
+        if season is None:
+            return Response({"message": "Season not found."}, status=status.HTTP_404_NOT_FOUND)
+        entries = season_standing(course_id, season.id, limit=limit)
+        serializer = LeaderboardEntrySerializer(leaderboard_rows(course_id, entries, season.id), many=True)
+        return Response({
+            "season": SeasonSerializer(season).data,
+            "results": serializer.data,
+        })
+
+
+class AnswersForQuestion(CachedResponseMixin, generics.ListCreateAPIView):
     """
     API endpoint for listing and creating answers for a specific question.
+
+    GET s parametrom `questionID` podporuje `If-None-Match` a `If-Modified-Since`.
+    Správnosť odpovedí (`answer_type`) vracia iba správcom (viď `answer_serializer_class`).
     """
     Model = Answer
     serializer_class = AnswerSerializer
+    cache_endpoint = 'answers'
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return answer_serializer_class(self.request.user)
+        return self.serializer_class
+
+    def get_cache_variant(self):
+        return 'staff' if self.request.user.is_staff else None
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def get_version_key(self):
+        """
+        Vráti kľúč verzie kurzu, ku ktorému otázka `questionID` patrí.
+        """
+        course_id = question_course_id(self.request.query_params.get('questionID', ''))
+        return course_version_key(course_id) if course_id is not None else None
 
     def get_queryset(self):
         """
@@ -133,16 +294,26 @@ class AnswersForQuestion(generics.ListCreateAPIView):
         return queryset
 
 
-class OkruhsForCourse(generics.ListCreateAPIView):
+class OkruhsForCourse(CachedResponseMixin, generics.ListCreateAPIView):
     """
     API endpoint pre získanie zoznamu okruhov pre špecifický kurz
     a pre pridanie nového okruhu ku kurzu.
 
-    - GET: Vráti zoznam okruhov pre daný kurz (`courseID`).
+    - GET: Vráti zoznam okruhov pre daný kurz (`courseID`), voliteľne stránkovaný kurzorom.
+      Podporuje `If-None-Match` a `If-Modified-Since`.
     - POST: Umožní vytvoriť nový okruh priradený ku kurzu.
     """
     Model = Okruh
     serializer_class = OkruhSerializer
+    cache_endpoint = 'lectures'
+    keyset_ordering = ('id',)
+
+    def get_version_key(self):
+        """
+        Vráti kľúč verzie kurzu `courseID`.
+        """
+        course_id = self.request.query_params.get('courseID', '')
+        return course_version_key(course_id) if course_id.isdigit() else None
 
     def get_queryset(self):
         """
@@ -190,6 +361,48 @@ class OkruhByID(generics.ListCreateAPIView):
         return queryset
 
 
+class StudyPack(APIView):
+    """
+    API endpoint na stiahnutie všetkých otázok okruhu s odpoveďami v jednej odpovedi.
+    """
+    def get(self, request, format=None):
+        """
+        Streamuje viditeľné a schválené otázky okruhu s odpoveďami vo formáte NDJSON.
+
+        Očakáva `okruhID` v query parametroch. Ak klient podporuje gzip, odpoveď sa
+        komprimuje. Podporuje hlavičky `If-None-Match` a `If-Modified-Since` podľa verzie
+        obsahu kurzu (odpoveď 304 bez dotazu do databázy). Správnosť odpovedí (`answer_type`)
+        dostanú iba správcovia.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            StreamingHttpResponse: Jeden riadok JSON na otázku, alebo 304.
+        """
+        okruh_id = request.query_params.get('okruhID')
+        if not okruh_id or not okruh_id.isdigit():
+            return Response({"message": "okruhID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        course_id = okruh_course_id(okruh_id)
+        if course_id is None:
+            return Response({"message": "Okruh not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        key = variant_key(course_version_key(course_id), 'staff' if request.user.is_staff else None)
+        version, updated_at = content_version(course_version_key(course_id))
+        if is_not_modified(request, version_etag(key, version), updated_at):
+            response = HttpResponseNotModified()
+        else:
+            lines = study_pack_lines(okruh_id, answer_serializer=answer_serializer_class(request.user))
+            if accepts_gzip(request):
+                response = StreamingHttpResponse(gzip_stream(lines), content_type=STUDY_PACK_CONTENT_TYPE)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = StreamingHttpResponse(lines, content_type=STUDY_PACK_CONTENT_TYPE)
+        patch_vary_headers(response, ['Accept-Encoding', 'Authorization'])
+        return version_headers(response, key, version, updated_at)
+
+
 class QuestionByID(generics.ListCreateAPIView):
     """
     API endpoint pre získanie otázky (alebo zoznamu otázok) podľa jej ID.
@@ -218,16 +431,78 @@ class QuestionByID(generics.ListCreateAPIView):
         return queryset
 
 
-class QuestionForOkruh(generics.ListCreateAPIView):
+class QuestionBundle(APIView):
+    """
+    API endpoint na získanie otázky spolu s odpoveďami a prvou stranou komentárov.
+    """
+    def get(self, request, format=None):
+        """
+        Vráti otázku, jej odpovede a prvú stranu komentárov v jednej odpovedi.
+
+        Očakáva `questionID` v query parametroch, voliteľný `page_size` určuje počet
+        komentárov na strane. Odpoveď vznikne štyrmi dotazmi bez ohľadu na počet
+        komentárov (otázka, odpovede cez `prefetch_related`, strana komentárov a ich
+        autori cez `prefetch_related('created_by')` – používatelia môžu byť pri shardingu
+        v inej databáze ako komentáre). Podporuje hlavičku `If-None-Match`.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: `question`, `answers` a `comments` (`results` a odkaz `next`
+                      na ďalšiu stranu endpointu s komentármi).
+        """
+        try:
+            question_id = uuid.UUID(request.query_params.get('questionID', ''))
+        except ValueError:
+            return Response({"message": "questionID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        question = (
+            Question.objects.prefetch_related('answer_set').filter(id=question_id).first()
+        )
+        if question is None:
+            return Response({"message": "Question not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = KeysetPagination()
+        comments = paginator.paginate_ordered(
+            Comment.objects.filter(question=question).prefetch_related('created_by'),
+            request,
+            CommentsForQuestionView.keyset_ordering,
+        )
+        comments_url = request.build_absolute_uri(f"{reverse('comment-specific')}?questionID={question.id}")
+        data = {
+            "question": QuestionSerializer(question).data,
+            "answers": answer_serializer_class(request.user)(question.answer_set.all(), many=True).data,
+            "comments": {
+                "next": paginator.get_next_link(comments_url),
+                "results": CommentSerializer(comments, many=True).data,
+            },
+        }
+        return conditional_response(request, compute_etag(data), lambda: data)
+
+
+class QuestionForOkruh(CachedResponseMixin, generics.ListCreateAPIView):
     """
     API endpoint pre získanie zoznamu otázok pre špecifický okruh
     a pre pridanie novej otázky k okruhu.
 
-    - GET: Vráti zoznam otázok pre daný okruh (`okruhID`).
+    - GET: Vráti zoznam otázok pre daný okruh (`okruhID`), voliteľne stránkovaný kurzorom.
+      Podporuje `If-None-Match` a `If-Modified-Since`.
     - POST: Umožní vytvoriť novú otázku priradenú k okruhu.
     """
     Model = Question
     serializer_class = QuestionSerializer
+    cache_endpoint = 'questions'
+    likes_model = Question
+    keyset_ordering = ('created_at', 'id')
+
+    def get_version_key(self):
+        """
+        Vráti kľúč verzie kurzu, ku ktorému okruh `okruhID` patrí.
+        """
+        okruh_id = self.request.query_params.get('okruhID', '')
+        course_id = okruh_course_id(okruh_id) if okruh_id.isdigit() else None
+        return course_version_key(course_id) if course_id is not None else None
 
     def get_queryset(self):
         """
@@ -277,11 +552,49 @@ class ReportedQuestionsForLecture(generics.ListCreateAPIView):
         return Question.objects.none() 
 
 
+class QuestionSearchView(APIView):
+    """
+    API endpoint na fulltextové vyhľadávanie otázok.
+    """
+    def get(self, request, format=None):
+        """
+        Vyhľadá otázky podľa názvu, textu, odpovedí a komentárov.
+
+        Očakáva hľadaný text `q` v query parametroch, voliteľne `courseID` alebo `okruhID`
+        na obmedzenie výsledkov a `page_size` (počet výsledkov, najviac `MAX_LIMIT`).
+        Vyhľadávanie nerozlišuje diakritiku a posledné slovo hľadá ako prefix.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Otázky zoradené podľa relevancie, každá s poľom `rank` (bm25).
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"message": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+        filters = {}
+        for param, name in (('courseID', 'course_id'), ('okruhID', 'okruh_id')):
+            value = request.query_params.get(param)
+            if value is not None:
+                if not value.isdigit():
+                    return Response({"message": f"{param} must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+                filters[name] = int(value)
+        page_size = request.query_params.get('page_size', '')
+        limit = min(int(page_size), MAX_LIMIT) if page_size.isdigit() and int(page_size) > 0 else DEFAULT_LIMIT
+
+        questions = search_questions(text, limit=limit, **filters)
+        return Response([
+            {**QuestionSerializer(question).data, "rank": question.search_rank} for question in questions
+        ])
+
+
 class CallangeQuestions(generics.ListCreateAPIView):
     """
     API endpoint pre získanie zoznamu "challenge" otázok pre daný kurz.
 
-    - GET: Vráti zoznam "challenge" otázok na základe `courseID`.
+    - GET: Vráti zoznam "challenge" otázok na základe `courseID` (podporuje `If-None-Match`).
     - POST: Umožní vytvoriť novú "challenge" otázku (prostredníctvom serializéra).
     """
     Model = Question
@@ -291,24 +604,32 @@ class CallangeQuestions(generics.ListCreateAPIView):
         """
         Vráti queryset "challenge" otázok pre špecifikovaný kurz.
 
-        Načíta `courseID` z query parametrov. Následne získa objekty `ChalangeQuestion`
-        asociované s týmto kurzom a na základe nich vyfiltruje príslušné objekty `Question`.
+        Načíta `courseID` z query parametrov a vyberie otázky priradené k výzve kurzu
+        jedným dotazom.
 
         Returns:
             QuerySet: Django QuerySet obsahujúci "challenge" otázky pre daný kurz.
-                      Vráti `None` alebo prázdny queryset, ak sa vyskytne chyba alebo nie sú nájdené žiadne otázky.
-        """
-        print(self.request.query_params.get('courseID'))
-        challange_questions= ChalangeQuestion.objects.filter(courseID=self.request.query_params.get('courseID'))
-        queryset= None
-        for chalange_question in challange_questions:
-            print(chalange_question.id)
-            if queryset is None :
-                queryset = Question.objects.filter(id = chalange_question.question.id)
-                print(queryset.values_list())
-            else:
-                queryset = queryset | Question.objects.filter(id = chalange_question.question.id)
-        return queryset
+        """
+        return Question.objects.filter(
+            id__in=ChalangeQuestion.objects.filter(courseID=self.request.query_params.get('courseID')).values('question')
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti pripravenú výzvu kurzu jedným čítaním z cache alebo databázy.
+
+        O odpovedi 304 sa rozhodne podľa verzie obsahu kurzu ešte pred načítaním výzvy.
+
+        Returns:
+            Response: Serializované otázky výzvy s hlavičkami `ETag` a `Last-Modified`,
+                      alebo 304, ak má klient aktuálnu verziu.
+        """
+        course_id = request.query_params.get('courseID')
+        if not course_id or not course_id.isdigit():
+            return Response([])
+        return versioned_response(
+            request, course_version_key(course_id), lambda: Response(challenge_payload(int(course_id))[0])
+        )
 
 
 class Username(APIView):
@@ -319,8 +640,9 @@ class Username(APIView):
         """
         Spracuje POST požiadavku na získanie používateľského mena.
 
-        Očakáva `access_token` v tele požiadavky. Na základe tokenu dekóduje
-        ID používateľa, načíta používateľa z databázy a vráti jeho reťazcovú reprezentáciu.
+        Očakáva `access_token` v tele požiadavky. Používateľské meno sa prečíta
+        z claimu `username` tokenu bez dotazu do databázy. Pri starších tokenoch bez
+        tohto claimu sa používateľ načíta podľa ID (cez cache používateľov).
 
         Args:
             request (Request): Objekt HTTP požiadavky.
@@ -334,11 +656,13 @@ class Username(APIView):
             access_token_obj = AccessToken(request.data["access_token"])
         except:
             return HttpResponse('Unauthorized', status=401)
-        user_id=access_token_obj['user_id']
-
-        user = User.objects.get(id=user_id)
-        print(user)
-        return Response(str(user))
+        username = access_token_obj.get('username')
+        if username is None:
+            user = get_cached_user(access_token_obj['user_id'])
+            if user is None:
+                return HttpResponse('Unauthorized', status=401)
+            username = user.get_username()
+        return Response(username)
 
 
 class UsernameID(APIView):
@@ -428,28 +752,88 @@ class ScoreEntry(APIView):
 
         Očakáva `user_id`, `courseID` a `point` v tele požiadavky.
         Ak záznam pre daného používateľa a kurz už existuje, aktualizuje jeho body.
-        Inak vytvorí nový záznam o skóre.
+        Inak vytvorí nový záznam o skóre. Zápis prebehne jedným príkazom (upsert).
+        Pri voliteľnom `mode` = `"add"` sa body k existujúcemu skóre pripočítajú.
 
         Args:
             request (Request): Objekt HTTP požiadavky s dátami skóre.
             format (str, optional): Formát odpovede. Defaults to None.
 
         Returns:
-            Response: Odpoveď so statusom 200 pri úspešnom spracovaní.
+            Response: Odpoveď so statusom 200 pri úspešnom spracovaní,
+                      400 pri neplatných dátach alebo 404 ak používateľ či kurz neexistuje.
         """
-        user = User.objects.filter(id=request.data["user_id"])
-        course = Course.objects.filter(id=request.data["courseID"])
-        points =request.data["point"]
-        querry = Score.objects.filter(course=request.data["courseID"],user=request.data["user_id"])
-        if not querry:
-            score = Score.objects.create(user=user[0],course=course[0],points=points)
-        else:
-            for score in querry:
-                score.points=points
-                score.save()
+        try:
+            user_id = int(request.data["user_id"])
+            course_id = int(request.data["courseID"])
+            points = int(request.data["point"])
+        except (KeyError, TypeError, ValueError):
+            return Response({"message": "user_id, courseID and point are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not User.objects.filter(id=user_id).exists() or not Course.objects.filter(id=course_id).exists():
+            return Response({"message": "User or course not found."}, status=status.HTTP_404_NOT_FOUND)
+        Score.objects.upsert(user_id, course_id, points, increment=request.data.get("mode") == "add")
         return Response(status=200)
 
 
+class ScoreBatchEntry(APIView):
+    """
+    API endpoint pre dávkový zápis výsledkov (skóre) viacerých používateľov alebo kurzov.
+    """
+    def post(self, request, format=None):
+        """
+        Spracuje POST požiadavku so zoznamom výsledkov a zapíše ich v jednej transakcii.
+
+        Očakáva `entries` – zoznam položiek s `user_id`, `courseID` a `point`.
+        Ak je `user_id` uvedené na úrovni celej požiadavky, položky ho môžu vynechať
+        (výsledky jedného používateľa vo viacerých kurzoch). Voliteľný `mode` = `"add"`
+        body pripočíta namiesto prepísania. Používatelia a kurzy sa overia
+        jedným `in_bulk` dotazom, neplatné položky sa preskočia.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky s dávkou výsledkov.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Stav každej položky (`created`, `updated`, `invalid`, `not_found`)
+                      v poradí, v akom boli odoslané, alebo 400 pri neplatnej dávke.
+        """
+        batch = ScoreBatchSerializer(data=request.data)
+        if not batch.is_valid():
+            return Response(batch.errors, status=status.HTTP_400_BAD_REQUEST)
+        default_user_id = batch.validated_data.get('user_id')
+
+        results = []
+        valid = []
+        for index, entry in enumerate(batch.validated_data['entries']):
+            item = ScoreBatchItemSerializer(data=entry)
+            if not item.is_valid():
+                results.append({"index": index, "status": "invalid", "errors": item.errors})
+                continue
+            user_id = item.validated_data.get('user_id', default_user_id)
+            if user_id is None:
+                results.append({"index": index, "status": "invalid", "errors": {"user_id": ["This field is required."]}})
+                continue
+            valid.append((index, user_id, item.validated_data['courseID'], item.validated_data['point']))
+            results.append(None)
+
+        users = User.objects.only('id').in_bulk({user_id for _, user_id, _, _ in valid})
+        courses = Course.objects.only('id').in_bulk({course_id for _, _, course_id, _ in valid})
+        found = []
+        for index, user_id, course_id, points in valid:
+            if user_id not in users or course_id not in courses:
+                results[index] = {"index": index, "status": "not_found", "user_id": user_id, "courseID": course_id}
+            else:
+                found.append((index, user_id, course_id, points))
+
+        statuses = Score.objects.bulk_upsert(
+            [(user_id, course_id, points) for _, user_id, course_id, points in found],
+            increment=batch.validated_data['mode'] == 'add',
+        )
+        for index, user_id, course_id, _ in found:
+            results[index] = {"index": index, "status": statuses[(user_id, course_id)], "user_id": user_id, "courseID": course_id}
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class NewAnswers(APIView):
     """
     API endpoint pre pridanie viacerých nových odpovedí k jednej otázke.
@@ -542,6 +926,18 @@ class UserForID(generics.ListCreateAPIView):
             queryset = queryset.filter(id=userID)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti používateľa podľa `user_id` z cache používateľov bez dotazu do databázy.
+
+        Bez parametra `user_id` vráti zoznam všetkých používateľov ako doteraz.
+        """
+        user_id = request.query_params.get('user_id')
+        if not user_id:
+            return super().list(request, *args, **kwargs)
+        user = get_cached_user(int(user_id)) if user_id.isdigit() else None
+        return Response(UserSerializer([user] if user else [], many=True).data)
+
 
 def HomeView(request):
     """
@@ -676,33 +1072,35 @@ class CoursesForUSer(generics.ListCreateAPIView):
     """
     Model = Course
     serializer_class = CourseSerializer
+    keyset_ordering = ('id',)
 
     def get_queryset(self):
         """
-        Vráti zoznam kurzov, ktoré navštevuje špecifikovaný používateľ.
+        Vráti queryset kurzov, ktoré navštevuje špecifikovaný používateľ.
 
-        Načíta `user_id` z query parametrov. Iteruje cez všetky kurzy a pre každý
-        kurz iteruje cez všetkých používateľov, ktorí ho navštevujú. Ak nájde
-        zhodu s poskytnutým `user_id`, pridá kurz do výsledného zoznamu.
+        Kurzy sa vyberú jedným dotazom cez spojovaciu tabuľku `Course.visited_by`.
 
         Returns:
-            list: Zoznam objektov `Course`, ktoré navštevuje daný používateľ.
+            QuerySet: Django QuerySet obsahujúci kurzy používateľa `user_id`.
         """
-        queryset= Course.objects.all()
-        queryset2 = []
         userID = self.request.query_params.get('user_id')
-        print(userID)
-        found = False
-        for course in queryset:
-            visited_by = course.visited_by
-            for user in visited_by.all():
-                if userID == str(user.id):
-                    print(userID)
-                    found = True
-            if found:
-                queryset2.append(course)
-            found = False
-        return queryset2
+        if not userID or not userID.isdigit():
+            return Course.objects.none()
+        return Course.objects.filter(visited_by=userID).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Vráti kurzy používateľa z cache zapísaných kurzov.
+
+        Pri požiadavke o stránkovanie sa použije bežný queryset.
+
+        Returns:
+            Response: Zoznam kurzov, ktoré používateľ navštevuje.
+        """
+        userID = request.query_params.get('user_id')
+        if self.paginator.is_requested(request) or not userID or not userID.isdigit():
+            return super().list(request, *args, **kwargs)
+        return Response(enrolled_courses(int(userID)))
 
 
 class CompleteLecture(APIView):
@@ -711,7 +1109,7 @@ class CompleteLecture(APIView):
 
     Vyžaduje JWT autentifikáciu a ID okruhu v URL.
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     def post(self, request, okruh_id):
         """
@@ -730,7 +1128,7 @@ class CompleteLecture(APIView):
         okruh = get_object_or_404(Okruh, id=okruh_id)
 
         # Skontroluje, či používateľ už dokončil okruh
-        if request.user in okruh.finished_by.all():
+        if Okruh.finished_by.through.objects.filter(okruh_id=okruh.id, user_id=request.user.id).exists():
             return Response({'status': 'error', 'message': 'Already marked as completed.'}, status=400)
 
         # Označí okruh ako dokončený pre používateľa
@@ -752,7 +1150,16 @@ class AchievementView(APIView):
 
         Returns:
             Response: Serializované dáta achievementov používateľa so statusom 200,
-                      alebo 404 ak používateľ neexistuje.
+                      alebo 404 ak používateľ neexistuje. Odpoveď sa berie z cache
+                      (invalidovanej pri udelení achievementu) a podporuje `If-None-Match`.
+        """
+        return cached_response(
+            request, 'achievements', achievements_version_key(user_id), lambda: self.build_response(user_id)
+        )
+
+    def build_response(self, user_id):
+        """
+        Načíta achievementy používateľa z databázy.
         """
         user = get_object_or_404(User, id=user_id)
         achievements = Achievement.objects.filter(awarded_to=user)
@@ -765,15 +1172,15 @@ class UserCourseCompletionView(APIView):
     """
     API endpoint, ktorý vráti percento dokončenia kurzov pre prihláseného používateľa.
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         """
         Vypočíta a vráti zoznam kurzov s percentuálnym dokončením pre aktuálneho používateľa.
 
-        Pre každý kurz v systéme vypočíta percento okruhov, ktoré prihlásený
-        používateľ dokončil.
+        Percento sa počíta z počtu okruhov kurzu a počítadla dokončených okruhov
+        používateľa, ktoré sa načítajú jedným dotazom.
 
         Args:
             request (Request): Objekt HTTP požiadavky.
@@ -781,25 +1188,7 @@ class UserCourseCompletionView(APIView):
         Returns:
             Response: JSON so zoznamom kurzov a ich percentuálnym dokončením.
         """
-        user = request.user
-        course_completion_data = []
-
-        courses = Course.objects.all()
-
-        for course in courses:
-            total_okruhs = Okruh.objects.filter(course=course).count()
-            completed_okruhs = Okruh.objects.filter(course=course, finished_by=user).count()
-
-            completion_percentage = (
-                (completed_okruhs / total_okruhs) * 100 if total_okruhs > 0 else 0
-            )
-
-            course_completion_data.append({
-                "course": course.name,
-                "completion_percentage": round(completion_percentage, 2)
-            })
-
-        return Response(course_completion_data)
+        return Response(course_completion(request.user))
 
 
 class ReportQuestion(APIView):
@@ -835,7 +1224,7 @@ class UpdateAIContextView(APIView):
     API endpoint pre aktualizáciu hodnoty `ai_context` otázky.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated] # Overenie, že používateľ je prihlásený
 
     def patch(self, request, question_id):
@@ -860,4 +1249,200 @@ class UpdateAIContextView(APIView):
             return Response(QuestionSerializer(question).data, status=status.HTTP_200_OK)
 
         except Question.DoesNotExist:
-            return Response({"error": "Otázka s týmto ID neexistuje."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({"error": "Otázka s týmto ID neexistuje."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class QuizStart(APIView):
+    """
+    API endpoint na začatie kvízu z okruhu alebo z výzvy kurzu.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        """
+        Začne kvízovú reláciu prihláseného používateľa.
+
+        Očakáva `okruhID` (viditeľné a schválené otázky okruhu) alebo `courseID`
+        (otázky výzvy kurzu) v tele požiadavky.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: ID relácie (`session`) a počet otázok (`total`), 404 ak okruh
+                      neexistuje alebo nemá otázky.
+        """
+        try:
+            okruh_id = request.data.get("okruhID")
+            course_id = request.data.get("courseID")
+            okruh_id = int(okruh_id) if okruh_id is not None else None
+            course_id = int(course_id) if okruh_id is None else None
+        except (TypeError, ValueError):
+            return Response({"message": "okruhID or courseID is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = start_session(request.user.id, okruh_id=okruh_id, course_id=course_id)
+        if session is None:
+            return Response({"message": "No questions found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"session": session['id'], "total": session_total(session)}, status=status.HTTP_201_CREATED)
+
+
+class QuizNext(APIView):
+    """
+    API endpoint na načítanie ďalšej dávky otázok kvízu.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id, format=None):
+        """
+        Vráti ďalšiu dávku otázok relácie s odpoveďami.
+
+        Voliteľný parameter `count` určuje počet otázok v dávke (najviac `MAX_BATCH_SIZE`).
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            session_id (str): ID kvízovej relácie.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Otázky dávky (`questions`), pozícia v kvíze (`position`), počet
+                      otázok (`total`) a príznak konca (`done`), 404 ak relácia neexistuje.
+        """
+        session = get_session(session_id, request.user.id)
+        if session is None:
+            return Response({"message": "Quiz session not found."}, status=status.HTTP_404_NOT_FOUND)
+        count = request.query_params.get('count', '')
+        count = min(int(count), MAX_BATCH_SIZE) if count.isdigit() and int(count) > 0 else DEFAULT_BATCH_SIZE
+
+        questions = next_batch(session, count)
+        total = session_total(session)
+        return Response({
+            "questions": QuizQuestionSerializer(questions, many=True).data,
+            "position": session['position'],
+            "total": total,
+            "done": session['position'] >= total,
+        })
+
+
+class QuizFinish(APIView):
+    """
+    API endpoint na ukončenie kvízu.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id, format=None):
+        """
+        Ukončí kvízovú reláciu prihláseného používateľa.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            session_id (str): ID kvízovej relácie.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Počet zobrazených otázok (`served`) a počet otázok relácie (`total`),
+                      404 ak relácia neexistuje.
+        """
+        session = get_session(session_id, request.user.id)
+        if session is None:
+            return Response({"message": "Quiz session not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(finish_session(session))
+
+
+class QuizGrade(APIView):
+    """
+    API endpoint na vyhodnotenie kvízu a zápis bodov do skóre.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id, format=None):
+        """
+        Vyhodnotí vybrané odpovede kvízu a ukončí reláciu.
+
+        Očakáva `answers` – zoznam ID vybraných odpovedí všetkých zobrazených otázok –
+        v tele požiadavky. Body za správne zodpovedané otázky sa pripočítajú do skóre
+        používateľa v kurze kvízu, namiesto samostatného zápisu cez `ScoreEntry`.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            session_id (str): ID kvízovej relácie.
+            format (str, optional): Formát odpovede. Defaults to None.
+
+        Returns:
+            Response: Výsledok každej otázky (`results`) so správnymi odpoveďami, počet
+                      správnych (`correct`) a pripočítané body (`points`), 404 ak relácia
+                      neexistuje alebo už bola ukončená.
+        """
+        serializer = QuizGradeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session = get_session(session_id, request.user.id)
+        result = grade_session(session, serializer.validated_data['answers']) if session is not None else None
+        if result is None:
+            return Response({"message": "Quiz session not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+class LikeView(APIView):
+    """
+    Spoločný základ endpointov na lajkovanie (viď `otazky/likes.py`).
+
+    - GET: Vráti počet lajkov a či objekt lajkol prihlásený používateľ.
+    - POST: Lajkne objekt.
+    - DELETE: Zruší lajk.
+
+    Všetky metódy vracajú `likes` (počet lajkov vrátane čakajúcich zmien) a `liked`,
+    404 ak objekt neexistuje.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    like_kind = None
+
+    def get(self, request, object_id, format=None):
+        return self.respond(request, object_id)
+
+    def post(self, request, object_id, format=None):
+        return self.respond(request, object_id, like)
+
+    def delete(self, request, object_id, format=None):
+        return self.respond(request, object_id, unlike)
+
+    def respond(self, request, object_id, change=None):
+        """
+        Vykoná zmenu lajku (ak je zadaná) a vráti aktuálny stav.
+
+        Args:
+            request (Request): Objekt HTTP požiadavky.
+            object_id (UUID): ID otázky alebo komentára.
+            change (callable, optional): `like` alebo `unlike`.
+
+        Returns:
+            Response: Počet lajkov (`likes`) a stav lajku používateľa (`liked`).
+        """
+        course_id = object_course_id(self.like_kind, object_id)
+        if course_id is None:
+            return Response({"message": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if change is not None:
+            change(self.like_kind, object_id, request.user.id, course_id)
+        return Response({
+            "likes": like_count(self.like_kind, object_id, course_id),
+            "liked": is_liked(self.like_kind, object_id, request.user.id),
+        })
+
+
+class QuestionLike(LikeView):
+    """
+    API endpoint na lajkovanie otázky.
+    """
+    like_kind = 'question'
+
+
+class CommentLike(LikeView):
+    """
+    API endpoint na lajkovanie komentára.
+    """
+    like_kind = 'comment'